@@ -0,0 +1,248 @@
+"""
+Compact on-disk timetables and incremental autosave.
+
+A timetable database (.tdb) is an SQLite file with one row per filled slot
+and an append-only journal of slot changes. Saving an edit appends one
+journal row instead of rewriting the whole timetable; reading replays the
+journal over the slot table, so the latest write wins. Compaction folds the
+journal into the slot table and runs on a background thread with its own
+connection once the journal grows past a threshold.
+"""
+import errno
+import json
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+
+DEFAULT_AUTOSAVE_PATH = os.path.join(os.path.expanduser("~"), ".cuhksz_scheduler", "autosave.tdb")
+
+# Journal rows after which the Autosaver compacts in the background
+COMPACT_THRESHOLD = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    day_idx INTEGER NOT NULL,
+    slot_idx INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (day_idx, slot_idx)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    day_idx INTEGER NOT NULL,
+    slot_idx INTEGER NOT NULL,
+    data TEXT
+);
+"""
+
+
+def _encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+class TimetableStore:
+    def __init__(self, path=DEFAULT_AUTOSAVE_PATH, create=True):
+        """Open a .tdb file, creating it unless `create` is false; then a missing file raises FileNotFoundError."""
+        self.path = path
+        if not create:
+            if not os.path.isfile(path):
+                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+            # mode=rw never creates the file, and its schema is left as it is
+            self.conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(path))}?mode=rw", uri=True, timeout=10)
+            return
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read(self):
+        """The stored timetable_data, with the journal applied."""
+        data = {(d, s): json.loads(raw) for d, s, raw in self.conn.execute(
+            "SELECT day_idx, slot_idx, data FROM slots")}
+        for d, s, raw in self.conn.execute("SELECT day_idx, slot_idx, data FROM journal ORDER BY seq"):
+            if raw is None:
+                data.pop((d, s), None)
+            else:
+                data[(d, s)] = json.loads(raw)
+        return data
+
+    def append(self, changes):
+        """Journal {(day_idx, slot_idx): data} changes; empty data clears the slot."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO journal (day_idx, slot_idx, data) VALUES (?, ?, ?)",
+                [(d, s, _encode(data) if data else None) for (d, s), data in sorted(changes.items())])
+
+    def write_all(self, data):
+        """Replace the stored timetable with `data` and drop the journal."""
+        with self.conn:
+            self.conn.execute("DELETE FROM journal")
+            self.conn.execute("DELETE FROM slots")
+            self.conn.executemany(
+                "INSERT INTO slots (day_idx, slot_idx, data) VALUES (?, ?, ?)",
+                [(d, s, _encode(val)) for (d, s), val in sorted(data.items()) if val])
+
+    def journal_size(self):
+        return self.conn.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+    def compact(self):
+        """Fold the journal into the slot table, in one transaction."""
+        with self.conn:
+            row = self.conn.execute("SELECT MAX(seq) FROM journal").fetchone()
+            if row[0] is None:
+                return
+            last = row[0]
+            latest = ("SELECT j.day_idx, j.slot_idx, j.data FROM journal j "
+                      "WHERE j.seq = (SELECT MAX(seq) FROM journal k WHERE k.seq <= ? "
+                      "AND k.day_idx = j.day_idx AND k.slot_idx = j.slot_idx)")
+            self.conn.execute(f"INSERT OR REPLACE INTO slots {latest} AND j.data IS NOT NULL", (last,))
+            self.conn.execute(
+                f"DELETE FROM slots WHERE (day_idx, slot_idx) IN "
+                f"(SELECT day_idx, slot_idx FROM ({latest} AND j.data IS NULL))", (last,))
+            self.conn.execute("DELETE FROM journal WHERE seq <= ?", (last,))
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def read_timetable_file(path):
+    with TimetableStore(path, create=False) as store:
+        return store.read()
+
+
+def write_timetable_file(data, path):
+    with TimetableStore(path) as store:
+        store.write_all(data)
+        store.compact()
+
+
+class _Journal:
+    __slots__ = ("path", "store", "timetable", "pending", "compacting")
+
+    def __init__(self, path):
+        self.path = path
+        self.store = TimetableStore(path)
+        self.timetable = None
+        self.pending = 0
+        self.compacting = None
+
+
+class Autosaver:
+    """
+    Journals the slots open Timetables report as modified, in one store per
+    workspace entry: `path` for the first and path-2, path-3, ... beside it
+    for the others. Entries are identified by any hashable key. Call flush()
+    periodically for every entry; an entry whose Timetable object was
+    replaced (e.g. by regridding) gets a full snapshot instead.
+    """
+
+    def __init__(self, path=DEFAULT_AUTOSAVE_PATH, compact_threshold=COMPACT_THRESHOLD):
+        self.path = path
+        self.compact_threshold = compact_threshold
+        self._journals = {}  # entry key -> _Journal
+        # Fail early if the autosave location is unusable
+        TimetableStore(path).close()
+
+    def _other_paths(self):
+        root, ext = os.path.splitext(self.path)
+        folder, prefix = os.path.split(root)
+        numbered = []
+        for name in os.listdir(folder or "."):
+            number = name[len(prefix) + 1:-len(ext) or None]
+            if name.startswith(prefix + "-") and name.endswith(ext) and number.isdigit():
+                numbered.append((int(number), os.path.join(folder, name)))
+        return [path for _, path in sorted(numbered)]
+
+    def restore(self):
+        """
+        (path, data) of every timetable open in the last session, the first
+        one first. Stores of the other timetables that cannot be read are
+        left out; an unreadable first store raises sqlite3.Error.
+        """
+        with TimetableStore(self.path) as store:
+            restored = [(self.path, store.read())]
+        for path in self._other_paths():
+            try:
+                restored.append((path, read_timetable_file(path)))
+            except sqlite3.Error:
+                continue
+        return restored
+
+    def _free_path(self):
+        used = {journal.path for journal in self._journals.values()}
+        if self.path not in used:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        n = 2
+        # Files left on disk, e.g. unreadable ones, are never overwritten
+        while f"{root}-{n}{ext}" in used or os.path.exists(f"{root}-{n}{ext}"):
+            n += 1
+        return f"{root}-{n}{ext}"
+
+    def attach(self, key, timetable, path=None):
+        """Store a full snapshot of `timetable` as entry `key` (in `path`, e.g. a restored one) and journal it from now on."""
+        journal = self._journals.get(key)
+        if journal is None:
+            journal = self._journals[key] = _Journal(path or self._free_path())
+        timetable.take_modified()
+        journal.store.write_all(timetable.data)
+        journal.timetable = timetable
+        journal.pending = 0
+
+    def flush(self, key, timetable):
+        journal = self._journals.get(key)
+        if journal is None or timetable is not journal.timetable:
+            self.attach(key, timetable)
+            return
+        modified = timetable.take_modified()
+        if not modified:
+            return
+        journal.store.append({slot: timetable.get(slot) for slot in modified})
+        journal.pending += len(modified)
+        if journal.pending >= self.compact_threshold:
+            self.compact_in_background(journal)
+
+    def forget(self, key):
+        """Stop journaling a closed entry and delete its store, so the next session does not reopen it."""
+        journal = self._journals.pop(key, None)
+        if journal is None:
+            return
+        if journal.compacting is not None:
+            journal.compacting.join()
+        journal.store.close()
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(journal.path + suffix)
+            except FileNotFoundError:
+                pass
+
+    def compact_in_background(self, journal):
+        if journal.compacting is not None and journal.compacting.is_alive():
+            return
+        journal.pending = 0
+        journal.compacting = threading.Thread(target=self._compact, args=(journal.path,), daemon=True)
+        journal.compacting.start()
+
+    def _compact(self, path):
+        try:
+            with TimetableStore(path) as store:
+                store.compact()
+        except sqlite3.Error:
+            # The journal stays valid; the next threshold retries
+            pass
+
+    def close(self):
+        for journal in self._journals.values():
+            if journal.compacting is not None:
+                journal.compacting.join()
+            journal.store.close()
+        self._journals.clear()
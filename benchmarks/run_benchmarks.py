@@ -0,0 +1,287 @@
+"""
+Benchmarks for the scheduler's hot paths, runnable without a display.
+
+    python benchmarks/run_benchmarks.py [-o results.json] [--quick]
+    python benchmarks/run_benchmarks.py --baseline old.json --tolerance 0.25
+
+Qt runs on the offscreen platform (QT_QPA_PLATFORM=offscreen unless already
+set). Every benchmark is timed on synthetic timetables of growing size, in
+both the widget-per-slot and the single-canvas mode. Results are written as
+JSON, together with cold-start and edit-dialog latency; with --baseline, any benchmark whose median got slower than the
+baseline by more than the tolerance is reported and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+# Keep benchmark runs out of the user's autosave
+os.environ["SCHEDULER_AUTOSAVE"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import QObject, QEvent, QT_VERSION_STR, PYQT_VERSION_STR
+
+from autosave import write_timetable_file
+from main import CourseDialog, MainWindow
+from timetable import DAYS, WEEK_DAYS, SLOTS_INFO, regular_slots, to_json_dict
+
+# (name, days, slots_info)
+GRIDS = [
+    ("default", DAYS, SLOTS_INFO),
+    ("7x30min", WEEK_DAYS, regular_slots(30)),
+    ("7x15min", WEEK_DAYS, regular_slots(15)),
+    ("7x5min", WEEK_DAYS, regular_slots(5)),
+]
+QUICK_GRIDS = GRIDS[:2]
+
+
+def synthetic_data(days, slots_info, fill=0.3, seed=0):
+    """A reproducible timetable filling about `fill` of the slots, with some overlaps."""
+    rng = random.Random(seed)
+    data = {}
+    for d in range(len(days)):
+        for s, (_, _, is_lecture) in enumerate(slots_info):
+            if rng.random() < fill:
+                data[(d, s)] = {"course_name": f"C{d}{s:03d}",
+                                "instructor_name": rng.choice(["Alice", "Bob", "Carol", ""]),
+                                "remarks": "",
+                                "duration": str(rng.choice([50, 80, 110])),
+                                "repeat_pattern": "None"}
+    return data
+
+
+def measure(fn, repeat):
+    """Run fn `repeat` times; timings in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"repeat": repeat, "min_ms": min(times), "median_ms": statistics.median(times),
+            "mean_ms": statistics.fmean(times)}
+
+
+class PaintCounter(QObject):
+    """Counts paint events delivered to the watched widgets."""
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            self.count += 1
+        return False
+
+
+def bench_grid(app, window, grid_name, days, slots_info, single_canvas, repeat):
+    os.environ["SCHEDULER_SINGLE_CANVAS"] = "1" if single_canvas else "0"
+    window.rebuild_grid(days, slots_info)
+    schedule = window.schedule_widget
+    # Measure the finished widgets, not the deferred placeholders
+    schedule.materialize_slots()
+    if schedule.single_canvas != single_canvas:
+        # Dense grids always use the single canvas; don't report them twice
+        return []
+    data = synthetic_data(days, slots_info)
+    params = {"grid": grid_name, "slots": len(days) * len(slots_info), "filled": len(data),
+              "single_canvas": schedule.single_canvas}
+    results = []
+
+    def record(name, timing, **extra):
+        results.append({"name": name, "params": {**params, **extra}, **timing})
+
+    # load_timetable without the file dialog: the same read, validation and swap a real load runs
+    for suffix in (".json", ".tdb"):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False) as f:
+            path = f.name
+            if suffix == ".json":
+                json.dump(to_json_dict(data), f)
+        try:
+            if suffix == ".tdb":
+                write_timetable_file(data, path)
+
+            def load():
+                loaded, _ = window.read_timetable(path)
+                window.replace_timetable(loaded)
+                app.processEvents()
+            record(f"load_{suffix[1:]}", measure(load, repeat))
+        finally:
+            os.remove(path)
+
+    record("update_conflicts", measure(schedule.update_conflicts, repeat))
+
+    keys = list(schedule.slot_widgets)
+    rng = random.Random(1)
+    edits = [(rng.choice(keys), rng.choice([{}, {"course_name": "X", "duration": "110"}]))
+             for _ in range(200)]
+
+    def refresh():
+        for (d, s), value in edits:
+            schedule.refresh_slot(d, s, value)
+    record("refresh_slot", measure(refresh, repeat), calls=len(edits))
+
+    # CourseDialog's live preview, recomputed on every combo change or keystroke
+    record("edit_preview", measure(lambda: window.edit_preview_text(0, 0, "110", "MoWeFr"), repeat * 10))
+
+    # Full-widget paint throughput (grid, labels and every slot)
+    pixmap = QPixmap(schedule.size())
+    record("schedule_paint", measure(lambda: schedule.render(pixmap), repeat))
+
+    if not schedule.single_canvas:
+        filled = next((w for key, w in schedule.slot_widgets.items() if key in schedule.timetable),
+                      next(iter(schedule.slot_widgets.values())))
+        slot_pixmap = QPixmap(filled.size())
+        record("time_slot_paint", measure(lambda: filled.render(slot_pixmap), repeat * 10))
+
+    # Swapping the shown timetable, and drawing a workspace preview of one
+    other = window.new_timetable("benchmark", synthetic_data(days, slots_info, seed=2), activate=False)
+    first = window.workspace.active
+    record("switch_timetable", measure(lambda: (window.switch_timetable(other),
+                                                window.switch_timetable(first)), repeat), calls=2)
+    renderer = window.thumbnails
+
+    def thumbnail():
+        # A new revision invalidates the cached preview
+        other.timetable.revision += 1
+        renderer.thumbnail(other.timetable)
+    record("thumbnail", measure(thumbnail, repeat))
+    window.switch_timetable(other)
+    window.close_timetable()
+
+    record("hover_animation", bench_hover(app, schedule))
+    return results
+
+
+def bench_hover(app, schedule):
+    """Hover in and out of one slot; count animation frames and paint events."""
+    schedule.show()
+    app.processEvents()
+    counter = PaintCounter()
+    schedule.installEventFilter(counter)
+    for w in schedule.slot_widgets.values():
+        if not schedule.single_canvas:
+            w.installEventFilter(counter)
+    frames = [0]
+    schedule.animator.timer.timeout.connect(lambda: frames.__setitem__(0, frames[0] + 1))
+
+    slot = next(iter(schedule.slot_widgets.values()))
+    start = time.perf_counter()
+    for step in (slot.hover_enter, slot.hover_leave):
+        step()
+        deadline = time.perf_counter() + 2
+        while schedule.animator.active and time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+        app.processEvents()
+    elapsed = (time.perf_counter() - start) * 1000
+
+    schedule.hide()
+    return {"repeat": 1, "min_ms": elapsed, "median_ms": elapsed, "mean_ms": elapsed,
+            "frames": frames[0], "paint_events": counter.count}
+
+
+def bench_startup(app, repeat):
+    """
+    Cold start of the main window: until its first frame has been handled,
+    and until every deferred slot widget has been built.
+    """
+    first_frame, complete = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        window = MainWindow()
+        window.show()
+        app.processEvents()
+        first_frame.append((time.perf_counter() - start) * 1000)
+        while window.schedule_widget.paints_items() and not window.schedule_widget.single_canvas:
+            app.processEvents()
+        complete.append((time.perf_counter() - start) * 1000)
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+    return [{"name": name, "params": {"grid": "default", "single_canvas": False},
+             "repeat": repeat, "min_ms": min(times), "median_ms": statistics.median(times),
+             "mean_ms": statistics.fmean(times)}
+            for name, times in (("startup_first_frame", first_frame), ("startup_complete", complete))]
+
+
+def bench_dialog(window, repeat):
+    """Getting the edit dialog ready: re-populating the shared one versus building a new one."""
+    existing = {"course_name": "CSC3100", "instructor_name": "Alice", "room": "TD 101",
+                "remarks": "", "duration": "80", "repeat_pattern": "MoWe"}
+    params = {"grid": "default", "single_canvas": False}
+    window.course_dialog()
+    return [{"name": "dialog_open", "params": params,
+             **measure(lambda: window.course_dialog(existing, True), repeat * 10)},
+            {"name": "dialog_construct", "params": params,
+             **measure(lambda: CourseDialog(window, existing, True,
+                                            window.completion_loader).deleteLater(), repeat * 10)}]
+
+
+def compare(results, baseline, tolerance):
+    """Benchmarks whose median regressed by more than `tolerance` against the baseline."""
+    old = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = old.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if before and r["median_ms"] > before["median_ms"] * (1 + tolerance):
+            regressions.append((r, before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scheduler benchmarks (offscreen Qt).")
+    parser.add_argument("-o", "--output", default="benchmark-results.json")
+    parser.add_argument("--quick", action="store_true", help="small grids and few repeats")
+    parser.add_argument("--repeat", type=int, default=None)
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown of the median, as a fraction (default 0.25)")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    app.setStyle("Fusion")
+    window = MainWindow()
+    repeat = args.repeat or (3 if args.quick else 10)
+
+    results = bench_startup(app, repeat) + bench_dialog(window, repeat)
+    for grid_name, days, slots_info in QUICK_GRIDS if args.quick else GRIDS:
+        for single_canvas in (False, True):
+            results += bench_grid(app, window, grid_name, days, slots_info, single_canvas, repeat)
+
+    report = {
+        "meta": {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "qt": QT_VERSION_STR, "pyqt": PYQT_VERSION_STR,
+                 "qpa": os.environ["QT_QPA_PLATFORM"], "repeat": repeat},
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        p = r["params"]
+        print(f"{r['name']:<18} {p['grid']:<8} {'canvas' if p['single_canvas'] else 'widgets':<8} "
+              f"median {r['median_ms']:9.3f} ms  min {r['min_ms']:9.3f} ms")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r, before in regressions:
+            print(f"REGRESSION {r['name']} {r['params']}: "
+                  f"{before['median_ms']:.3f} -> {r['median_ms']:.3f} ms", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
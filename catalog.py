@@ -0,0 +1,235 @@
+"""
+SQLite-backed course catalog store.
+
+The full term catalog is imported once from JSON (the generator catalog
+format) or CSV, and then queried through indexes on course code, instructor
+and (day, start time). Nothing is loaded into memory up front; callers pull
+just the sections they need as generator.Section/Course objects.
+
+CSV files have one row per meeting with the columns
+
+    course_code, course_name, section, instructor_name,
+    kind, repeat_pattern, day, slot, duration, room
+
+where kind is "lecture" or "tutorial", day is only needed when
+repeat_pattern is "None" and room is optional.
+"""
+import csv
+import json
+import os
+import secrets
+import sqlite3
+
+from generator import CatalogError, Course, Meeting, Section, parse_catalog
+from recurrence import column_weekday
+from timetable import DAYS, SLOTS_INFO, default_duration
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser("~"), ".cuhksz_scheduler", "catalog.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sections (
+    id INTEGER PRIMARY KEY,
+    course_code TEXT NOT NULL,
+    course_name TEXT NOT NULL DEFAULT '',
+    section TEXT NOT NULL DEFAULT '',
+    instructor_name TEXT NOT NULL DEFAULT '',
+    UNIQUE (course_code, section)
+);
+CREATE TABLE IF NOT EXISTS meetings (
+    section_id INTEGER NOT NULL REFERENCES sections(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    day_idx INTEGER NOT NULL,
+    slot_idx INTEGER NOT NULL,
+    start_min INTEGER NOT NULL,
+    end_min INTEGER NOT NULL,
+    repeat_pattern TEXT NOT NULL DEFAULT 'None',
+    room TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sections_code ON sections(course_code);
+CREATE INDEX IF NOT EXISTS idx_sections_instructor ON sections(instructor_name);
+CREATE INDEX IF NOT EXISTS idx_meetings_day_start ON meetings(day_idx, start_min);
+CREATE INDEX IF NOT EXISTS idx_meetings_section ON meetings(section_id);
+"""
+
+
+def busy_intervals(timetable_data, days=DAYS, slots_info=SLOTS_INFO):
+    """
+    (day_idx, start_min, end_min) of every filled slot in a timetable_data-style
+    dict on a days/slots_info grid, with day_idx counted from Monday as in the catalog.
+    """
+    intervals = []
+    for (d, s), data in timetable_data.items():
+        if data:
+            _, start, is_lecture = slots_info[s]
+            intervals.append((column_weekday(days, d), start,
+                              start + int(data.get("duration", default_duration(is_lecture)))))
+    return intervals
+
+
+def read_csv_catalog(path):
+    """Group CSV meeting rows into the JSON catalog structure."""
+    courses = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for line_no, row in enumerate(csv.DictReader(f), 2):
+            code = (row.get("course_code") or "").strip()
+            if not code:
+                raise CatalogError(f"line {line_no}: missing course_code")
+            kind = (row.get("kind") or "lecture").strip().lower()
+            if kind not in ("lecture", "tutorial"):
+                raise CatalogError(f"line {line_no}: unknown kind {kind!r}")
+            try:
+                meeting = {"slot": int(row["slot"]),
+                           "repeat_pattern": (row.get("repeat_pattern") or "None").strip(),
+                           "duration": (row.get("duration") or "").strip() or None,
+                           "room": (row.get("room") or "").strip()}
+                if (row.get("day") or "").strip():
+                    meeting["day"] = int(row["day"])
+            except (KeyError, TypeError, ValueError):
+                raise CatalogError(f"line {line_no}: invalid slot or day")
+            if meeting["duration"] is None:
+                del meeting["duration"]
+
+            course = courses.setdefault(code, {"course_code": code,
+                                               "course_name": (row.get("course_name") or "").strip(),
+                                               "sections": {}})
+            label = (row.get("section") or "").strip()
+            section = course["sections"].setdefault(label, {
+                "section": label,
+                "instructor_name": (row.get("instructor_name") or "").strip()})
+            if kind in section:
+                raise CatalogError(f"line {line_no}: duplicate {kind} for {code} {label}")
+            section[kind] = meeting
+
+    for course in courses.values():
+        course["sections"] = list(course["sections"].values())
+    return list(courses.values())
+
+
+class CatalogStore:
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Stores created before meetings had a room
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(meetings)")}
+        if "room" not in columns:
+            self.conn.execute("ALTER TABLE meetings ADD COLUMN room TEXT NOT NULL DEFAULT ''")
+            self.conn.commit()
+        # A random id per database file, so caches of a deleted and recreated store do not match it
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('store_id', ?)",
+                              (secrets.randbits(63),))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def import_file(self, path):
+        """Import a .json or .csv catalog file; return the number of sections imported."""
+        if path.lower().endswith(".csv"):
+            raw = read_csv_catalog(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        return self.import_courses(parse_catalog(raw))
+
+    def import_courses(self, courses):
+        """Insert or replace sections, all in one transaction."""
+        count = 0
+        with self.conn:
+            for course in courses:
+                for sec in course.sections:
+                    self.conn.execute("DELETE FROM sections WHERE course_code = ? AND section = ?",
+                                      (course.course_code, sec.section))
+                    cur = self.conn.execute(
+                        "INSERT INTO sections (course_code, course_name, section, instructor_name) "
+                        "VALUES (?, ?, ?, ?)",
+                        (course.course_code, course.course_name, sec.section, sec.instructor_name))
+                    self.conn.executemany(
+                        "INSERT INTO meetings (section_id, kind, day_idx, slot_idx, start_min, end_min, "
+                        "repeat_pattern, room) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(cur.lastrowid, m.kind, m.day_idx, m.slot_idx, m.start, m.end, m.repeat_pattern,
+                          m.room) for m in sec.meetings])
+                    count += 1
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                              "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+        return count
+
+    def generation(self):
+        """Counter bumped by every import, for invalidating derived caches."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return row[0] if row else 0
+
+    def store_id(self):
+        """Random id chosen when the database file was created."""
+        return self.conn.execute("SELECT value FROM meta WHERE key = 'store_id'").fetchone()[0]
+
+    def completion_terms(self):
+        """Distinct course codes and titles, and distinct instructor names."""
+        courses = [row[0] for row in self.conn.execute(
+            "SELECT course_code FROM sections UNION SELECT course_name FROM sections")]
+        instructors = [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT instructor_name FROM sections")]
+        return courses, instructors
+
+    def course_codes(self):
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT course_code FROM sections ORDER BY course_code")]
+
+    def _sections_where(self, where, params):
+        rows = self.conn.execute(
+            "SELECT s.id, s.course_code, s.course_name, s.section, s.instructor_name, "
+            "m.kind, m.day_idx, m.slot_idx, m.start_min, m.end_min, m.repeat_pattern, m.room "
+            "FROM sections s JOIN meetings m ON m.section_id = s.id "
+            f"WHERE {where} ORDER BY s.course_code, s.section, s.id, m.kind, m.day_idx",
+            params)
+        sections = {}
+        for sid, code, name, label, instructor, kind, day, slot, start, end, pattern, room in rows:
+            if sid not in sections:
+                sections[sid] = Section(code, name, label, instructor, [])
+            sections[sid].meetings.append(Meeting(kind, day, slot, end - start, pattern, room))
+        return list(sections.values())
+
+    def sections(self, course_code):
+        return self._sections_where("s.course_code = ?", (course_code,))
+
+    def sections_by_instructor(self, instructor_name):
+        return self._sections_where("s.instructor_name = ?", (instructor_name,))
+
+    def sections_fitting(self, course_code, busy):
+        """
+        Sections of a course none of whose meetings overlap the given
+        (day_idx, start_min, end_min) busy intervals, e.g. busy_intervals(timetable_data).
+        """
+        if not busy:
+            return self.sections(course_code)
+        overlap = " OR ".join("(o.day_idx = ? AND o.start_min < ? AND o.end_min > ?)" for _ in busy)
+        params = [course_code]
+        for day, start, end in busy:
+            params += [day, end, start]
+        return self._sections_where(
+            "s.course_code = ? AND NOT EXISTS (SELECT 1 FROM meetings o "
+            f"WHERE o.section_id = s.id AND ({overlap}))", params)
+
+    def load_courses(self, course_codes):
+        """Course objects for iter_schedules, in the given order; unknown codes are skipped."""
+        courses = []
+        for code in course_codes:
+            sections = self.sections(code)
+            if sections:
+                courses.append(Course(code, sections[0].course_name, sections))
+        return courses
@@ -0,0 +1,129 @@
+"""
+Instructor and room double-booking detection across many timetables and
+the catalog.
+
+Every course meeting with an instructor or room becomes a booking of that
+resource. Bookings of the same event (same resource, course, day and time)
+seen in several timetables are merged, keeping all their sources; the rest
+are grouped per (resource, day) and swept in start order with a heap of
+active bookings ordered by end time, so the cost is O(n log n) plus the
+number of clashes reported.
+"""
+import heapq
+from itertools import count
+
+from recurrence import WEEKDAY_NAMES, column_weekday
+from timetable import default_duration, minutes_to_hhmm
+
+RESOURCE_FIELDS = (("instructor", "instructor_name"), ("room", "room"))
+
+
+class Booking:
+    __slots__ = ("kind", "resource", "day_idx", "start", "end", "event", "sources")
+
+    def __init__(self, kind, resource, day_idx, start, end, event):
+        self.kind = kind
+        self.resource = resource
+        self.day_idx = day_idx
+        self.start = start
+        self.end = end
+        self.event = event
+        self.sources = []
+
+
+class Clash:
+    __slots__ = ("first", "second")
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+    @property
+    def kind(self):
+        return self.first.kind
+
+    @property
+    def resource(self):
+        return self.first.resource
+
+    @property
+    def day_idx(self):
+        return self.first.day_idx
+
+    def as_dict(self):
+        return {"kind": self.kind, "resource": self.resource, "day": WEEKDAY_NAMES[self.day_idx],
+                "overlap": [minutes_to_hhmm(max(self.first.start, self.second.start)),
+                            minutes_to_hhmm(min(self.first.end, self.second.end))],
+                "bookings": [{"event": b.event, "start": minutes_to_hhmm(b.start),
+                              "end": minutes_to_hhmm(b.end), "sources": b.sources}
+                             for b in (self.first, self.second)]}
+
+    def describe(self):
+        a, b = self.first, self.second
+        return (f"{self.kind} {self.resource}, {WEEKDAY_NAMES[self.day_idx]}: "
+                f"{a.event} {minutes_to_hhmm(a.start)}-{minutes_to_hhmm(a.end)} ({'; '.join(a.sources)}) "
+                f"overlaps {b.event} {minutes_to_hhmm(b.start)}-{minutes_to_hhmm(b.end)} ({'; '.join(b.sources)})")
+
+
+def timetable_bookings(data, days, slots_info, source):
+    """
+    (kind, resource, day_idx, start, end, event, source) tuples for one
+    timetable_data dict on a days/slots_info grid. day_idx is the weekday
+    counted from Monday, as in the catalog, not the grid column.
+    """
+    for (d, s), val in data.items():
+        if not val:
+            continue
+        _, start, is_lecture = slots_info[s]
+        end = start + int(val.get("duration", default_duration(is_lecture)))
+        event = str(val.get("course_name", "")).strip()
+        for kind, field in RESOURCE_FIELDS:
+            resource = str(val.get(field, "")).strip()
+            if resource:
+                yield (kind, resource, column_weekday(days, d), start, end, event,
+                       f"{source} {days[d]} {minutes_to_hhmm(start)}")
+
+
+def catalog_bookings(store):
+    """Booking tuples for every meeting in a catalog.CatalogStore."""
+    rows = store.conn.execute(
+        "SELECT s.course_code, s.section, s.instructor_name, m.kind, m.day_idx, m.start_min, m.end_min, m.room "
+        "FROM sections s JOIN meetings m ON m.section_id = s.id")
+    for code, label, instructor, kind, day, start, end, room in rows:
+        source = f"catalog {code} {label} {kind}".strip()
+        if instructor.strip():
+            yield "instructor", instructor.strip(), day, start, end, code, source
+        if room.strip():
+            yield "room", room.strip(), day, start, end, code, source
+
+
+def find_clashes(bookings):
+    """Every pair of overlapping bookings of one resource, from booking tuples."""
+    # Merge repeated sightings of the same event; names compare case-insensitively
+    events = {}
+    for kind, resource, day, start, end, event, source in bookings:
+        key = (kind, resource.casefold(), day, start, end, event.casefold())
+        booking = events.get(key)
+        if booking is None:
+            booking = events[key] = Booking(kind, resource, day, start, end, event)
+        booking.sources.append(source)
+
+    by_resource = {}
+    for key, booking in events.items():
+        by_resource.setdefault(key[:3], []).append(booking)
+
+    clashes = []
+    seq = count()
+    # Groups in (kind, resource, day) order, so clashes come out sorted
+    for key in sorted(by_resource):
+        group = by_resource[key]
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda b: (b.start, b.end))
+        active = []  # (end, seq, booking)
+        for booking in group:
+            while active and active[0][0] <= booking.start:
+                heapq.heappop(active)
+            clashes.extend(Clash(other, booking) for _, _, other in active)
+            heapq.heappush(active, (booking.end, next(seq), booking))
+    return clashes
@@ -0,0 +1,316 @@
+"""
+Headless batch tool for timetable files. Only PNG and PDF export import
+PyQt5 (rendering on the offscreen platform, in the worker processes), so
+everything else runs on servers and in CI without Qt.
+
+    python cli.py validate PATH...                  check files, report conflicts
+    python cli.py normalize PATH... -o DIR          rewrite in canonical form
+    python cli.py normalize PATH... --in-place
+    python cli.py convert PATH... --to csv -o DIR   export to another format
+    python cli.py convert PATH... --to ics -o DIR --start 2026-09-01 --end 2026-12-20
+    python cli.py validate PATH... --start 2026-09-01 --end 2026-12-20 --holidays 2026-10-01
+    python cli.py clashes PATH... [--catalog catalog.db]   instructor/room double-bookings
+    python cli.py serve [--host 127.0.0.1] [--port 8765]  sync server for shared timetables
+
+Directories are expanded to the *.json and *.tdb files they contain. Files are
+processed in a pool of worker processes (-j), and every file gets its own
+entry in the report, so one broken file never stops the batch. Given a
+semester (--start/--end), validate only reports conflicts between courses
+that meet on a common date, so odd/even-week courses may share a slot. The exit
+status is 1 if any file was invalid or could not be processed.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from autosave import read_timetable_file, write_timetable_file
+from catalog import CatalogStore
+from clashes import catalog_bookings, find_clashes, timetable_bookings
+from export import render_timetable, write_ics
+from freetime import load_timetable_files
+from recurrence import Semester, dated_conflicts
+from sync import DEFAULT_HOST, DEFAULT_PORT, run_server
+from timetable import (
+    DAYS, SLOTS_INFO, Timetable, check_timetable, load_grid, normalize_course,
+    to_json_dict, minutes_to_hhmm
+)
+
+CSV_FIELDS = ("day", "slot", "start", "end", "course_name", "instructor_name",
+              "room", "remarks", "duration", "repeat_pattern")
+
+_grid = (DAYS, SLOTS_INFO)
+
+
+def _init_worker(grid):
+    global _grid
+    _grid = grid
+
+
+def expand_paths(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.lower().endswith((".json", ".tdb"))))
+        else:
+            files.append(path)
+    return files
+
+
+def write_json(timetable, path, options):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(to_json_dict(timetable.data), f, indent=4, ensure_ascii=False)
+
+
+def write_csv(timetable, path, options):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, CSV_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for (d, s), val in sorted(timetable.items()):
+            writer.writerow({**val, "day": timetable.days[d], "slot": s,
+                             "start": minutes_to_hhmm(timetable.slots_info[s][1]),
+                             "end": minutes_to_hhmm(timetable.end_minute(d, s))})
+
+
+WRITERS = {
+    "json": (".json", write_json),
+    "csv": (".csv", write_csv),
+    "tdb": (".tdb", lambda timetable, path, options: write_timetable_file(timetable.data, path)),
+    "ics": (".ics", lambda timetable, path, options: write_ics(
+        timetable, path, options["semester"], calendar_name=options["name"])),
+    # The temporary output path keeps the extension, which picks the format
+    "png": (".png", lambda timetable, path, options: render_timetable(timetable, path)),
+    "pdf": (".pdf", lambda timetable, path, options: render_timetable(timetable, path)),
+}
+
+
+def output_path(path, out_dir, ext):
+    base = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(out_dir, base + ext)
+
+
+def output_format(command, path, options):
+    """Key into WRITERS for the file `command` writes from `path`."""
+    if command == "normalize":
+        return "tdb" if path.lower().endswith(".tdb") else "json"
+    return options["to"]
+
+
+def output_collisions(command, files, options):
+    """(output, inputs) for every output file that more than one input would be written to."""
+    inputs = {}
+    for path in files:
+        dest = output_path(path, options["out_dir"], WRITERS[output_format(command, path, options)][0])
+        sources = inputs.setdefault(os.path.normcase(os.path.abspath(dest)), (dest, {}))[1]
+        sources.setdefault(os.path.normcase(os.path.abspath(path)), path)
+    return [(dest, list(sources.values())) for dest, sources in inputs.values() if len(sources) > 1]
+
+
+def process_file(job):
+    """Run one command on one file; always returns a report entry instead of raising."""
+    command, path, options = job
+    entry = {"file": path, "status": "ok", "problems": [], "conflicts": [], "output": None}
+    days, slots_info = _grid
+    try:
+        if path.lower().endswith(".tdb"):
+            raw = to_json_dict(read_timetable_file(path))
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        entry.update(status="error", problems=[str(e)])
+        return entry
+
+    data, problems = check_timetable(raw, days, slots_info)
+    entry["problems"] = problems
+    if problems:
+        entry["status"] = "invalid"
+        if command != "validate":
+            return entry
+
+    timetable = Timetable(days, slots_info)
+    timetable.load({(d, s): normalize_course(val, slots_info[s][2]) for (d, s), val in data.items()})
+    if options.get("semester"):
+        entry["conflicts"] = [f"{days[a[0]]} {minutes_to_hhmm(slots_info[a[1]][1])} runs into "
+                              f"{days[b[0]]} {minutes_to_hhmm(slots_info[b[1]][1])}, first on {day}"
+                              for a, b, day in dated_conflicts(timetable, options["semester"])]
+    else:
+        entry["conflicts"] = [f"{days[a[0]]} {minutes_to_hhmm(slots_info[a[1]][1])} runs into "
+                              f"{days[b[0]]} {minutes_to_hhmm(slots_info[b[1]][1])}"
+                              for a, b in timetable.course_conflicts()]
+    if command == "validate":
+        return entry
+
+    ext, writer = WRITERS[output_format(command, path, options)]
+    dest = path if options["in_place"] else output_path(path, options["out_dir"], ext)
+    try:
+        root, ext = os.path.splitext(dest)
+        tmp = root + ".tmp" + ext
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        writer(timetable, tmp, {**options, "name": os.path.basename(root)})
+        os.replace(tmp, dest)
+    except (OSError, sqlite3.Error, ImportError) as e:
+        entry.update(status="error", problems=[str(e)])
+        return entry
+    entry["output"] = dest
+    return entry
+
+
+def run(command, files, options, jobs=None, grid=None):
+    """Process `files` and return the report entries in input order."""
+    grid = grid or (DAYS, SLOTS_INFO)
+    job_list = [(command, path, options) for path in files]
+    if jobs == 1 or len(job_list) <= 1:
+        _init_worker(grid)
+        return [process_file(job) for job in job_list]
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(grid,)) as pool:
+        return list(pool.map(process_file, job_list, chunksize=max(1, len(job_list) // (jobs * 4))))
+
+
+def print_report(report, out=sys.stdout):
+    for entry in report:
+        line = f"{entry['file']}: {entry['status']}"
+        if entry["conflicts"]:
+            line += f", {len(entry['conflicts'])} conflict(s)"
+        if entry["output"] and entry["output"] != entry["file"]:
+            line += f" -> {entry['output']}"
+        print(line, file=out)
+        for message in entry["problems"] + entry["conflicts"]:
+            print(f"    {message}", file=out)
+    failed = sum(1 for entry in report if entry["status"] != "ok")
+    print(f"{len(report)} file(s), {failed} failed", file=out)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch tools for timetable files.")
+    shared = argparse.ArgumentParser(add_help=False)
+    shared.add_argument("--report", help="also write the report as JSON to this file")
+    shared.add_argument("--grid", default=os.environ.get("SCHEDULER_GRID"),
+                        help="grid definition file (default: $SCHEDULER_GRID)")
+    common = argparse.ArgumentParser(add_help=False, parents=[shared])
+    common.add_argument("paths", nargs="+", help="timetable files or directories of them")
+    common.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    semester = argparse.ArgumentParser(add_help=False)
+    semester.add_argument("--start", help="first day of the semester, YYYY-MM-DD")
+    semester.add_argument("--end", help="last day of the semester, YYYY-MM-DD")
+    semester.add_argument("--holidays", default="",
+                          help="comma-separated YYYY-MM-DD dates without classes")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("validate", parents=[common, semester],
+                   help="check files and report conflicts (on real dates, given a semester)")
+
+    normalize = sub.add_parser("normalize", parents=[common], help="rewrite files in canonical form")
+    target = normalize.add_mutually_exclusive_group(required=True)
+    target.add_argument("-o", "--out-dir")
+    target.add_argument("--in-place", action="store_true")
+
+    convert = sub.add_parser("convert", parents=[common, semester],
+                             help="export files to another format (ics needs a semester)")
+    convert.add_argument("--to", choices=sorted(WRITERS), required=True)
+    convert.add_argument("-o", "--out-dir", required=True)
+
+    clashes = sub.add_parser("clashes", parents=[shared],
+                             help="find instructor and room double-bookings across all files")
+    clashes.add_argument("paths", nargs="*", help="timetable files or directories of them")
+    clashes.add_argument("--catalog", help="also check every section of this catalog database")
+
+    serve = sub.add_parser("serve", help="run a sync server the GUI can share timetables through")
+    serve.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    return parser
+
+
+def parse_semester(start, end, holidays=""):
+    """Semester from --start/--end/--holidays values; None if neither date is given."""
+    if start is None and end is None:
+        return None
+    if start is None or end is None:
+        raise ValueError("--start and --end must be given together")
+    return Semester(date.fromisoformat(start), date.fromisoformat(end),
+                    [date.fromisoformat(day.strip()) for day in holidays.split(",") if day.strip()])
+
+
+def run_clashes(paths, catalog_path, grid, report_path):
+    """Cross-file instructor/room clash check; exit status 1 if any clash is found."""
+    days, slots_info = grid or (DAYS, SLOTS_INFO)
+    files = expand_paths(paths)
+    loaded, errors = load_timetable_files(files, days, slots_info)
+    bookings = []
+    for path, data in loaded:
+        bookings.extend(timetable_bookings(data, days, slots_info, path))
+    if catalog_path:
+        try:
+            with CatalogStore(catalog_path) as store:
+                bookings.extend(catalog_bookings(store))
+        except sqlite3.Error as e:
+            print(f"cannot read catalog {catalog_path}: {e}", file=sys.stderr)
+            return 2
+
+    clashes = find_clashes(bookings)
+    for path, message in errors:
+        print(f"{path}: {message}", file=sys.stderr)
+    for clash in clashes:
+        print(clash.describe())
+    print(f"{len(bookings)} booking(s) checked, {len(clashes)} clash(es)")
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump({"errors": [{"file": p, "message": m} for p, m in errors],
+                       "clashes": [clash.as_dict() for clash in clashes]},
+                      f, indent=4, ensure_ascii=False)
+    return 1 if clashes else 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        return run_server(args.host, args.port)
+    grid = None
+    if args.grid:
+        try:
+            grid = load_grid(args.grid)
+        except (OSError, ValueError) as e:
+            print(f"cannot load grid {args.grid}: {e}", file=sys.stderr)
+            return 2
+    if args.command == "clashes":
+        return run_clashes(args.paths, args.catalog, grid, args.report)
+    options = {"in_place": getattr(args, "in_place", False),
+               "out_dir": getattr(args, "out_dir", None),
+               "to": getattr(args, "to", None)}
+    try:
+        options["semester"] = parse_semester(getattr(args, "start", None), getattr(args, "end", None),
+                                             getattr(args, "holidays", ""))
+    except ValueError as e:
+        print(f"invalid semester: {e}", file=sys.stderr)
+        return 2
+    if options["to"] == "ics" and options["semester"] is None:
+        print("ics export needs --start and --end dates", file=sys.stderr)
+        return 2
+    files = expand_paths(args.paths)
+    if options["out_dir"]:
+        # Outputs are named after the input's basename only, so one would overwrite the other
+        collisions = output_collisions(args.command, files, options)
+        for dest, sources in collisions:
+            print(f"{dest} would be written from each of: {', '.join(sources)}", file=sys.stderr)
+        if collisions:
+            return 2
+        os.makedirs(options["out_dir"], exist_ok=True)
+
+    report = run(args.command, files, options, args.jobs, grid)
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 1 if any(entry["status"] != "ok" for entry in report) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Prefix indexes for course and instructor autocompletion.
+
+Each index is a sorted list of lowercase keys, one per word suffix of a term
+("Data Structures" is found by "da..." and "str..."), so a lookup is one
+bisect plus a short scan. Indexes are built from the catalog store and cached
+on disk next to it, keyed by the store's id and import generation.
+"""
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left
+
+from catalog import DEFAULT_CATALOG_PATH, CatalogStore
+
+
+class PrefixIndex:
+    def __init__(self, terms=(), keys=None, values=None):
+        if keys is not None:
+            # Already sorted, e.g. from the disk cache
+            self.keys, self.values = keys, values
+            return
+        entries = set()
+        for term in terms:
+            words = term.split()
+            for i in range(len(words)):
+                entries.add((" ".join(words[i:]).casefold(), term.strip()))
+        entries = sorted(entries)
+        self.keys = [key for key, _ in entries]
+        self.values = [value for _, value in entries]
+
+    def complete(self, prefix, limit=10):
+        prefix = prefix.strip().casefold()
+        if not prefix:
+            return []
+        results = []
+        for i in range(bisect_left(self.keys, prefix), len(self.keys)):
+            if len(results) >= limit or not self.keys[i].startswith(prefix):
+                break
+            if self.values[i] not in results:
+                results.append(self.values[i])
+        return results
+
+
+class CatalogCompletions:
+    def __init__(self, courses, instructors):
+        self.courses = courses
+        self.instructors = instructors
+
+
+def load_completions(catalog_path=DEFAULT_CATALOG_PATH):
+    """Completions for the catalog at `catalog_path`, from the disk cache when fresh."""
+    cache_path = catalog_path + ".completion.json"
+    with CatalogStore(catalog_path) as store:
+        version = [store.store_id(), store.generation()]
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == version:
+                return CatalogCompletions(PrefixIndex(**cached["courses"]),
+                                          PrefixIndex(**cached["instructors"]))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        course_terms, instructor_terms = store.completion_terms()
+
+    completions = CatalogCompletions(PrefixIndex(course_terms), PrefixIndex(instructor_terms))
+    try:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": version,
+                       "courses": {"keys": completions.courses.keys,
+                                   "values": completions.courses.values},
+                       "instructors": {"keys": completions.instructors.keys,
+                                       "values": completions.instructors.values}}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return completions
+
+
+class CompletionLoader:
+    """Loads completions on a background thread; lookups return nothing until ready."""
+
+    def __init__(self, catalog_path=DEFAULT_CATALOG_PATH):
+        self.catalog_path = catalog_path
+        self.completions = None
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def start(self):
+        if os.path.exists(self.catalog_path):
+            with self._lock:
+                self._requests += 1
+                request = self._requests
+            threading.Thread(target=self._load, args=(request,), daemon=True).start()
+
+    def _load(self, request):
+        try:
+            completions = load_completions(self.catalog_path)
+        except (OSError, sqlite3.Error):
+            completions = None
+        with self._lock:
+            # A later start() may already have finished; an older catalog must not replace it
+            if request == self._requests:
+                self.completions = completions
+
+    def courses(self, prefix):
+        completions = self.completions
+        return completions.courses.complete(prefix) if completions else []
+
+    def instructors(self, prefix):
+        completions = self.completions
+        return completions.instructors.complete(prefix) if completions else []
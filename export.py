@@ -0,0 +1,170 @@
+"""
+Exporting timetables as images, PDF documents and iCalendar files.
+
+PNG and PDF output is rendered from a ScheduleWidget that is never shown,
+so it works on the offscreen Qt platform without a display; PyQt5 is only
+imported when rendering. ICS export needs no Qt: every course becomes one
+weekly recurring event over a semester, with all the days its
+repeat_pattern puts it on; weeks its pattern skips and holidays become
+EXDATEs of that event.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, time, timedelta, timezone
+
+from recurrence import DAY_START, WEEKDAY_NAMES as WEEKDAYS, entry_recurrence
+from timetable import Timetable, default_duration
+
+ICS_DAY_CODES = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+def _ics_escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;")
+            .replace(",", "\\,").replace("\n", "\\n"))
+
+
+def _ics_fold(line):
+    """Split a content line into 75-octet pieces as RFC 5545 requires."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line
+    pieces = []
+    while raw:
+        limit = 75 if not pieces else 74
+        cut = min(limit, len(raw))
+        # Never split a UTF-8 sequence
+        while cut < len(raw) and (raw[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(raw[:cut].decode("utf-8"))
+        raw = raw[cut:]
+    return "\r\n ".join(pieces)
+
+
+def _ics_time(dt):
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+
+def course_series(timetable):
+    """
+    Group filled slots into weekly series: courses with identical data in
+    the same slot (as written by a repeat pattern) share one series.
+    Yields (slot_idx, course data, weekday numbers).
+    """
+    groups = {}
+    for (d, s), val in sorted(timetable.items()):
+        if not val or timetable.days[d] not in WEEKDAYS:
+            continue
+        key = (s, json.dumps(val, sort_keys=True))
+        groups.setdefault(key, (s, val, []))[2].append(WEEKDAYS.index(timetable.days[d]))
+    return list(groups.values())
+
+
+def _weekly_mask(semester, weekdays):
+    """Every date of the semester that falls on one of `weekdays`, as a Semester date mask."""
+    mask = 0
+    for weekday in weekdays:
+        for n in range((weekday - semester.first_day.weekday()) % 7, semester.length, 7):
+            mask |= 1 << n
+    return mask
+
+
+def timetable_to_ics(timetable, semester, calendar_name="Timetable"):
+    """iCalendar text for `timetable` over a recurrence.Semester."""
+    stamp = _ics_time(datetime.now(timezone.utc)) + "Z"
+    lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//CUHK(SZ) Course Scheduler//EN",
+             "CALSCALE:GREGORIAN", f"X-WR-CALNAME:{_ics_escape(calendar_name)}"]
+
+    for slot_idx, val, weekdays in course_series(timetable):
+        recurrence = entry_recurrence(val)
+        mask = 0
+        for weekday in weekdays:
+            mask |= semester.date_mask(recurrence, weekday)
+        if not mask:
+            continue
+        first_n, last_n = (mask & -mask).bit_length() - 1, mask.bit_length() - 1
+        # Weekly dates between the first and last meeting that the course skips
+        span = ((1 << (last_n + 1)) - 1) ^ ((1 << first_n) - 1)
+        skipped = _weekly_mask(semester, weekdays) & span & ~mask
+
+        _, offset, is_lecture = timetable.slots_info[slot_idx]
+        start = datetime.combine(semester.date(first_n), DAY_START) + timedelta(minutes=offset)
+        end = start + timedelta(minutes=int(val.get("duration", default_duration(is_lecture))))
+        until = _ics_time(datetime.combine(semester.date(last_n), time(23, 59, 59)))
+        days = ",".join(ICS_DAY_CODES[w] for w in sorted(weekdays))
+        uid = hashlib.sha1(f"{slot_idx}|{days}|{json.dumps(val, sort_keys=True)}".encode()).hexdigest()
+        description = "\n".join(text for text in (val.get("instructor_name", ""), val.get("remarks", ""))
+                                if str(text).strip())
+
+        lines += ["BEGIN:VEVENT",
+                  f"UID:{uid}@cuhksz-scheduler",
+                  f"DTSTAMP:{stamp}",
+                  f"DTSTART:{_ics_time(start)}",
+                  f"DTEND:{_ics_time(end)}",
+                  f"RRULE:FREQ=WEEKLY;BYDAY={days};UNTIL={until}"]
+        if skipped:
+            lines.append("EXDATE:" + ",".join(
+                _ics_time(datetime.combine(day, start.time())) for day in semester.dates(skipped)))
+        lines.append(f"SUMMARY:{_ics_escape(val.get('course_name', ''))}")
+        if description:
+            lines.append(f"DESCRIPTION:{_ics_escape(description)}")
+        lines.append("END:VEVENT")
+    lines.append("END:VCALENDAR")
+    return "\r\n".join(_ics_fold(line) for line in lines) + "\r\n"
+
+
+def write_ics(timetable, path, semester, calendar_name=None):
+    name = calendar_name or os.path.splitext(os.path.basename(path))[0]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(timetable_to_ics(timetable, semester, calendar_name=name))
+
+
+# The QApplication created for rendering; it must outlive every widget, so it is never dropped
+_qt_app = None
+
+
+def ensure_qt_app():
+    """The running QApplication, or a new one on the offscreen platform."""
+    global _qt_app
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance()
+    if app is None:
+        app = _qt_app = QApplication(["export"])
+    return app
+
+
+def render_timetable(timetable, path, scale=2.0):
+    """Render `timetable` to a .png or .pdf file; the format follows the extension."""
+    ensure_qt_app()
+    from PyQt5 import sip
+    from PyQt5.QtCore import Qt, QPoint, QMarginsF
+    from PyQt5.QtGui import QPainter, QPdfWriter, QPixmap, QPageLayout, QPageSize
+    from main import create_schedule_widget
+
+    # A private copy, so rendering never touches the caller's model or history
+    copy = Timetable(timetable.days, timetable.slots_info)
+    copy.load(dict(timetable.items()))
+    widget = create_schedule_widget(copy, single_canvas=True)
+    try:
+        if path.lower().endswith(".pdf"):
+            writer = QPdfWriter(path)
+            writer.setPageLayout(QPageLayout(QPageSize(QPageSize.A4), QPageLayout.Landscape,
+                                             QMarginsF(10, 10, 10, 10), QPageLayout.Millimeter))
+            writer.setResolution(150)
+            painter = QPainter(writer)
+            page = painter.viewport()
+            factor = min(page.width() / widget.width(), page.height() / widget.height())
+            painter.scale(factor, factor)
+            widget.render(painter, QPoint())
+            painter.end()
+        else:
+            pixmap = QPixmap(round(widget.width() * scale), round(widget.height() * scale))
+            pixmap.setDevicePixelRatio(scale)
+            pixmap.fill(Qt.white)
+            widget.render(pixmap)
+            if not pixmap.save(path, "PNG"):
+                raise OSError(f"could not write {path}")
+    finally:
+        # Batch workers run no event loop, so deleteLater() would never free the widget
+        sip.delete(widget)
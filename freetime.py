@@ -0,0 +1,146 @@
+"""
+Common free time across many timetables.
+
+Every timetable is packed into an OccupancyGrid week mask; unpacked into an
+(n, days, bins) array the number of people busy in each bin is one sum over
+the first axis. Free windows are then the runs of bins where at least k
+people are free, found per day with array diffs for every distinct k.
+"""
+import json
+import sqlite3
+from math import ceil
+
+from autosave import read_timetable_file
+from occupancy import OccupancyGrid, np, WINDOW_MINUTES
+from timetable import check_timetable, default_duration
+
+
+class FreeWindow:
+    __slots__ = ("day_idx", "start", "end", "free")
+
+    def __init__(self, day_idx, start, end, free):
+        self.day_idx = day_idx
+        self.start = start
+        self.end = end
+        self.free = free
+
+    @property
+    def length(self):
+        return self.end - self.start
+
+    def __repr__(self):
+        return f"FreeWindow(day_idx={self.day_idx}, start={self.start}, end={self.end}, free={self.free})"
+
+
+def load_timetable_files(paths, days, slots_info):
+    """
+    Read .json/.tdb timetable files; return ([(path, timetable_data)], list
+    of (path, message) errors). Invalid entries are dropped, not fatal.
+    """
+    loaded = []
+    errors = []
+    for path in paths:
+        try:
+            if path.lower().endswith(".tdb"):
+                raw = {f"{d},{s}": val for (d, s), val in read_timetable_file(path).items()}
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            errors.append((path, str(e)))
+            continue
+        data, problems = check_timetable(raw, days, slots_info)
+        errors.extend((path, message) for message in problems)
+        loaded.append((path, data))
+    return loaded, errors
+
+
+def grid_for(timetables, days, slots_info):
+    """The coarsest OccupancyGrid that is exact for every course in `timetables`."""
+    minutes = set()
+    window = WINDOW_MINUTES
+    for data in timetables:
+        for (d, s), val in data.items():
+            _, start, is_lecture = slots_info[s]
+            end = start + int(val.get("duration", default_duration(is_lecture)))
+            minutes.update((start, end))
+            window = max(window, end)
+    return OccupancyGrid.exact_for(minutes, days=len(days), window=window)
+
+
+def busy_counts(grid, masks, chunk=256):
+    """Number of timetables busy in every (day, bin), as a (days, bins) array or nested list."""
+    if np is not None:
+        counts = np.zeros((grid.days, grid.bins), dtype=np.int32)
+        # Chunks bound the size of the unpacked boolean array
+        for i in range(0, len(masks), chunk):
+            counts += grid.to_array(masks[i:i + chunk]).sum(axis=0, dtype=np.int32)
+        return counts
+    counts = [[0] * grid.bins for _ in range(grid.days)]
+    for mask in masks:
+        for d in range(grid.days):
+            day = grid.day_mask(mask, d)
+            while day:
+                low = day & -day
+                counts[d][low.bit_length() - 1] += 1
+                day ^= low
+    return counts
+
+
+def _runs(flags):
+    """[start, end) bin ranges where flags is true."""
+    if np is not None:
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+        return zip(edges[::2].tolist(), edges[1::2].tolist())
+    runs = []
+    start = None
+    for i, flag in enumerate(list(flags) + [False]):
+        if flag and start is None:
+            start = i
+        elif not flag and start is not None:
+            runs.append((start, i))
+            start = None
+    return runs
+
+
+def free_windows(grid, counts, total, min_minutes=30, min_free=1, limit=50):
+    """
+    Maximal windows of at least `min_minutes` in which at least `min_free`
+    of `total` people are free, best first (most people free, then longest).
+    A window is reported at the largest k for which it is a whole run of
+    "at least k free", so nested windows with more people free appear
+    separately instead of being merged into one.
+    """
+    min_bins = max(1, ceil(min_minutes / grid.resolution))
+    windows = []
+    for d in range(grid.days):
+        if np is not None:
+            free = total - np.asarray(counts[d])
+            levels = np.unique(free[free >= min_free])[::-1].tolist()
+        else:
+            free = [total - c for c in counts[d]]
+            levels = sorted({f for f in free if f >= min_free}, reverse=True)
+        for k in levels:
+            flags = free >= k if np is not None else [f >= k for f in free]
+            for start, end in _runs(flags):
+                if end - start < min_bins or min(free[start:end]) != k:
+                    continue
+                windows.append(FreeWindow(d, start * grid.resolution,
+                                          min(end * grid.resolution, grid.window), k))
+    windows.sort(key=lambda w: (-w.free, -w.length, w.day_idx, w.start))
+    return windows[:limit]
+
+
+def common_free_time(timetables, days, slots_info, min_minutes=30, min_free=1, limit=50,
+                     semester=None, week=None):
+    """
+    Occupancy counts and ranked free windows for a list of timetable_data
+    dicts. Returns (grid, busy counts, windows). Given a recurrence.Semester
+    and a week number, only courses meeting in that week count as busy.
+    """
+    if semester is not None and week is not None:
+        timetables = [semester.week_entries(days, data, week) for data in timetables]
+    grid = grid_for(timetables, days, slots_info)
+    masks = [grid.timetable_mask(data, slots_info) for data in timetables]
+    counts = busy_counts(grid, masks)
+    return grid, counts, free_windows(grid, counts, len(timetables), min_minutes, min_free, limit)
@@ -0,0 +1,259 @@
+"""
+Conflict-free schedule generation over a course/section catalog.
+
+A catalog file is a JSON list of wanted courses, each with its candidate
+sections. A section has a lecture and optionally a tutorial; a meeting either
+repeats on the weekdays of its repeat_pattern (see recurrence.py) or names a
+single "day":
+
+    [
+        {
+            "course_code": "CSC3100",
+            "course_name": "Data Structures",
+            "sections": [
+                {
+                    "section": "L01",
+                    "instructor_name": "Dr. Li",
+                    "lecture": {"slot": 1, "repeat_pattern": "MoWe", "duration": "80", "room": "TB101"},
+                    "tutorial": {"day": 4, "slot": 5, "duration": "50"}
+                }
+            ]
+        }
+    ]
+
+"room" is optional on every meeting. Catalog "slot" and "day" numbers always
+refer to the default grid (timetable.SLOTS_INFO, and "day" from 0 for Monday
+to 6 for Sunday, as are repeat_pattern weekdays), so a
+catalog means the same times whatever grid the GUI shows; schedule_to_data
+places meetings on another grid by weekday name and start time.
+"""
+import json
+
+from occupancy import OccupancyGrid
+from recurrence import WEEKDAY_NAMES, parse_pattern
+from timetable import DAYS, SLOTS_INFO, default_duration
+
+
+class CatalogError(ValueError):
+    pass
+
+
+class Meeting:
+    """One class meeting of a section on one day."""
+    __slots__ = ("kind", "day_idx", "slot_idx", "start", "end", "duration", "repeat_pattern", "room")
+
+    def __init__(self, kind, day_idx, slot_idx, duration, repeat_pattern="None", room=""):
+        self.kind = kind
+        self.day_idx = day_idx
+        self.slot_idx = slot_idx
+        self.duration = duration
+        self.start = SLOTS_INFO[slot_idx][1]
+        self.end = self.start + duration
+        self.repeat_pattern = repeat_pattern
+        self.room = room
+
+    def overlaps(self, other):
+        return (self.day_idx == other.day_idx
+                and self.start < other.end and other.start < self.end)
+
+
+class Section:
+    def __init__(self, course_code, course_name, section, instructor_name, meetings):
+        self.course_code = course_code
+        self.course_name = course_name
+        self.section = section
+        self.instructor_name = instructor_name
+        self.meetings = meetings
+
+    def __repr__(self):
+        return f"Section({self.course_code!r}, {self.section!r})"
+
+    def clashes_with(self, other):
+        return any(a.overlaps(b) for a in self.meetings for b in other.meetings)
+
+    def clashes_with_itself(self):
+        return any(a.overlaps(b)
+                   for i, a in enumerate(self.meetings)
+                   for b in self.meetings[i + 1:])
+
+    def course_data(self):
+        """Yield ((day_idx, slot_idx), data) pairs in the CourseDialog data format."""
+        for m in self.meetings:
+            yield (m.day_idx, m.slot_idx), {
+                "course_name": self.course_code or self.course_name,
+                "instructor_name": self.instructor_name,
+                "remarks": f"{m.kind.capitalize()} {self.section}".strip(),
+                "duration": str(m.duration),
+                "repeat_pattern": m.repeat_pattern,
+                "room": m.room
+            }
+
+
+class Course:
+    def __init__(self, course_code, course_name, sections):
+        self.course_code = course_code
+        self.course_name = course_name
+        self.sections = sections
+
+
+def _parse_meetings(kind, raw):
+    if not isinstance(raw, dict):
+        raise CatalogError(f"{kind} must be an object")
+    slot_idx = raw.get("slot")
+    if not isinstance(slot_idx, int) or not 0 <= slot_idx < len(SLOTS_INFO):
+        raise CatalogError(f"{kind} has invalid slot {slot_idx!r}")
+    pattern = raw.get("repeat_pattern", "None")
+    try:
+        recurrence = parse_pattern(pattern)
+    except ValueError as e:
+        raise CatalogError(f"{kind} has invalid repeat_pattern {pattern!r}: {e}")
+    try:
+        duration = int(raw.get("duration", default_duration(SLOTS_INFO[slot_idx][2])))
+    except (TypeError, ValueError):
+        raise CatalogError(f"{kind} has invalid duration {raw.get('duration')!r}")
+    if duration <= 0:
+        raise CatalogError(f"{kind} has invalid duration {duration}")
+
+    # Week rules are ignored here: sections clash if they share a weekly slot.
+    # Weekend meetings are kept; schedule_to_data reports them if the grid has no weekend.
+    days = list(recurrence.weekdays)
+    if not days:
+        day_idx = raw.get("day")
+        if not isinstance(day_idx, int) or not 0 <= day_idx < len(WEEKDAY_NAMES):
+            raise CatalogError(f"{kind} without repeat pattern weekdays needs a \"day\" from 0 (Monday) "
+                               f"to 6 (Sunday), not {day_idx!r}")
+        days = [day_idx]
+    room = str(raw.get("room", "")).strip()
+    return [Meeting(kind, d, slot_idx, duration, pattern, room) for d in days]
+
+
+def parse_catalog(raw):
+    """Build Course objects from the decoded catalog JSON."""
+    if not isinstance(raw, list):
+        raise CatalogError("catalog must be a list of courses")
+    courses = []
+    for entry in raw:
+        if not isinstance(entry, dict):
+            raise CatalogError("each course must be an object")
+        code = entry.get("course_code", "")
+        name = entry.get("course_name", "")
+        if not (code or name):
+            raise CatalogError("course needs a course_code or course_name")
+        sections = []
+        for sec in entry.get("sections", []):
+            if not isinstance(sec, dict):
+                raise CatalogError(f"{code or name}: each section must be an object")
+            label = sec.get("section", "")
+            try:
+                meetings = _parse_meetings("lecture", sec.get("lecture"))
+                if sec.get("tutorial"):
+                    meetings += _parse_meetings("tutorial", sec["tutorial"])
+            except CatalogError as e:
+                raise CatalogError(f"{code or name} {label}: {e}")
+            sections.append(Section(code, name, label, sec.get("instructor_name", ""), meetings))
+        courses.append(Course(code, name, sections))
+    return courses
+
+
+def load_catalog(path):
+    with open(path, "r") as f:
+        return parse_catalog(json.load(f))
+
+
+def iter_schedules(courses, cancel=None):
+    """
+    Lazily yield every conflict-free choice of one section per course, as a
+    list of Sections in the order of `courses`.
+
+    Every section is encoded as a week occupancy mask on a grid exact for
+    the catalog, and all sections are compared pairwise once up front, in
+    one OccupancyGrid.disjoint_sets call. The search then always branches on the course with the fewest
+    remaining options and, after each choice, drops every option that clashes
+    with it, backtracking as soon as some course is left with none. `cancel`
+    is anything with an is_set() method (e.g. threading.Event) and is checked
+    at every search node.
+    """
+    grid = OccupancyGrid.exact_for(
+        [t for c in courses for sec in c.sections for m in sec.meetings for t in (m.start, m.end)],
+        days=len(WEEKDAY_NAMES))
+
+    flat = []
+    masks = []
+    domains = []
+    for course_idx, course in enumerate(courses):
+        options = []
+        for section in course.sections:
+            if not section.clashes_with_itself():
+                options.append(len(flat))
+                flat.append(section)
+                masks.append(grid.section_mask(section))
+        domains.append((course_idx, options))
+
+    # Sections of different courses that share no occupied bin
+    compatible = grid.disjoint_sets(masks)
+    for _, options in domains:
+        for k in options:
+            compatible[k].difference_update(options)
+
+    chosen = [None] * len(courses)
+
+    def search(remaining):
+        if not remaining:
+            yield [flat[k] for k in chosen]
+            return
+        i = min(range(len(remaining)), key=lambda i: len(remaining[i][1]))
+        course_idx, options = remaining[i]
+        rest = remaining[:i] + remaining[i + 1:]
+        for k in options:
+            if cancel is not None and cancel.is_set():
+                return
+            ok = compatible[k]
+            pruned = []
+            for other_idx, other_opts in rest:
+                kept = [o for o in other_opts if o in ok]
+                if not kept:
+                    break
+                pruned.append((other_idx, kept))
+            else:
+                chosen[course_idx] = k
+                yield from search(pruned)
+
+    if courses and all(options for _, options in domains):
+        yield from search(domains)
+
+
+def grid_position(meeting, days=DAYS, slots_info=SLOTS_INFO):
+    """(day_idx, slot_idx) of the slot of a days/slots_info grid where `meeting` starts, or None."""
+    name = WEEKDAY_NAMES[meeting.day_idx]
+    if name in days:
+        day_idx = days.index(name)
+    elif all(day not in WEEKDAY_NAMES for day in days) and meeting.day_idx < len(days):
+        # A grid of custom column names: columns count from Monday
+        day_idx = meeting.day_idx
+    else:
+        return None
+    for slot_idx, (_, start, _) in enumerate(slots_info):
+        if start == meeting.start:
+            return day_idx, slot_idx
+    return None
+
+
+def schedule_to_data(schedule, days=DAYS, slots_info=SLOTS_INFO):
+    """
+    Turn a generated schedule into a timetable_data-style dict for a
+    days/slots_info grid. Raises CatalogError if some meeting has no slot
+    of its own there.
+    """
+    data = {}
+    missing = []
+    for section in schedule:
+        for meeting, (_, course_data) in zip(section.meetings, section.course_data()):
+            key = grid_position(meeting, days, slots_info)
+            if key is None:
+                missing.append(f"{section.course_code} {section.section} {meeting.kind} "
+                               f"({WEEKDAY_NAMES[meeting.day_idx]} {SLOTS_INFO[meeting.slot_idx][0]})")
+            else:
+                data[key] = course_data
+    if missing:
+        raise CatalogError("no slot in this grid for " + ", ".join(missing))
+    return data
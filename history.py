@@ -0,0 +1,92 @@
+"""
+Undo/redo for Timetable edits.
+
+A step is a diff {(day_idx, slot_idx): (old, new)} of the slots it changed.
+Course dicts are never mutated once stored, so both sides are references to
+the same objects the timetable holds and no copies are made. Everything
+written inside one Timetable.batch() becomes a single step.
+"""
+from collections import deque
+from contextlib import contextmanager
+
+
+class UndoHistory:
+    def __init__(self, limit=200):
+        # Oldest steps fall off the end once there are more than `limit`
+        self._undo = deque(maxlen=limit)
+        self._redo = []
+        self._step = None
+        self._depth = 0
+        self._suspended = 0
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, key, old, new):
+        """Note that a slot changed from `old` to `new` (None for an empty slot)."""
+        if self._suspended:
+            return
+        if self._step is not None:
+            if key in self._step:
+                old = self._step[key][0]
+            self._step[key] = (old, new)
+        elif old is not new:
+            self._push({key: (old, new)})
+
+    def begin(self):
+        if self._depth == 0:
+            self._step = {}
+        self._depth += 1
+
+    def end(self):
+        self._depth -= 1
+        if self._depth == 0:
+            step, self._step = self._step, None
+            step = {key: pair for key, pair in step.items() if pair[0] is not pair[1]}
+            if step:
+                self._push(step)
+
+    @contextmanager
+    def group(self):
+        """Record everything inside the block as one step."""
+        self.begin()
+        try:
+            yield
+        finally:
+            self.end()
+
+    @contextmanager
+    def suspended(self):
+        """Apply changes without recording them, e.g. while undoing."""
+        self._suspended += 1
+        try:
+            yield
+        finally:
+            self._suspended -= 1
+
+    def _push(self, step):
+        self._undo.append(step)
+        self._redo.clear()
+
+    def undo(self):
+        """Pop the last step; return {slot: data to restore} (None clears the slot)."""
+        if not self._undo:
+            return {}
+        step = self._undo.pop()
+        self._redo.append(step)
+        return {key: old for key, (old, _) in step.items()}
+
+    def redo(self):
+        """Re-apply the last undone step; return {slot: data to restore}."""
+        if not self._redo:
+            return {}
+        step = self._redo.pop()
+        self._undo.append(step)
+        return {key: new for key, (_, new) in step.items()}
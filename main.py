@@ -1,25 +1,51 @@
+import os
 import sys
 import json
+import sqlite3
+import threading
+import time
+import weakref
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import date
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel,
-    QDialog, QHBoxLayout, QLineEdit, QTextEdit, QMenuBar, QAction, QFileDialog,
-    QMessageBox, QComboBox, QPushButton
+    QDialog, QHBoxLayout, QLineEdit, QTextEdit, QAction, QFileDialog,
+    QMessageBox, QComboBox, QPushButton, QListWidget, QSpinBox, QDoubleSpinBox,
+    QInputDialog, QCompleter, QToolTip, QScrollArea, QDateEdit, QDockWidget, QListWidgetItem
 )
-from PyQt5.QtGui import QFont, QPainter, QPen, QColor, QBrush
+from PyQt5.QtGui import QFont, QPainter, QPen, QColor, QBrush, QPixmap, QKeySequence, QRegion, QIcon
 from PyQt5.QtCore import (
-    Qt, QPropertyAnimation, pyqtProperty, QRect, QEasingCurve
+    Qt, QRect, QRectF, QEasingCurve, QThread, pyqtSignal,
+    QStringListModel, QEvent, QObject, QTimer, QElapsedTimer, QDate, QFileSystemWatcher, QSize
 )
 
-REPEAT_PATTERNS = {
-    "None": [],
-    "MoWe": [0, 2],      
-    "TuTh": [1, 3],     
-    "MoWeFr": [0, 2, 4]
-}
+from timetable import (
+    Timetable, DAYS, WEEK_DAYS, REPEAT_PATTERNS, default_duration, minutes_to_hhmm, load_grid,
+    check_timetable, to_json_dict, diff_data
+)
+from generator import CatalogError, load_catalog, iter_schedules, schedule_to_data
+from search import Preferences, iter_top_k
+from catalog import CatalogStore, busy_intervals
+from completion import CompletionLoader
+from recurrence import Semester, parse_pattern, target_days
+from export import render_timetable, write_ics
+from freetime import common_free_time, load_timetable_files
+from clashes import catalog_bookings, find_clashes, timetable_bookings
+from profiling import Profiler
+from autosave import Autosaver, DEFAULT_AUTOSAVE_PATH, write_timetable_file
+from workspace import Workspace
+from sync import DEFAULT_HOST, DEFAULT_PORT, SyncClient, parse_address
 
 
 class CourseDialog(QDialog):
-    def __init__(self, parent=None, existing_data=None, is_lecture=True):
+    """
+    Add/edit dialog for one slot. MainWindow keeps a single instance and
+    re-populates it for every edit, so its widgets are only built once.
+    """
+    DURATIONS = ["50", "80", "110"]
+
+    def __init__(self, parent=None, existing_data=None, is_lecture=True, completion_source=None):
         super().__init__(parent)
         self.setWindowTitle("Edit Course")
         self.setModal(True)
@@ -27,73 +53,55 @@ class CourseDialog(QDialog):
 
         self.course_line = QLineEdit(self)
         self.instructor_line = QLineEdit(self)
+        self.room_line = QLineEdit(self)
         self.remarks_text = QTextEdit(self)
         self.duration_combo = QComboBox(self)
-        self.duration_combo.addItems(["50", "80", "110"])
+        self.duration_combo.addItems(self.DURATIONS)
 
-        # Repeat pattern combo
+        # Repeat pattern combo; presets, or any pattern typed in
         self.repeat_combo = QComboBox(self)
-        self.repeat_combo.addItems(["None", "MoWe", "TuTh", "MoWeFr"])
-
-        default_duration = "80" if is_lecture else "50"
-        self.is_new = (not existing_data or len(existing_data) == 0)
-
-        # Fill dialog fields if editing an existing course
-        if not self.is_new:
-            self.course_line.setText(existing_data.get("course_name", ""))
-            self.instructor_line.setText(existing_data.get("instructor_name", ""))
-            self.remarks_text.setPlainText(existing_data.get("remarks", ""))
-            current_duration = existing_data.get("duration", default_duration)
-            current_pattern = existing_data.get("repeat_pattern", "None")
-        else:
-            current_duration = default_duration
-            current_pattern = "None"
-
-        self.duration_combo.setCurrentText(current_duration)
-        self.repeat_combo.setCurrentText(current_pattern)
-
+        self.repeat_combo.setEditable(True)
+        # Typed patterns are not added to the shared dialog's list
+        self.repeat_combo.setInsertPolicy(QComboBox.NoInsert)
+        self.repeat_combo.addItems(list(REPEAT_PATTERNS))
+        self.repeat_combo.setToolTip("Weekdays (e.g. MoWe), optionally with /odd, /even\n"
+                                     "or week ranges such as /w1-7,10-14")
+
+        font = QFont("Arial", 10)
         form_layout = QVBoxLayout()
-        lbl_course = QLabel("Course Name (required):")
-        lbl_course.setFont(QFont("Arial", 10))
-        form_layout.addWidget(lbl_course)
-        form_layout.addWidget(self.course_line)
-
-        lbl_instructor = QLabel("Instructor Name (optional):")
-        lbl_instructor.setFont(QFont("Arial", 10))
-        form_layout.addWidget(lbl_instructor)
-        form_layout.addWidget(self.instructor_line)
-
-        lbl_remarks = QLabel("Remarks (optional):")
-        lbl_remarks.setFont(QFont("Arial", 10))
-        form_layout.addWidget(lbl_remarks)
-        form_layout.addWidget(self.remarks_text)
-
-        lbl_duration = QLabel("Class Duration (mins):")
-        lbl_duration.setFont(QFont("Arial", 10))
-        form_layout.addWidget(lbl_duration)
-        form_layout.addWidget(self.duration_combo)
-
-        # "Repeat" selection
-        lbl_repeat = QLabel("Repeat:")
-        lbl_repeat.setFont(QFont("Arial", 10))
-        form_layout.addWidget(lbl_repeat)
-        form_layout.addWidget(self.repeat_combo)
+        for text, field in [("Course Name (required):", self.course_line),
+                            ("Instructor Name (optional):", self.instructor_line),
+                            ("Room (optional):", self.room_line),
+                            ("Remarks (optional):", self.remarks_text),
+                            ("Class Duration (mins):", self.duration_combo),
+                            ("Repeat:", self.repeat_combo)]:
+            label = QLabel(text)
+            label.setFont(font)
+            form_layout.addWidget(label)
+            form_layout.addWidget(field)
+
+        # What saving would do to other slots, updated as the combos change
+        self.preview_label = QLabel("")
+        self.preview_label.setFont(font)
+        self.preview_label.setWordWrap(True)
+        self.preview_label.setStyleSheet("color: #B00000;")
+        form_layout.addWidget(self.preview_label)
+        self._preview = None
+        self.duration_combo.currentTextChanged.connect(self.update_preview)
+        self.repeat_combo.currentTextChanged.connect(self.update_preview)
 
         btn_layout = QHBoxLayout()
         self.cancel_btn = QPushButton("Cancel")
-        self.cancel_btn.setFont(QFont("Arial", 10))
+        self.cancel_btn.setFont(font)
         btn_layout.addWidget(self.cancel_btn)
 
-        # If it's a new slot, don't show Delete
-        if not self.is_new:
-            self.delete_btn = QPushButton("Delete")
-            self.delete_btn.setFont(QFont("Arial", 10))
-            btn_layout.addWidget(self.delete_btn)
-        else:
-            self.delete_btn = None
+        # Only shown when editing an existing course
+        self.delete_btn = QPushButton("Delete")
+        self.delete_btn.setFont(font)
+        btn_layout.addWidget(self.delete_btn)
 
         self.save_btn = QPushButton("Save")
-        self.save_btn.setFont(QFont("Arial", 10))
+        self.save_btn.setFont(font)
         self.save_btn.setDefault(True)
         btn_layout.addWidget(self.save_btn)
 
@@ -101,12 +109,67 @@ class CourseDialog(QDialog):
         self.setLayout(form_layout)
 
         self.save_btn.clicked.connect(self.save_course)
-        if self.delete_btn:
-            self.delete_btn.clicked.connect(self.delete_course)
+        self.delete_btn.clicked.connect(self.delete_course)
         self.cancel_btn.clicked.connect(self.reject)
 
+        if completion_source is not None:
+            self.attach_completer(self.course_line, completion_source.courses)
+            self.attach_completer(self.instructor_line, completion_source.instructors)
+
+        self.populate(existing_data, is_lecture)
+
+    def populate(self, existing_data=None, is_lecture=True, preview=None):
+        """
+        Reset every field for editing `existing_data` (None or {} for a new
+        course). `preview(duration, pattern)` returns the text describing
+        what saving with those values would do to other slots.
+        """
+        self._preview = None
+        self.is_new = not existing_data
+        data = existing_data or {}
+        self.course_line.setText(data.get("course_name", ""))
+        self.instructor_line.setText(data.get("instructor_name", ""))
+        self.room_line.setText(data.get("room", ""))
+        self.remarks_text.setPlainText(data.get("remarks", ""))
+        duration = str(data.get("duration", "80" if is_lecture else "50"))
+        # At most one custom duration, that of the course being edited
+        while self.duration_combo.count() > len(self.DURATIONS):
+            self.duration_combo.removeItem(self.duration_combo.count() - 1)
+        if self.duration_combo.findText(duration) < 0:
+            self.duration_combo.addItem(duration)
+        self.duration_combo.setCurrentText(duration)
+        self.repeat_combo.setCurrentText(data.get("repeat_pattern", "None"))
+        self.delete_btn.setVisible(not self.is_new)
+        self.course_line.setFocus()
+
         self.saved_data = None
         self.deleted = False
+        self._preview = preview
+        self.update_preview()
+
+    def update_preview(self, _text=None):
+        text = ""
+        if self._preview is not None:
+            text = self._preview(self.duration_combo.currentText().strip(),
+                                 self.repeat_combo.currentText().strip() or "None")
+        if text != self.preview_label.text():
+            self.preview_label.setText(text)
+
+    def attach_completer(self, line_edit, lookup):
+        """Show suggestions from `lookup(prefix)` below the line edit as the user types."""
+        model = QStringListModel(self)
+        completer = QCompleter(model, self)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        # Suggestions may match a later word of the term, so don't let Qt re-filter them
+        completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        line_edit.setCompleter(completer)
+
+        def update_suggestions(text):
+            model.setStringList(lookup(text))
+            if model.rowCount():
+                completer.complete()
+
+        line_edit.textEdited.connect(update_suggestions)
 
     def save_course(self):
         course_name = self.course_line.text().strip()
@@ -114,13 +177,20 @@ class CourseDialog(QDialog):
             QMessageBox.warning(self, "Error", "Course Name is required.")
             return
         instructor = self.instructor_line.text().strip()
+        room = self.room_line.text().strip()
         remarks = self.remarks_text.toPlainText().strip()
         duration = self.duration_combo.currentText().strip()
-        pattern = self.repeat_combo.currentText().strip()
+        pattern = self.repeat_combo.currentText().strip() or "None"
+        try:
+            parse_pattern(pattern)
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", f"Invalid repeat pattern: {e}")
+            return
 
         self.saved_data = {
             "course_name": course_name,
             "instructor_name": instructor,
+            "room": room,
             "remarks": remarks,
             "duration": duration,
             "repeat_pattern": pattern
@@ -132,9 +202,57 @@ class CourseDialog(QDialog):
         self.accept()
 
 
-class TimeSlotWidget(QWidget):
-    def __init__(self, parent, day_idx, slot_idx, start_min_offset, column_x, y_offset_top, pixel_per_minute, is_lecture=True):
-        super().__init__(parent)
+_SLOT_TEXT_FONT = None
+_DAY_LABEL_FONT = None
+
+
+def slot_text_font():
+    """Font for course text in slots, created once instead of on every paint."""
+    global _SLOT_TEXT_FONT
+    if _SLOT_TEXT_FONT is None:
+        _SLOT_TEXT_FONT = QFont("Arial", 10)
+    return _SLOT_TEXT_FONT
+
+
+def day_label_font():
+    """Font of the day headers, shared by every ScheduleWidget."""
+    global _DAY_LABEL_FONT
+    if _DAY_LABEL_FONT is None:
+        _DAY_LABEL_FONT = QFont("Arial", 12, QFont.Bold)
+    return _DAY_LABEL_FONT
+
+
+# Colors shared by all slots of all schedules; never modified in place
+BORDER_EMPTY = QColor("#AAAAAA")
+BORDER_FILLED = QColor("#000000")
+BORDER_CONFLICT_HOVER = QColor("#FF0000")
+FILL_NONE = QColor(0, 0, 0, 0)
+FILL_LECTURE = QColor("#FFFFCC")
+FILL_TUTORIAL = QColor("#CCFFCC")
+
+_PENS = {}
+
+
+def shared_pen(color, width, style=Qt.SolidLine):
+    """A QPen reused for every paint with the same color, width and style."""
+    key = (color.rgba(), width, style)
+    pen = _PENS.get(key)
+    if pen is None:
+        pen = _PENS[key] = QPen(color, width, style)
+    return pen
+
+
+class SlotAppearance:
+    """
+    State, styling, hover behaviour and painting of one time slot, shared by
+    TimeSlotWidget and the single-canvas SlotItem. Users provide setToolTip,
+    update, resize_slot and dirty_rect.
+    """
+
+    def init_appearance(self, schedule, day_idx, slot_idx, start_min_offset, column_x, y_offset_top,
+                        pixel_per_minute, is_lecture):
+        # Hover animations are run by the schedule's shared HoverAnimator
+        self.animator = schedule.animator
         self.day_idx = day_idx
         self.slot_idx = slot_idx
         self.start_min_offset = start_min_offset
@@ -143,182 +261,141 @@ class TimeSlotWidget(QWidget):
         self.y_offset_top = y_offset_top
         self.is_lecture = is_lecture
 
-        self.setFont(QFont("Arial", 12))
-
         # Possible states: "empty", "filled", "conflict", "selected"
         self.state = "empty"
         self.course_name = ""
         self.instructor = ""
+        self.room = ""
         self.remarks = ""
         self.duration = 80 if is_lecture else 50
 
-        self.setToolTip("Click to add course")
-        self.setMouseTracking(True)  # For hover
-        self.resize_slot()
-
         # Animated properties
         self._borderWidth = 1
-        self._borderColor = QColor("#AAAAAA")
+        self._borderColor = BORDER_EMPTY
         self._borderStyle = "dashed"
-        self._fillColor = QColor(0,0,0,0)
-
-        # Faster 80ms animations
-        self.enter_animation = QPropertyAnimation(self, b"borderWidth")
-        self.enter_animation.setDuration(80)
-        self.enter_animation.setEasingCurve(QEasingCurve.InOutCubic)
-
-        self.leave_animation = QPropertyAnimation(self, b"borderWidth")
-        self.leave_animation.setDuration(80)
-        self.leave_animation.setEasingCurve(QEasingCurve.InOutCubic)
+        self._fillColor = FILL_NONE
 
-    def resize_slot(self):
-        top = self.start_min_offset * self.pixel_per_minute
-        height = self.duration * self.pixel_per_minute
+    def slot_geometry(self):
+        top = round(self.start_min_offset * self.pixel_per_minute)
+        height = round(self.duration * self.pixel_per_minute)
         # narrower box
-        self.setGeometry(self.column_x, self.y_offset_top + top, 90, height)
-
-    @pyqtProperty(int)
-    def borderWidth(self):
-        return self._borderWidth
-
-    @borderWidth.setter
-    def borderWidth(self, w):
-        self._borderWidth = w
-        self.update()
-
-    @pyqtProperty(QColor)
-    def borderColor(self):
-        return self._borderColor
-
-    @borderColor.setter
-    def borderColor(self, c):
-        self._borderColor = c
-        self.update()
+        return QRect(self.column_x, self.y_offset_top + top, 90, height)
 
     def setState(self, state):
         self.state = state
+        self.animator.stop(self)
         if state == "empty":
             self._borderStyle = "dashed"
-            self._borderColor = QColor("#AAAAAA")
+            self._borderColor = BORDER_EMPTY
             self._borderWidth = 1
-            self._fillColor = QColor(0,0,0,0)
+            self._fillColor = FILL_NONE
             self.setToolTip("Click to add course")
         elif state == "filled":
             self._borderStyle = "solid"
-            self._borderColor = QColor("#000000")
+            self._borderColor = BORDER_FILLED
             self._borderWidth = 2
-            self._fillColor = QColor("#FFFFCC") if self.is_lecture else QColor("#CCFFCC")
+            self._fillColor = FILL_LECTURE if self.is_lecture else FILL_TUTORIAL
             self.setToolTip("Filled slot")
         elif state == "conflict":
             self._borderStyle = "dashed"
-            self._borderColor = QColor("#AAAAAA")
+            self._borderColor = BORDER_EMPTY
             self._borderWidth = 1
-            self._fillColor = QColor(0,0,0,0)
+            self._fillColor = FILL_NONE
             self.setToolTip("Unavailable due to conflict")
         elif state == "selected":
             self._borderStyle = "solid"
-            self._borderColor = QColor("#000000")
+            self._borderColor = BORDER_FILLED
             self._borderWidth = 3
             if self.course_name.strip():
-                self._fillColor = QColor("#FFFFCC") if self.is_lecture else QColor("#CCFFCC")
+                self._fillColor = FILL_LECTURE if self.is_lecture else FILL_TUTORIAL
             else:
-                self._fillColor = QColor(0,0,0,0)
+                self._fillColor = FILL_NONE
             self.setToolTip("Editing...")
         self.update()
 
-    def setCourseInfo(self, course_name, instructor, remarks, duration):
+    def setCourseInfo(self, course_name, instructor, remarks, duration, room=""):
         self.course_name = course_name
         self.instructor = instructor
+        self.room = room
         self.remarks = remarks
         self.duration = int(duration)
         self.resize_slot()
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def paint_slot(self, painter, rect):
         painter.setRenderHint(QPainter.Antialiasing)
 
         # Fill
         painter.setBrush(QBrush(self._fillColor))
         painter.setPen(Qt.NoPen)
-        painter.drawRect(self.rect())
+        painter.drawRect(rect)
 
         # Border
-        pen = QPen(self._borderColor, self._borderWidth)
-        if self._borderStyle == "solid":
-            pen.setStyle(Qt.SolidLine)
-        else:
-            pen.setStyle(Qt.DashLine)
-        painter.setPen(pen)
+        painter.setPen(shared_pen(self._borderColor, self._borderWidth,
+                                  Qt.SolidLine if self._borderStyle == "solid" else Qt.DashLine))
         painter.setBrush(Qt.NoBrush)
-        painter.drawRect(self.rect())
+        painter.drawRect(rect)
 
         # Show text if filled or selected
         if self.state in ["filled", "selected"]:
             if self.course_name.strip():
                 painter.setPen(Qt.black)
-                painter.setFont(QFont("Arial", 10))
+                painter.setFont(slot_text_font())
                 text = self.course_name
                 if self.instructor.strip():
                     text += "\n" + self.instructor
-                painter.drawText(self.rect(), Qt.AlignCenter | Qt.TextWordWrap, text)
+                if self.room.strip():
+                    text += "\n" + self.room
+                painter.drawText(rect, Qt.AlignCenter | Qt.TextWordWrap, text)
 
-    def enterEvent(self, event):
-        super().enterEvent(event)
+    def hover_enter(self):
         if self.state == "selected":
             return
-        if self.state == "empty":
-            self.enter_animation.stop()
-            self.enter_animation.setStartValue(self.borderWidth)
-            self.enter_animation.setEndValue(3)
-            self.enter_animation.start()
-            self._borderColor = QColor("#000000")
-            self._borderStyle = "solid"
-            self.update()
-        elif self.state == "conflict":
-            self.enter_animation.stop()
-            self.enter_animation.setStartValue(self.borderWidth)
-            self.enter_animation.setEndValue(3)
-            self.enter_animation.start()
-            self._borderColor = QColor("#FF0000")
-            self._borderStyle = "solid"
-            self.update()
-        elif self.state == "filled":
-            self.enter_animation.stop()
-            self.enter_animation.setStartValue(self.borderWidth)
-            self.enter_animation.setEndValue(3)
-            self.enter_animation.start()
-            self._borderColor = QColor("#000000")
-            self._borderStyle = "solid"
-            self.update()
+        self.animator.animate(self, 3)
+        self._borderColor = BORDER_CONFLICT_HOVER if self.state == "conflict" else BORDER_FILLED
+        self._borderStyle = "solid"
+        self.update()
 
-    def leaveEvent(self, event):
-        super().leaveEvent(event)
+    def hover_leave(self):
         if self.state == "selected":
             return
-        if self.state == "empty":
-            self.leave_animation.stop()
-            self.leave_animation.setStartValue(self.borderWidth)
-            self.leave_animation.setEndValue(1)
-            self.leave_animation.start()
-            self._borderColor = QColor("#AAAAAA")
-            self._borderStyle = "dashed"
-            self.update()
-        elif self.state == "conflict":
-            self.leave_animation.stop()
-            self.leave_animation.setStartValue(self.borderWidth)
-            self.leave_animation.setEndValue(1)
-            self.leave_animation.start()
-            self._borderColor = QColor("#AAAAAA")
-            self._borderStyle = "dashed"
-            self.update()
-        elif self.state == "filled":
-            self.leave_animation.stop()
-            self.leave_animation.setStartValue(self.borderWidth)
-            self.leave_animation.setEndValue(2)
-            self.leave_animation.start()
-            self._borderColor = QColor("#000000")
+        if self.state == "filled":
+            self.animator.animate(self, 2)
+            self._borderColor = BORDER_FILLED
             self._borderStyle = "solid"
-            self.update()
+        else:
+            self.animator.animate(self, 1)
+            self._borderColor = BORDER_EMPTY
+            self._borderStyle = "dashed"
+        self.update()
+
+
+class TimeSlotWidget(QWidget, SlotAppearance):
+    def __init__(self, parent, day_idx, slot_idx, start_min_offset, column_x, y_offset_top, pixel_per_minute, is_lecture=True):
+        super().__init__(parent)
+        self.init_appearance(parent, day_idx, slot_idx, start_min_offset, column_x, y_offset_top,
+                             pixel_per_minute, is_lecture)
+
+        self.setToolTip("Click to add course")
+        self.setMouseTracking(True)  # For hover
+        self.resize_slot()
+
+    def resize_slot(self):
+        self.setGeometry(self.slot_geometry())
+
+    def dirty_rect(self):
+        return self.geometry()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        self.paint_slot(painter, self.rect())
+
+    def enterEvent(self, event):
+        super().enterEvent(event)
+        self.hover_enter()
+
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        self.hover_leave()
 
     def mousePressEvent(self, event):
         super().mousePressEvent(event)
@@ -328,138 +405,966 @@ class TimeSlotWidget(QWidget):
         self.window().edit_slot(self.day_idx, self.slot_idx)
 
 
+class SlotItem(SlotAppearance):
+    """
+    A time slot painted and hit-tested by ScheduleWidget itself in
+    single-canvas mode; it only ever repaints its own rectangle.
+    """
+
+    def __init__(self, canvas, day_idx, slot_idx, start_min_offset, column_x, y_offset_top, pixel_per_minute, is_lecture=True):
+        self.canvas = canvas
+        self.init_appearance(canvas, day_idx, slot_idx, start_min_offset, column_x, y_offset_top,
+                             pixel_per_minute, is_lecture)
+        self.geometry = self.slot_geometry()
+        self.setToolTip("Click to add course")
+
+    def setToolTip(self, text):
+        self._toolTip = text
+
+    def toolTip(self):
+        return self._toolTip
+
+    def update(self):
+        self.canvas.update(self.geometry)
+
+    def resize_slot(self):
+        old = self.geometry
+        self.geometry = self.slot_geometry()
+        if self.geometry != old:
+            self.canvas.update(old)
+            self.update()
+
+    def dirty_rect(self):
+        return self.geometry
+
+
+class HoverAnimator(QObject):
+    """
+    One frame timer animating the border width of every slot that is
+    hovering in or fading out. Per-slot state only exists while a slot is
+    moving, and all moving slots are repainted together once per frame.
+    """
+    DURATION_MS = 80
+    FRAME_MS = 16
+
+    def __init__(self, schedule):
+        super().__init__(schedule)
+        self.schedule = schedule
+        self.active = {}  # slot -> (start width, end width, start time)
+        self.curve = QEasingCurve(QEasingCurve.InOutCubic)
+        self.clock = QElapsedTimer()
+        self.clock.start()
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.FRAME_MS)
+        self.timer.timeout.connect(self.tick)
+
+    def animate(self, slot, end_width):
+        if slot._borderWidth == end_width:
+            self.active.pop(slot, None)
+            return
+        self.active[slot] = (slot._borderWidth, end_width, self.clock.elapsed())
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def stop(self, slot):
+        self.active.pop(slot, None)
+
+    def tick(self):
+        now = self.clock.elapsed()
+        region = QRegion()
+        for slot, (start, end, started) in list(self.active.items()):
+            progress = min(1.0, (now - started) / self.DURATION_MS)
+            slot._borderWidth = round(start + (end - start) * self.curve.valueForProgress(progress))
+            region += slot.dirty_rect()
+            if progress >= 1.0:
+                del self.active[slot]
+        # Child slot widgets inside the region are repainted along with it
+        if not region.isEmpty():
+            self.schedule.update(region)
+        if not self.active:
+            self.timer.stop()
+
+
 class ScheduleWidget(QWidget):
-    def __init__(self, timetable_data, parent=None):
+    MIN_ZOOM = 0.5
+    MAX_ZOOM = 6.0
+
+    # Deferred slots turned into TimeSlotWidgets per idle timer tick
+    MATERIALIZE_CHUNK = 16
+    # Backgrounds without a heatmap only depend on their key, so schedules share them
+    _shared_backgrounds = {}
+    SHARED_BACKGROUNDS = 8
+
+    def __init__(self, timetable, parent=None, single_canvas=False, time_range=750, deferred=False):
         super().__init__(parent)
-        self.timetable_data = timetable_data
-        self.days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
-
-        self.slots_info = [
-            ("8:30am", 0, True),
-            ("10:30am", 120, True),
-            ("1:30pm", 300, True),
-            ("3:30pm", 420, True),
-            ("6:00pm", 570, False),
-            ("7:00pm", 630, False),
-            ("8:00pm", 690, False)
-        ]
+        self.timetable = timetable
+        # In single-canvas mode slots are SlotItems drawn by this widget,
+        # instead of one TimeSlotWidget child per slot
+        self.single_canvas = single_canvas
+        # With deferred=True the widget-per-slot mode also starts out with
+        # SlotItems, which become TimeSlotWidgets a chunk at a time once the
+        # event loop is idle, so the window can show before they are built
+        self._deferred = []
+        self._materialize_timer = None
+        self._hovered = None
+        self.animator = HoverAnimator(self)
+        self.days = timetable.days
+        self.slots_info = timetable.slots_info
 
         self.pixel_per_minute = 1
+        self.time_range = time_range  # minutes drawn, from 8:30am
         self.y_offset_top = 40
         self.x_offset_initial = 100
         self.base_width = 90
+        self.update_size()
 
-        total_height = self.y_offset_top + 750*self.pixel_per_minute + 50
-        total_width = self.x_offset_initial + (self.base_width * len(self.days)) + 100
-        self.setFixedSize(total_width, total_height)
+        # Slots ordered by start time, for finding the ones inside a rectangle
+        self._slot_order = sorted(range(len(self.slots_info)), key=lambda s: (self.slots_info[s][1], s))
+        self._slot_starts = [self.slots_info[s][1] for s in self._slot_order]
+        self._max_duration = max([default_duration(True)] +
+                                 [self.timetable.duration(*key) for key in self.timetable.data])
+
+        # Static grid and time axis, rendered once per size/DPI/zoom/range
+        self._background = None
+        self._background_key = None
+        self._heatmap = None  # (per-day rows of free counts, resolution, total)
+        self._heatmap_version = 0
 
         self.slot_widgets = {}
-        self.initUI()
+        self._pending_slots = None  # slots refreshed inside batch_update()
+        self.setMouseTracking(single_canvas or deferred)
+        self.initUI(deferred and not single_canvas)
 
-    def initUI(self):
-        font_day = QFont("Arial", 12, QFont.Bold)
+    def initUI(self, deferred=False):
         for i, day in enumerate(self.days):
             lbl = QLabel(day, self)
-            lbl.setFont(font_day)
+            lbl.setFont(day_label_font())
             lbl.setAlignment(Qt.AlignCenter)
             day_x = self.x_offset_initial + i * self.base_width
             lbl.setGeometry(day_x, 0, self.base_width, self.y_offset_top - 20)
 
-        # Create slot widgets
+        # Create slot widgets (or lightweight items in single-canvas mode)
+        slot_class = SlotItem if self.single_canvas or deferred else TimeSlotWidget
         for day_idx in range(len(self.days)):
             for slot_idx, (time_str, offset_min, is_lecture) in enumerate(self.slots_info):
                 column_x = self.x_offset_initial + day_idx * self.base_width
-                w = TimeSlotWidget(self, day_idx, slot_idx, offset_min, column_x,
-                                   self.y_offset_top, self.pixel_per_minute, is_lecture=is_lecture)
+                w = slot_class(self, day_idx, slot_idx, offset_min, column_x,
+                               self.y_offset_top, self.pixel_per_minute, is_lecture=is_lecture)
                 self.slot_widgets[(day_idx, slot_idx)] = w
+                w.setCourseInfo("", "", "", self.empty_duration(slot_idx))
                 w.setState("empty")
 
+        if deferred:
+            self._deferred = list(self.slot_widgets)
+            self._materialize_timer = QTimer(self)
+            self._materialize_timer.timeout.connect(lambda: self.materialize_slots(self.MATERIALIZE_CHUNK))
+            self._materialize_timer.start(0)
         self.update_conflicts()
 
+    def paints_items(self):
+        """Whether some slots are SlotItems that this widget paints and hit-tests itself."""
+        return self.single_canvas or bool(self._deferred)
+
+    def materialize_slots(self, limit=None):
+        """
+        Replace up to `limit` (default: all) deferred SlotItems by
+        TimeSlotWidgets in the same state, in creation order, so the widgets
+        stack as if they had been built up front.
+        """
+        count = len(self._deferred) if limit is None else limit
+        keys, self._deferred = self._deferred[:count], self._deferred[count:]
+        for key in keys:
+            item = self.slot_widgets[key]
+            if item is self._hovered:
+                self._hovered = None
+            self.animator.stop(item)
+            w = TimeSlotWidget(self, key[0], key[1], item.start_min_offset, item.column_x,
+                               item.y_offset_top, item.pixel_per_minute, is_lecture=item.is_lecture)
+            w.setCourseInfo(item.course_name, item.instructor, item.remarks, item.duration, item.room)
+            w.setState(item.state)
+            w.show()
+            self.slot_widgets[key] = w
+        if not self._deferred and self._materialize_timer is not None:
+            self._materialize_timer.stop()
+            self._materialize_timer = None
+
     def refresh_slot(self, day_idx, slot_idx, data):
-        """Populate the slot with new data, re-check conflicts."""
-        w = self.slot_widgets[(day_idx, slot_idx)]
-        _, _, is_lecture = self.slots_info[slot_idx]
+        """Populate the slot with new data and repaint only the slots whose conflict status changed."""
+        if not data:
+            changed = self.timetable.remove_course(day_idx, slot_idx)
+        else:
+            changed = self.timetable.set_course(day_idx, slot_idx, data)
+        self.show_course(day_idx, slot_idx, data)
+
+        if self._pending_slots is not None:
+            self._pending_slots.add((day_idx, slot_idx))
+            return
+        changed.add((day_idx, slot_idx))
+        for key in changed:
+            self.apply_slot_state(*key)
 
+    def show_course(self, day_idx, slot_idx, data):
+        """Put `data` (or nothing) on a slot's appearance without touching the model."""
+        w = self.slot_widgets[(day_idx, slot_idx)]
         if not data:
-            # empty
-            w.setCourseInfo("", "", "", "80" if is_lecture else "50")
-            w.setState("empty")
+            w.setCourseInfo("", "", "", self.empty_duration(slot_idx))
         else:
-            duration = data.get("duration", "80" if is_lecture else "50")
+            _, _, is_lecture = self.slots_info[slot_idx]
             w.setCourseInfo(
                 data.get("course_name", ""),
                 data.get("instructor_name", ""),
                 data.get("remarks", ""),
-                duration
+                data.get("duration", default_duration(is_lecture)),
+                data.get("room", "")
             )
-            w.setState("filled")
+            self._max_duration = max(self._max_duration, w.duration)
+        w.setState("filled" if data else "empty")
 
-        self.update_conflicts()
+    def set_timetable(self, timetable):
+        """
+        Show another Timetable on the same grid, reusing every slot: only the
+        slots whose course differs are re-populated, followed by one conflict
+        pass and one repaint.
+        """
+        if timetable.days != self.days or timetable.slots_info != self.slots_info:
+            raise ValueError("the timetable is on a different grid")
+        old, self.timetable = self.timetable, timetable
+        self.days = timetable.days
+        self.slots_info = timetable.slots_info
+        self._max_duration = max([default_duration(True)] +
+                                 [timetable.duration(*key) for key in timetable.data])
+        self.set_hovered(None)
+        self.setUpdatesEnabled(False)
+        try:
+            for (d, s) in diff_data(old.data, timetable.data):
+                self.show_course(d, s, timetable.get((d, s)))
+            self.update_conflicts()
+        finally:
+            self.setUpdatesEnabled(True)
+
+    def empty_duration(self, slot_idx):
+        """Height of an empty slot in minutes: its default duration, cut off at the next slot."""
+        _, start, is_lecture = self.slots_info[slot_idx]
+        rank = self._slot_order.index(slot_idx)
+        later = [m for m in self._slot_starts[rank + 1:] if m > start]
+        if later:
+            return min(default_duration(is_lecture), later[0] - start)
+        return default_duration(is_lecture)
+
+    def update_size(self):
+        total_height = self.y_offset_top + round(self.time_range*self.pixel_per_minute) + 50
+        total_width = self.x_offset_initial + (self.base_width * len(self.days)) + 100
+        self.setFixedSize(total_width, total_height)
 
-    def update_conflicts(self):
-        # First, reset states to "empty" or "filled" unless "selected"
-        for (d, s), w in self.slot_widgets.items():
-            if w.state == "selected":
-                # keep it
-                continue
-            data = self.window().timetable_data.get((d, s), {})
-            _, _, is_lecture = self.slots_info[s]
-            if data:
-                w.setState("filled")
-            else:
-                w.setState("empty")
+    def set_zoom(self, pixel_per_minute, anchor_y=None):
+        """
+        Change the minute scale, keeping the time under `anchor_y` (widget
+        coordinates) at the same place in the surrounding scroll area.
+        """
+        pixel_per_minute = min(max(pixel_per_minute, self.MIN_ZOOM), self.MAX_ZOOM)
+        if pixel_per_minute == self.pixel_per_minute:
+            return
+        old_ppm = self.pixel_per_minute
+        self.pixel_per_minute = pixel_per_minute
+        self.setUpdatesEnabled(False)
+        try:
+            self.update_size()
+            for w in self.slot_widgets.values():
+                w.pixel_per_minute = pixel_per_minute
+                w.resize_slot()
+        finally:
+            self.setUpdatesEnabled(True)
+
+        area = self.parent().parent() if self.parent() is not None else None
+        if anchor_y is not None and isinstance(area, QScrollArea):
+            minute = (anchor_y - self.y_offset_top) / old_ppm
+            new_y = self.y_offset_top + minute * pixel_per_minute
+            bar = area.verticalScrollBar()
+            bar.setValue(bar.value() + round(new_y - anchor_y))
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.ControlModifier:
+            factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+            self.set_zoom(self.pixel_per_minute * factor, anchor_y=event.pos().y())
+            event.accept()
+            return
+        super().wheelEvent(event)
 
-        # Then mark conflicts
-        for day_idx in range(len(self.days)):
-            ends = []
-            for slot_idx, (tstr, start_min, is_lecture) in enumerate(self.slots_info):
-                data = self.window().timetable_data.get((day_idx, slot_idx), {})
-                dur = int(data.get("duration", 80 if is_lecture else 50)) if data else (80 if is_lecture else 50)
-                end_min = start_min + dur
-                ends.append((slot_idx, start_min, end_min))
-
-            # Overlap check
-            for i in range(len(ends)):
-                for j in range(i+1, len(ends)):
-                    if ends[i][2] > ends[j][1]:
-                        w_conflict = self.slot_widgets[(day_idx, ends[j][0])]
-                        if w_conflict.state != "selected":
-                            w_conflict.setState("conflict")
-                            w_conflict.setToolTip("Unavailable due to conflict")
+    @contextmanager
+    def batch_update(self, repaint_all=True):
+        """
+        Defer conflict evaluation and repainting: slots refreshed inside the
+        block are restyled after a single conflict pass and one repaint. With
+        repaint_all=False only the restyled slots are invalidated, which is
+        cheaper for small batches such as an undo step.
+        """
+        if self._pending_slots is not None:
+            # Nested batch, the outermost one commits
+            yield
+            return
+        self._pending_slots = set()
+        if repaint_all:
+            self.setUpdatesEnabled(False)
+        try:
+            with self.timetable.batch() as changed:
+                yield
+        finally:
+            pending, self._pending_slots = self._pending_slots, None
+            for key in pending | changed:
+                self.apply_slot_state(*key)
+            # Re-enabling updates schedules one repaint for the whole widget
+            if repaint_all:
+                self.setUpdatesEnabled(True)
+
+    def apply_slot_state(self, day_idx, slot_idx):
+        """Set one slot to "empty", "filled" or "conflict" from the model, unless it is selected."""
+        w = self.slot_widgets[(day_idx, slot_idx)]
+        if w.state == "selected":
+            return
+        if self.timetable.is_conflict(day_idx, slot_idx):
+            w.setState("conflict")
+        elif (day_idx, slot_idx) in self.timetable:
+            w.setState("filled")
+        else:
+            w.setState("empty")
 
-    def paintEvent(self, event):
-        super().paintEvent(event)
-        painter = QPainter(self)
+    def update_conflicts(self):
+        """Full pass over every slot; incremental edits go through refresh_slot instead."""
+        for (d, s) in self.slot_widgets:
+            self.apply_slot_state(d, s)
+
+    def background_pixmap(self):
+        """The grid and time labels, re-rendered only when what they depend on changes."""
+        dpr = self.devicePixelRatioF()
+        key = (self.width(), self.height(), dpr, self.pixel_per_minute, self.time_range, self._heatmap_version)
+        if key == self._background_key:
+            return self._background
+        shared_key = key[:5] if self._heatmap is None else None
+        pixmap = self._shared_backgrounds.get(shared_key)
+        if pixmap is not None:
+            self._background = pixmap
+            self._background_key = key
+            return pixmap
+
+        pixmap = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        if self._heatmap is not None:
+            self.paint_heatmap(painter)
         painter.setRenderHint(QPainter.Antialiasing)
 
         # Background lines every 30 minutes
         painter.setPen(QPen(QColor("#DDDDDD"), 1, Qt.DotLine))
         minute = 0
-        while minute <= 750:
-            y_pos = self.y_offset_top + minute
+        while minute <= self.time_range:
+            y_pos = self.y_offset_top + round(minute*self.pixel_per_minute)
             painter.drawLine(self.x_offset_initial - 30, y_pos, self.width()-20, y_pos)
             minute += 30
 
         painter.setPen(QPen(Qt.black, 1))
         painter.setFont(QFont("Arial", 9))
-
-        def minutes_to_hhmm(m):
-            base_hour = 8
-            base_minute = 30
-            total_min = base_hour*60 + base_minute + m
-            h = total_min // 60
-            mm = total_min % 60
-            am_pm = "am" if h<12 else "pm"
-            disp_h = h if h<=12 else (h-12)
-            return f"{disp_h}:{mm:02d}{am_pm}"
-
         minute = 0
-        while minute <= 750:
-            y_pos = self.y_offset_top + minute
+        while minute <= self.time_range:
+            y_pos = self.y_offset_top + round(minute*self.pixel_per_minute)
             time_str = minutes_to_hhmm(minute)
             painter.drawText(self.x_offset_initial - 90, y_pos+4, time_str)
             minute += 30
+        painter.end()
+
+        if shared_key is not None:
+            if len(self._shared_backgrounds) >= self.SHARED_BACKGROUNDS:
+                del self._shared_backgrounds[next(iter(self._shared_backgrounds))]
+            self._shared_backgrounds[shared_key] = pixmap
+        self._background = pixmap
+        self._background_key = key
+        return pixmap
+
+    def set_heatmap(self, resolution, free_rows, total):
+        """
+        Shade every day column by how many of `total` people are free:
+        free_rows[d][b] counts the free ones in minutes [b, b + 1) * resolution.
+        Pass total=0 to remove the heatmap.
+        """
+        self._heatmap = ([list(row) for row in free_rows], resolution, total) if total else None
+        self._heatmap_version += 1
+        self.update()
+
+    def paint_heatmap(self, painter):
+        rows, resolution, total = self._heatmap
+        painter.setPen(Qt.NoPen)
+        for d, row in enumerate(rows[:len(self.days)]):
+            x = self.x_offset_initial + d * self.base_width
+            b = 0
+            while b < len(row):
+                # One rectangle per run of equal counts
+                end = b + 1
+                while end < len(row) and row[end] == row[b]:
+                    end += 1
+                if row[b] > 0:
+                    top = self.y_offset_top + round(b * resolution * self.pixel_per_minute)
+                    bottom = self.y_offset_top + round(min(end * resolution, self.time_range) * self.pixel_per_minute)
+                    painter.setBrush(QColor(0, 170, 0, round(150 * row[b] / total)))
+                    painter.drawRect(x, top, self.base_width, bottom - top)
+                b = end
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        painter = QPainter(self)
+
+        # Blit only the dirty part of the cached background
+        dirty = QRectF(event.rect())
+        dpr = self.devicePixelRatioF()
+        source = QRectF(dirty.x()*dpr, dirty.y()*dpr, dirty.width()*dpr, dirty.height()*dpr)
+        painter.drawPixmap(dirty, self.background_pixmap(), source)
+
+        if self.paints_items():
+            self.paint_slots(painter, event.rect())
+
+    def items_in_rect(self, rect):
+        """
+        Slot items that may touch `rect`, in stacking order. Only the day
+        columns and the start-time range under the rectangle are looked at,
+        so the cost follows the visible area rather than the grid size.
+        """
+        first_day = max(0, (rect.left() - self.x_offset_initial) // self.base_width)
+        last_day = min(len(self.days) - 1, (rect.right() - self.x_offset_initial) // self.base_width)
+        if first_day > last_day:
+            return []
+        top_min = (rect.top() - self.y_offset_top) / self.pixel_per_minute
+        bottom_min = (rect.bottom() - self.y_offset_top) / self.pixel_per_minute
+        lo = bisect_left(self._slot_starts, top_min - self._max_duration)
+        hi = bisect_right(self._slot_starts, bottom_min)
+        slots = sorted(self._slot_order[lo:hi])
+        return [self.slot_widgets[(d, s)] for d in range(first_day, last_day + 1) for s in slots]
+
+    def paint_slots(self, painter, dirty):
+        """Paint the slot items touching `dirty`, in creation (stacking) order."""
+        for item in self.items_in_rect(dirty):
+            # Materialized slots paint themselves
+            if not isinstance(item, SlotItem) or not item.geometry.intersects(dirty):
+                continue
+            painter.save()
+            painter.translate(item.geometry.topLeft())
+            local = QRect(0, 0, item.geometry.width(), item.geometry.height())
+            painter.setClipRect(local)
+            item.paint_slot(painter, local)
+            painter.restore()
+
+    def slot_at(self, pos):
+        """Topmost slot item under pos, matching the stacking of slot widgets."""
+        day_idx = (pos.x() - self.x_offset_initial) // self.base_width
+        if not 0 <= day_idx < len(self.days):
+            return None
+        for slot_idx in reversed(range(len(self.slots_info))):
+            item = self.slot_widgets[(day_idx, slot_idx)]
+            if isinstance(item, SlotItem) and item.geometry.contains(pos):
+                return item
+        return None
+
+    def set_hovered(self, item):
+        if item is self._hovered:
+            return
+        if self._hovered is not None:
+            self._hovered.hover_leave()
+        self._hovered = item
+        if item is not None:
+            item.hover_enter()
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        if self.paints_items():
+            self.set_hovered(self.slot_at(event.pos()))
+
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        if self.paints_items():
+            self.set_hovered(None)
+
+    def mousePressEvent(self, event):
+        super().mousePressEvent(event)
+        if not self.paints_items():
+            return
+        item = self.slot_at(event.pos())
+        if item is None or item.state == "conflict":
+            return
+        item.setState("selected")
+        self.window().edit_slot(item.day_idx, item.slot_idx)
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip and self.paints_items():
+            item = self.slot_at(event.pos())
+            if item is not None:
+                QToolTip.showText(event.globalPos(), item.toolTip(), self)
+            else:
+                QToolTip.hideText()
+                event.ignore()
+            return True
+        return super().event(event)
+
+
+def create_schedule_widget(timetable, single_canvas=False, parent=None, deferred=False):
+    """A ScheduleWidget showing every course of `timetable`, tall enough for its latest slot."""
+    time_range = schedule_time_range(timetable.slots_info)
+    widget = ScheduleWidget(timetable, parent, single_canvas=single_canvas, time_range=time_range,
+                            deferred=deferred)
+    with widget.batch_update():
+        for (d, s), data in list(timetable.items()):
+            widget.refresh_slot(d, s, data)
+    return widget
+
+
+def schedule_time_range(slots_info):
+    """Minutes a schedule of `slots_info` shows, from 8:30am."""
+    return max([750] + [start + default_duration(is_lecture) for _, start, is_lecture in slots_info])
+
+
+class ThumbnailRenderer:
+    """
+    Miniature previews of timetables, painted straight from the model on top
+    of a shared grid pixmap, so a preview costs no widgets. Every preview is
+    cached with its timetable's revision and only redrawn after an edit.
+    """
+
+    def __init__(self, width=160, height=120):
+        self.width = width
+        self.height = height
+        self._grids = {}  # (day count, minutes) -> grid pixmap
+        self._cache = weakref.WeakKeyDictionary()  # Timetable -> (revision, pixmap)
+
+    def grid_pixmap(self, day_count, minutes):
+        key = (day_count, minutes)
+        pixmap = self._grids.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(self.width, self.height)
+            pixmap.fill(Qt.white)
+            painter = QPainter(pixmap)
+            column = self.width / day_count
+            scale = self.height / minutes
+            painter.setPen(shared_pen(BORDER_EMPTY, 1, Qt.DotLine))
+            for minute in range(0, minutes + 1, 60):
+                painter.drawLine(0, round(minute * scale), self.width, round(minute * scale))
+            painter.setPen(shared_pen(BORDER_EMPTY, 1))
+            for d in range(1, day_count):
+                painter.drawLine(round(d * column), 0, round(d * column), self.height)
+            painter.end()
+            self._grids[key] = pixmap
+        return pixmap
+
+    def thumbnail(self, timetable):
+        cached = self._cache.get(timetable)
+        if cached is not None and cached[0] == timetable.revision:
+            return cached[1]
+        minutes = schedule_time_range(timetable.slots_info)
+        # Copy-on-write: the grid is only duplicated once we start painting
+        pixmap = QPixmap(self.grid_pixmap(len(timetable.days), minutes))
+        painter = QPainter(pixmap)
+        column = self.width / len(timetable.days)
+        scale = self.height / minutes
+        for (d, s), val in timetable.items():
+            _, start, is_lecture = timetable.slots_info[s]
+            painter.setBrush(FILL_LECTURE if is_lecture else FILL_TUTORIAL)
+            painter.setPen(shared_pen(BORDER_CONFLICT_HOVER if timetable.is_conflict(d, s) else BORDER_FILLED, 1))
+            painter.drawRect(QRectF(d * column + 1, start * scale,
+                                    column - 2, max(1.0, timetable.duration(d, s) * scale)))
+        painter.end()
+        self._cache[timetable] = (timetable.revision, pixmap)
+        return pixmap
+
+
+class ScheduleSearchThread(QThread):
+    """Runs iter_schedules off the GUI thread and emits results in small batches."""
+    found = pyqtSignal(list)
+
+    def __init__(self, courses, parent=None):
+        super().__init__(parent)
+        self.courses = courses
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        batch = []
+        last_emit = time.monotonic()
+        for schedule in iter_schedules(self.courses, cancel=self.cancel_event):
+            batch.append(schedule)
+            if len(batch) >= 50 or time.monotonic() - last_emit > 0.1:
+                self.found.emit(batch)
+                batch = []
+                last_emit = time.monotonic()
+        if batch:
+            self.found.emit(batch)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class RankedSearchThread(QThread):
+    """Runs the parallel ranked search and emits the best schedules found so far."""
+    progress = pyqtSignal(int, int, list)
+
+    def __init__(self, courses, preferences, top_k, parent=None):
+        super().__init__(parent)
+        self.courses = courses
+        self.preferences = preferences
+        self.top_k = top_k
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        for done, total, best in iter_top_k(self.courses, self.preferences,
+                                            k=self.top_k, cancel=self.cancel_event):
+            self.progress.emit(done, total, best)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class PreferencesDialog(QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Schedule Preferences")
+        self.setModal(True)
+        self.setMinimumWidth(250)
+
+        form_layout = QVBoxLayout()
+        self.weight_spins = {}
+        for name, label, default in [
+            ("gap_weight", "Avoid idle gaps (weight):", 1.0),
+            ("late_start_weight", "Start late (weight):", 0.0),
+            ("early_finish_weight", "Finish early (weight):", 0.0),
+            ("days_off_weight", "Days off (weight):", 0.0),
+            ("instructor_weight", "Preferred instructors (weight):", 0.0),
+        ]:
+            lbl = QLabel(label)
+            lbl.setFont(QFont("Arial", 10))
+            form_layout.addWidget(lbl)
+            spin = QDoubleSpinBox(self)
+            spin.setRange(0.0, 100.0)
+            spin.setSingleStep(0.5)
+            spin.setValue(default)
+            form_layout.addWidget(spin)
+            self.weight_spins[name] = spin
+
+        lbl_instructors = QLabel("Preferred instructors (comma separated):")
+        lbl_instructors.setFont(QFont("Arial", 10))
+        form_layout.addWidget(lbl_instructors)
+        self.instructors_line = QLineEdit(self)
+        form_layout.addWidget(self.instructors_line)
+
+        lbl_top_k = QLabel("Number of schedules to keep:")
+        lbl_top_k.setFont(QFont("Arial", 10))
+        form_layout.addWidget(lbl_top_k)
+        self.top_k_spin = QSpinBox(self)
+        self.top_k_spin.setRange(1, 500)
+        self.top_k_spin.setValue(20)
+        form_layout.addWidget(self.top_k_spin)
+
+        btn_layout = QHBoxLayout()
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setFont(QFont("Arial", 10))
+        btn_layout.addWidget(self.cancel_btn)
+        self.search_btn = QPushButton("Search")
+        self.search_btn.setFont(QFont("Arial", 10))
+        self.search_btn.setDefault(True)
+        btn_layout.addWidget(self.search_btn)
+        form_layout.addLayout(btn_layout)
+        self.setLayout(form_layout)
+
+        self.cancel_btn.clicked.connect(self.reject)
+        self.search_btn.clicked.connect(self.accept)
+
+    def preferences(self):
+        instructors = [name.strip() for name in self.instructors_line.text().split(",") if name.strip()]
+        weights = {name: spin.value() for name, spin in self.weight_spins.items()}
+        return Preferences(preferred_instructors=instructors, **weights)
+
+
+class SemesterDialog(QDialog):
+    """Asks for the semester's first and last day and its holidays, for calendar export."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Semester Dates")
+        self.setModal(True)
+        self.setMinimumWidth(250)
+
+        form_layout = QVBoxLayout()
+        today = QDate.currentDate()
+        self.date_edits = []
+        for label, value in [("First day of classes:", today), ("Last day of classes:", today.addDays(16 * 7))]:
+            lbl = QLabel(label)
+            lbl.setFont(QFont("Arial", 10))
+            form_layout.addWidget(lbl)
+            edit = QDateEdit(value, self)
+            edit.setCalendarPopup(True)
+            form_layout.addWidget(edit)
+            self.date_edits.append(edit)
+
+        lbl_holidays = QLabel("Holidays (optional, YYYY-MM-DD, comma separated):")
+        lbl_holidays.setFont(QFont("Arial", 10))
+        form_layout.addWidget(lbl_holidays)
+        self.holidays_line = QLineEdit(self)
+        form_layout.addWidget(self.holidays_line)
+
+        btn_layout = QHBoxLayout()
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setFont(QFont("Arial", 10))
+        btn_layout.addWidget(self.cancel_btn)
+        self.export_btn = QPushButton("Export")
+        self.export_btn.setFont(QFont("Arial", 10))
+        self.export_btn.setDefault(True)
+        btn_layout.addWidget(self.export_btn)
+        form_layout.addLayout(btn_layout)
+        self.setLayout(form_layout)
+
+        self.cancel_btn.clicked.connect(self.reject)
+        self.export_btn.clicked.connect(self.accept)
+
+    def dates(self):
+        first, last = (edit.date().toPyDate() for edit in self.date_edits)
+        return first, last
+
+    def semester(self):
+        """The chosen recurrence.Semester; raises ValueError for bad dates."""
+        holidays = [date.fromisoformat(day.strip())
+                    for day in self.holidays_line.text().split(",") if day.strip()]
+        return Semester(*self.dates(), holidays)
+
+
+class GenerateDialog(QDialog):
+    def __init__(self, parent, courses, preferences=None, top_k=20):
+        super().__init__(parent)
+        self.setWindowTitle("Generate Schedules")
+        self.setModal(True)
+        self.setMinimumWidth(400)
+
+        self.schedules = []
+        self.selected_schedule = None
+        self.compare_schedules = []
+
+        layout = QVBoxLayout()
+        self.status_label = QLabel("Searching...")
+        self.status_label.setFont(QFont("Arial", 10))
+        layout.addWidget(self.status_label)
+
+        self.result_list = QListWidget(self)
+        self.result_list.setSelectionMode(QListWidget.ExtendedSelection)
+        self.result_list.itemDoubleClicked.connect(self.load_selected)
+        layout.addWidget(self.result_list)
+
+        btn_layout = QHBoxLayout()
+        self.stop_btn = QPushButton("Stop")
+        self.stop_btn.setFont(QFont("Arial", 10))
+        btn_layout.addWidget(self.stop_btn)
+
+        self.close_btn = QPushButton("Close")
+        self.close_btn.setFont(QFont("Arial", 10))
+        btn_layout.addWidget(self.close_btn)
+
+        self.compare_btn = QPushButton("Open in Workspace")
+        self.compare_btn.setFont(QFont("Arial", 10))
+        btn_layout.addWidget(self.compare_btn)
+
+        self.load_btn = QPushButton("Load")
+        self.load_btn.setFont(QFont("Arial", 10))
+        self.load_btn.setDefault(True)
+        btn_layout.addWidget(self.load_btn)
+
+        layout.addLayout(btn_layout)
+        self.setLayout(layout)
+
+        self.stop_btn.clicked.connect(self.stop_search)
+        self.close_btn.clicked.connect(self.reject)
+        self.load_btn.clicked.connect(self.load_selected)
+        self.compare_btn.clicked.connect(self.compare_selected)
+
+        # Without preferences every schedule is listed as it is found;
+        # with them, the list always holds the best ones found so far.
+        self.ranked = preferences is not None
+        if self.ranked:
+            self.search_thread = RankedSearchThread(courses, preferences, top_k, self)
+            self.search_thread.progress.connect(self.show_ranked)
+        else:
+            self.search_thread = ScheduleSearchThread(courses, self)
+            self.search_thread.found.connect(self.add_schedules)
+        self.search_thread.finished.connect(self.search_finished)
+        self.search_thread.start()
+
+    @staticmethod
+    def schedule_label(schedule):
+        return ", ".join(f"{sec.course_code or sec.course_name} {sec.section}".strip()
+                         for sec in schedule)
+
+    def add_schedules(self, batch):
+        for schedule in batch:
+            self.schedules.append(schedule)
+            self.result_list.addItem(f"{len(self.schedules)}. {self.schedule_label(schedule)}")
+        self.status_label.setText(f"Searching... {len(self.schedules)} schedules found")
+
+    def show_ranked(self, done, total, best):
+        row = self.result_list.currentRow()
+        self.result_list.clear()
+        self.schedules = [schedule for _, schedule in best]
+        for i, (score, schedule) in enumerate(best, 1):
+            self.result_list.addItem(f"{i}. [{score:+.2f}] {self.schedule_label(schedule)}")
+        if 0 <= row < len(self.schedules):
+            self.result_list.setCurrentRow(row)
+        self.status_label.setText(f"Searching... {done}/{total} parts done")
+
+    def search_finished(self):
+        self.stop_btn.setEnabled(False)
+        state = "Stopped" if self.search_thread.cancel_event.is_set() else "Done"
+        if self.ranked:
+            self.status_label.setText(f"{state}: best {len(self.schedules)} schedules")
+        else:
+            self.status_label.setText(f"{state}: {len(self.schedules)} conflict-free schedules")
+
+    def stop_search(self):
+        self.search_thread.cancel()
+
+    def load_selected(self):
+        row = self.result_list.currentRow()
+        if row < 0:
+            QMessageBox.warning(self, "Error", "Select a schedule to load.")
+            return
+        self.selected_schedule = self.schedules[row]
+        self.accept()
+
+    def compare_selected(self):
+        """Open every selected schedule as its own workspace timetable, for side-by-side comparison."""
+        rows = sorted(index.row() for index in self.result_list.selectedIndexes())
+        if not rows:
+            QMessageBox.warning(self, "Error", "Select the schedules to compare.")
+            return
+        self.compare_schedules = [(row + 1, self.schedules[row]) for row in rows]
+        self.accept()
+
+    def done(self, result):
+        # Ask the search to stop without waiting for it on the GUI thread. A search
+        # still winding down is handed to the main window, which deletes it once it ends.
+        thread = self.search_thread
+        thread.cancel()
+        if thread.isRunning():
+            thread.disconnect()
+            thread.setParent(self.parent())
+            thread.finished.connect(thread.deleteLater)
+        super().done(result)
+
+
+class FileWatcher(QObject):
+    """
+    Emits `changed` once the watched file has stopped changing for
+    DEBOUNCE_MS, so a burst of writes causes a single reload. Editors that
+    save by renaming a new file over the old one drop the path from
+    QFileSystemWatcher, so its directory is watched too and the path is
+    added back whenever the file reappears.
+    """
+    DEBOUNCE_MS = 300
+    changed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.path = None
+        self._signature = None
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.schedule)
+        self.watcher.directoryChanged.connect(self.schedule)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DEBOUNCE_MS)
+        self.timer.timeout.connect(self.fire)
+
+    def watch(self, path):
+        self.stop()
+        self.path = os.path.abspath(path)
+        self._signature = self.signature()
+        self.watcher.addPaths([p for p in (self.path, os.path.dirname(self.path)) if os.path.exists(p)])
+
+    def stop(self):
+        self.timer.stop()
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+        self.path = None
+
+    def signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def schedule(self, _path=None):
+        # Every event restarts the timer
+        if self.path is not None:
+            self.timer.start()
+
+    def fire(self):
+        signature = self.signature()
+        # Gone (mid-rename), or only something else in the directory changed
+        if signature is None or signature == self._signature:
+            return
+        self._signature = signature
+        if self.path not in self.watcher.files():
+            self.watcher.addPath(self.path)
+        self.changed.emit(self.path)
+
+
+class SyncBridge(QObject):
+    """Carries SyncClient callbacks from its network thread to the GUI thread as queued signals."""
+    remote = pyqtSignal(object)
+    status = pyqtSignal(str)
+
+
+class PerfOverlay(QLabel):
+    """Frame time and repaint rate, updated once a second from a Profiler."""
+
+    def __init__(self, window, profiler):
+        super().__init__(window)
+        self.profiler = profiler
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: white;"
+                           " font-family: monospace; padding: 4px;")
+        self.last = profiler.snapshot()
+        self.clock = QElapsedTimer()
+        self.clock.start()
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick)
+        self.timer.start(1000)
+        self.setText("measuring...")
+        self.place()
+
+    def place(self):
+        self.adjustSize()
+        self.move(self.parentWidget().width() - self.width() - 8, self.parentWidget().menuBar().height() + 8)
+        self.raise_()
+
+    def tick(self):
+        now = self.profiler.snapshot()
+        seconds = max(self.clock.restart(), 1) / 1000
+
+        def delta(label):
+            calls, total = now.get(label, (0, 0.0))
+            last_calls, last_total = self.last.get(label, (0, 0.0))
+            return calls - last_calls, total - last_total
+
+        frames, frame_time = delta("paint.schedule")
+        slot_paints, slot_time = delta("paint.slot")
+        # Conflicts are kept up to date per slot, by _reindex, or per day within a batch
+        reindexes, reindex_time = delta("conflicts.reindex")
+        day_rebuilds, rebuild_time = delta("conflicts.rebuild_day")
+        conflict_calls, conflict_time = reindexes + day_rebuilds, reindex_time + rebuild_time
+        refreshes, refresh_time = delta("refresh_slot")
+        self.last = now
+
+        frame_ms = (frame_time + slot_time) * 1000 / frames if frames else 0.0
+        self.setText(f"frame {frame_ms:6.2f} ms   repaints/s {(frames + slot_paints) / seconds:6.0f}\n"
+                     f"refresh_slot {refreshes:5d} ({refresh_time * 1000:6.1f} ms)   "
+                     f"conflicts {conflict_calls:3d} ({conflict_time * 1000:6.1f} ms)")
+        self.place()
+
+
+DEFAULT_PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".cuhksz_scheduler", "profile.json")
+
+TIMETABLE_FILE_FILTER = "JSON Files (*.json);;Timetable Database (*.tdb)"
 
 
 class MainWindow(QMainWindow):
@@ -467,13 +1372,43 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.setWindowTitle("CUHK(SZ) Course Scheduler (v1.0)")
         self.resize(800, 600)
-        self.timetable_data = {}
+        # Before any children exist, so each widget is polished once instead of twice
+        self.apply_stylesheet()
+
+        # SCHEDULER_GRID points at a JSON grid definition (see timetable.load_grid)
+        days, slots_info = DAYS, None
+        grid_path = os.environ.get("SCHEDULER_GRID")
+        if grid_path:
+            try:
+                days, slots_info = load_grid(grid_path)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring grid definition {grid_path}: {e}", file=sys.stderr)
+        self.timetable = Timetable(days, slots_info)
+        # Every open timetable has its own history; self.timetable/self.history are the active ones
+        self.workspace = Workspace()
+        self.history = self.workspace.add("Timetable 1", self.timetable).history
+        self.profiler = None
+        self.perf_overlay = None
+        self.autosaver = None
+        self.start_autosave()
+        self._catalog_store = None
+        self._course_dialog = None
+        self.current_file = None  # last file loaded or saved, followed by the file watcher
+        self.file_watcher = None
+        self.sync_client = None
+        self.sync_entry = None  # workspace entry shared through the sync server
+        self.sync_bridge = None
+        self.completion_loader = CompletionLoader()
+        self.completion_loader.start()
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
 
-        self.schedule_widget = ScheduleWidget(self.timetable_data)
-        layout.addWidget(self.schedule_widget)
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setFrameShape(QScrollArea.NoFrame)
+        layout.addWidget(self.scroll_area)
+        self.build_schedule_widget()
+        self.build_workspace_panel()
 
         menubar = self.menuBar()
         file_menu = menubar.addMenu("File")
@@ -486,11 +1421,392 @@ class MainWindow(QMainWindow):
         load_action.triggered.connect(self.load_timetable)
         file_menu.addAction(load_action)
 
+        generate_action = QAction("Generate Schedules...", self)
+        generate_action.triggered.connect(lambda: self.generate_schedules())
+        file_menu.addAction(generate_action)
+
+        best_action = QAction("Find Best Schedules...", self)
+        best_action.triggered.connect(lambda: self.generate_schedules(ranked=True))
+        file_menu.addAction(best_action)
+
+        catalog_menu = menubar.addMenu("Catalog")
+
+        import_action = QAction("Import Catalog...", self)
+        import_action.triggered.connect(self.import_catalog)
+        catalog_menu.addAction(import_action)
+
+        catalog_generate_action = QAction("Generate From Catalog...", self)
+        catalog_generate_action.triggered.connect(lambda: self.generate_from_catalog())
+        catalog_menu.addAction(catalog_generate_action)
+
+        catalog_best_action = QAction("Find Best From Catalog...", self)
+        catalog_best_action.triggered.connect(lambda: self.generate_from_catalog(ranked=True))
+        catalog_menu.addAction(catalog_best_action)
+
+        fitting_action = QAction("Sections That Fit...", self)
+        fitting_action.triggered.connect(self.show_fitting_sections)
+        catalog_menu.addAction(fitting_action)
+
+        clashes_action = QAction("Instructor/Room Clashes...", self)
+        clashes_action.triggered.connect(self.show_clashes)
+        catalog_menu.addAction(clashes_action)
+
+        self.watch_action = QAction("Watch File for Changes", self)
+        self.watch_action.setCheckable(True)
+        self.watch_action.triggered.connect(self.set_watching)
+        file_menu.addAction(self.watch_action)
+
+        self.sync_action = QAction("Sync With Server...", self)
+        self.sync_action.setCheckable(True)
+        self.sync_action.triggered.connect(self.set_syncing)
+        file_menu.addAction(self.sync_action)
+
+        export_action = QAction("Export...", self)
+        export_action.triggered.connect(self.export_timetable)
+        file_menu.addAction(export_action)
+
         exit_action = QAction("Exit", self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
 
-        self.apply_stylesheet()
+        edit_menu = menubar.addMenu("Edit")
+
+        undo_action = QAction("Undo", self)
+        undo_action.setShortcut(QKeySequence.Undo)
+        undo_action.triggered.connect(self.undo)
+        edit_menu.addAction(undo_action)
+
+        redo_action = QAction("Redo", self)
+        redo_action.setShortcut(QKeySequence.Redo)
+        redo_action.triggered.connect(self.redo)
+        edit_menu.addAction(redo_action)
+
+        workspace_menu = menubar.addMenu("Workspace")
+
+        new_tab_action = QAction("New Timetable", self)
+        new_tab_action.setShortcut(QKeySequence.AddTab)
+        new_tab_action.triggered.connect(lambda: self.new_timetable())
+        workspace_menu.addAction(new_tab_action)
+
+        duplicate_action = QAction("Duplicate Timetable", self)
+        duplicate_action.triggered.connect(self.duplicate_timetable)
+        workspace_menu.addAction(duplicate_action)
+
+        open_tab_action = QAction("Open Into Workspace...", self)
+        open_tab_action.triggered.connect(self.open_into_workspace)
+        workspace_menu.addAction(open_tab_action)
+
+        close_tab_action = QAction("Close Timetable", self)
+        close_tab_action.setShortcut(QKeySequence.Close)
+        close_tab_action.triggered.connect(self.close_timetable)
+        workspace_menu.addAction(close_tab_action)
+
+        next_tab_action = QAction("Next Timetable", self)
+        next_tab_action.setShortcut(QKeySequence.NextChild)
+        next_tab_action.triggered.connect(lambda: self.switch_timetable(self.workspace.neighbour(1)))
+        workspace_menu.addAction(next_tab_action)
+
+        previous_tab_action = QAction("Previous Timetable", self)
+        previous_tab_action.setShortcut(QKeySequence.PreviousChild)
+        previous_tab_action.triggered.connect(lambda: self.switch_timetable(self.workspace.neighbour(-1)))
+        workspace_menu.addAction(previous_tab_action)
+
+        workspace_menu.addAction(self.workspace_dock.toggleViewAction())
+
+        view_menu = menubar.addMenu("View")
+
+        zoom_in_action = QAction("Zoom In", self)
+        zoom_in_action.setShortcut(QKeySequence.ZoomIn)
+        zoom_in_action.triggered.connect(
+            lambda: self.schedule_widget.set_zoom(self.schedule_widget.pixel_per_minute * 1.25))
+        view_menu.addAction(zoom_in_action)
+
+        zoom_out_action = QAction("Zoom Out", self)
+        zoom_out_action.setShortcut(QKeySequence.ZoomOut)
+        zoom_out_action.triggered.connect(
+            lambda: self.schedule_widget.set_zoom(self.schedule_widget.pixel_per_minute * 0.8))
+        view_menu.addAction(zoom_out_action)
+
+        zoom_reset_action = QAction("Actual Size", self)
+        zoom_reset_action.setShortcut("Ctrl+0")
+        zoom_reset_action.triggered.connect(lambda: self.schedule_widget.set_zoom(1))
+        view_menu.addAction(zoom_reset_action)
+
+        self.weekends_action = QAction("Show Weekends", self)
+        self.weekends_action.setCheckable(True)
+        self.weekends_action.setChecked(len(self.timetable.days) > len(DAYS))
+        self.weekends_action.triggered.connect(self.show_weekends)
+        view_menu.addAction(self.weekends_action)
+
+        free_time_action = QAction("Common Free Time...", self)
+        free_time_action.triggered.connect(self.find_common_free_time)
+        view_menu.addAction(free_time_action)
+
+        clear_heatmap_action = QAction("Hide Free-Time Heatmap", self)
+        clear_heatmap_action.triggered.connect(lambda: self.schedule_widget.set_heatmap(1, [], 0))
+        view_menu.addAction(clear_heatmap_action)
+
+        self.profile_action = QAction("Performance Overlay", self)
+        self.profile_action.setCheckable(True)
+        self.profile_action.triggered.connect(self.set_profiling)
+        view_menu.addAction(self.profile_action)
+
+        # Build the edit dialog once the window is up, so the first click is as fast as the rest
+        QTimer.singleShot(0, lambda: self.course_dialog())
+
+        # SCHEDULER_WATCH=1 follows every loaded or saved file from the start
+        if os.environ.get("SCHEDULER_WATCH", "0") != "0":
+            self.set_watching(True)
+
+        # SCHEDULER_SYNC=host:port/document shares the first timetable from the start
+        if os.environ.get("SCHEDULER_SYNC"):
+            self.set_syncing(True, os.environ["SCHEDULER_SYNC"])
+
+        # SCHEDULER_PROFILE=1 (or a path for the profile dump) turns profiling on from the start
+        if os.environ.get("SCHEDULER_PROFILE", "0") != "0":
+            self.set_profiling(True)
+
+    def start_autosave(self):
+        """Reopen the last session's timetables and journal edits to each of them every second."""
+        # SCHEDULER_AUTOSAVE=0 disables autosave; any other value is the database path
+        path = os.environ.get("SCHEDULER_AUTOSAVE", DEFAULT_AUTOSAVE_PATH)
+        if path == "0":
+            return
+        try:
+            self.autosaver = Autosaver(path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Autosave disabled: {e}", file=sys.stderr)
+            self.autosaver = None
+            return
+        days, slots_info = self.timetable.days, self.timetable.slots_info
+        try:
+            restored = self.autosaver.restore()
+        except (OSError, sqlite3.Error, ValueError, TypeError) as e:
+            print(f"Autosave: skipped cannot restore the last session: {e}", file=sys.stderr)
+            restored = [(path, {})]
+        try:
+            for i, (store_path, raw) in enumerate(restored):
+                # Same checks as loading a file, so one bad entry cannot break every later launch
+                try:
+                    data, problems = check_timetable({f"{d},{s}": val for (d, s), val in raw.items()
+                                                      if d < len(days) and s < len(slots_info)}, days, slots_info)
+                except (ValueError, TypeError) as e:
+                    data, problems = {}, [f"cannot restore {store_path}: {e}"]
+                for message in problems:
+                    print(f"Autosave: skipped {message}", file=sys.stderr)
+                if i == 0:
+                    entry = self.workspace.active
+                    entry.timetable.load(data)
+                else:
+                    timetable = Timetable(days, slots_info)
+                    timetable.load(data)
+                    entry = self.workspace.add("Timetable", timetable)
+                self.autosaver.attach(entry, entry.timetable, store_path)
+        except sqlite3.Error as e:
+            print(f"Autosave disabled: {e}", file=sys.stderr)
+            self.autosaver.close()
+            self.autosaver = None
+            return
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.autosave_timer.start(1000)
+
+    def autosave(self):
+        """Journal the edits of every open timetable, not only the one on screen."""
+        if self.autosaver is None:
+            return
+        try:
+            for entry in self.workspace:
+                self.autosaver.flush(entry, entry.timetable)
+        except sqlite3.Error as e:
+            print(f"Autosave failed: {e}", file=sys.stderr)
+
+    def closeEvent(self, event):
+        self.set_syncing(False)
+        self.autosave()
+        if self.autosaver is not None:
+            self.autosaver.close()
+            self.autosaver = None
+        if self.profiler is not None:
+            self.set_profiling(False)
+        super().closeEvent(event)
+
+    def set_profiling(self, enabled):
+        """
+        Time the hot paths and show the performance overlay. Switching off
+        restores the original methods and writes the profile to the path
+        from SCHEDULER_PROFILE (or DEFAULT_PROFILE_PATH).
+        """
+        if enabled and self.profiler is None:
+            self.profiler = Profiler()
+            self.profiler.install(PROFILED_METHODS)
+            self.perf_overlay = PerfOverlay(self, self.profiler)
+            self.perf_overlay.show()
+        elif not enabled and self.profiler is not None:
+            profiler, self.profiler = self.profiler, None
+            profiler.uninstall()
+            self.perf_overlay.deleteLater()
+            self.perf_overlay = None
+            # Unset, "0" (profiling switched on from the menu) and "1" all mean the default path
+            path = os.environ.get("SCHEDULER_PROFILE", "")
+            path = DEFAULT_PROFILE_PATH if path in ("", "0", "1") else path
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                profiler.dump(path)
+            except OSError as e:
+                print(f"Could not write profile {path}: {e}", file=sys.stderr)
+            print(profiler.format_report(), file=sys.stderr)
+        self.profile_action.setChecked(self.profiler is not None)
+
+    def startup_finished(self, seconds):
+        """Record the time from launch to the first shown frame while profiling."""
+        if self.profiler is not None:
+            self.profiler.record("startup", seconds)
+            print(f"Startup took {seconds * 1000:.1f} ms", file=sys.stderr)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.perf_overlay is not None:
+            self.perf_overlay.place()
+
+    @property
+    def timetable_data(self):
+        return self.timetable.data
+
+    # Grids with more slots than this are always drawn on a single canvas
+    DENSE_GRID_SLOTS = 100
+
+    def build_schedule_widget(self):
+        """(Re)create the ScheduleWidget for self.timetable inside the scroll area."""
+        # SCHEDULER_SINGLE_CANVAS=1 draws all slots in one widget instead of one widget per slot
+        single_canvas = (os.environ.get("SCHEDULER_SINGLE_CANVAS") == "1"
+                         or len(self.timetable.days) * len(self.timetable.slots_info) > self.DENSE_GRID_SLOTS)
+        self.schedule_widget = create_schedule_widget(self.timetable, single_canvas=single_canvas,
+                                                      deferred=not single_canvas)
+        # Replaces (and deletes) the previous widget
+        self.scroll_area.setWidget(self.schedule_widget)
+
+    def rebuild_grid(self, days, slots_info):
+        """Switch every open timetable to another set of days/slots, keeping the courses that still fit."""
+        self.workspace.regrid(days, slots_info)
+        self.timetable = self.workspace.active.timetable
+        self.history = self.workspace.active.history
+        self.build_schedule_widget()
+        self.refresh_thumbnails()
+
+    def build_workspace_panel(self):
+        """Thumbnails of every open timetable, in a dock shown once a second one is opened."""
+        self.thumbnails = ThumbnailRenderer()
+        self.workspace_list = QListWidget()
+        self.workspace_list.setViewMode(QListWidget.IconMode)
+        self.workspace_list.setIconSize(QSize(self.thumbnails.width, self.thumbnails.height))
+        self.workspace_list.setResizeMode(QListWidget.Adjust)
+        self.workspace_list.setMovement(QListWidget.Static)
+        self.workspace_list.setUniformItemSizes(True)
+        self.workspace_list.currentRowChanged.connect(
+            lambda row: row >= 0 and self.switch_timetable(self.workspace.entries[row]))
+        self.workspace_dock = QDockWidget("Workspace", self)
+        self.workspace_dock.setWidget(self.workspace_list)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.workspace_dock)
+        self.workspace_dock.hide()
+        self.workspace_dock.visibilityChanged.connect(lambda visible: visible and self.refresh_thumbnails())
+        for entry in self.workspace:
+            self.workspace_list.addItem(QListWidgetItem(entry.name))
+        self.workspace_list.setCurrentRow(0)
+        if len(self.workspace) > 1:
+            # Timetables restored from the last session
+            self.workspace_dock.show()
+        # Previews of edited timetables are redrawn at most once a second
+        self.thumbnail_timer = QTimer(self)
+        self.thumbnail_timer.timeout.connect(self.refresh_thumbnails)
+        self.thumbnail_timer.start(1000)
+
+    def refresh_thumbnails(self):
+        """Update the previews whose timetable changed, while the workspace panel is visible."""
+        if not self.workspace_dock.isVisible():
+            return
+        for row, entry in enumerate(self.workspace):
+            item = self.workspace_list.item(row)
+            pixmap = self.thumbnails.thumbnail(entry.timetable)
+            if item.data(Qt.UserRole) != pixmap.cacheKey():
+                item.setIcon(QIcon(pixmap))
+                item.setData(Qt.UserRole, pixmap.cacheKey())
+
+    def switch_timetable(self, entry):
+        """Show another open timetable in the same ScheduleWidget, without rebuilding it."""
+        if entry.timetable is self.timetable:
+            return
+        self.workspace.active = entry
+        self.timetable = entry.timetable
+        self.history = entry.history
+        self.schedule_widget.set_timetable(entry.timetable)
+        self.set_current_file(entry.path)
+        row = self.workspace.index(entry)
+        if self.workspace_list.currentRow() != row:
+            self.workspace_list.setCurrentRow(row)
+        self.setWindowTitle(f"CUHK(SZ) Course Scheduler (v1.0) - {entry.name}")
+
+    def new_timetable(self, name="Timetable", data=None, path=None, activate=True):
+        """Open another timetable in the workspace; courses outside the grid are dropped."""
+        days, slots_info = self.timetable.days, self.timetable.slots_info
+        timetable = Timetable(days, slots_info)
+        if data:
+            timetable.load({(d, s): val for (d, s), val in data.items()
+                            if d < len(days) and s < len(slots_info)})
+        entry = self.workspace.add(name, timetable, path)
+        self.workspace_list.addItem(QListWidgetItem(entry.name))
+        self.workspace_dock.show()
+        if activate:
+            self.switch_timetable(entry)
+        self.refresh_thumbnails()
+        return entry
+
+    def duplicate_timetable(self):
+        self.new_timetable(self.workspace.active.name, dict(self.timetable.items()))
+
+    def open_into_workspace(self):
+        options = QFileDialog.Options()
+        fileNames, _ = QFileDialog.getOpenFileNames(self, "Open Timetables", "", TIMETABLE_FILE_FILTER,
+                                                    options=options)
+        for i, fileName in enumerate(fileNames):
+            try:
+                data, problems = self.read_timetable(fileName)
+            except ValueError as e:
+                QMessageBox.warning(self, "Error", f"Failed to load {fileName}:\n{e}")
+                continue
+            self.report_skipped(fileName, problems)
+            name = os.path.splitext(os.path.basename(fileName))[0]
+            self.new_timetable(name, data, fileName, activate=(i == 0))
+
+    def close_timetable(self):
+        if len(self.workspace) == 1:
+            QMessageBox.information(self, "Workspace", "The last open timetable cannot be closed.")
+            return
+        entry = self.workspace.active
+        if entry is self.sync_entry:
+            self.set_syncing(False)
+        row = self.workspace.index(entry)
+        replacement = self.workspace.remove(entry)
+        if self.autosaver is not None:
+            self.autosaver.forget(entry)
+        # Removing the row must not switch timetables on its own
+        self.workspace_list.blockSignals(True)
+        self.workspace_list.takeItem(row)
+        self.workspace_list.blockSignals(False)
+        self.switch_timetable(replacement)
+
+    def show_weekends(self, checked):
+        days = WEEK_DAYS if checked else DAYS
+        # Every open timetable is regridded, not just the one on screen
+        affected = self.workspace.losing_courses(days, self.timetable.slots_info)
+        if affected:
+            names = ", ".join(entry.name for entry in affected)
+            answer = QMessageBox.question(self, "Hide Weekends",
+                                          f"Courses on Saturday and Sunday will be removed from {names}. Continue?")
+            if answer != QMessageBox.Yes:
+                self.weekends_action.setChecked(True)
+                return
+        self.rebuild_grid(days, self.timetable.slots_info)
 
     def apply_stylesheet(self):
         qss = """
@@ -511,6 +1827,9 @@ class MainWindow(QMainWindow):
         QMenuBar::item:selected {
             background-color: #e0e0e0;
         }
+        #qt_scrollarea_viewport {
+            background-color: #F8F8F8;
+        }
         """
         self.setStyleSheet(qss)
 
@@ -523,7 +1842,9 @@ class MainWindow(QMainWindow):
         _, _, is_lecture = self.schedule_widget.slots_info[slot_idx]
         existing = self.timetable_data.get((day_idx, slot_idx), {})
 
-        dialog = CourseDialog(self, existing_data=existing if existing else None, is_lecture=is_lecture)
+        dialog = self.course_dialog(existing, is_lecture,
+                                    lambda duration, pattern: self.edit_preview_text(day_idx, slot_idx,
+                                                                                     duration, pattern))
         if dialog.exec_():
             if dialog.deleted:
                 # If user deletes a repeated course, remove from all repeated days
@@ -538,98 +1859,447 @@ class MainWindow(QMainWindow):
                 # If user sets a pattern, we replicate the data to all days in that pattern
                 self.apply_course_in_pattern(day_idx, slot_idx, new_data)
         else:
-            # The user canceled. Revert from "selected" to prior state
+            # The user canceled. Revert from "selected" to prior state; the slot
+            # may have been materialized into a new widget while the dialog was open
+            w = self.schedule_widget.slot_widgets[(day_idx, slot_idx)]
             if (day_idx, slot_idx) not in self.timetable_data:
                 w.setState("empty")
             else:
                 w.setState("filled")
 
+    def course_dialog(self, existing=None, is_lecture=True, preview=None):
+        """The shared CourseDialog, built on first use and re-populated for every edit."""
+        if self._course_dialog is None:
+            self._course_dialog = CourseDialog(self, completion_source=self.completion_loader)
+        self._course_dialog.populate(existing, is_lecture, preview)
+        return self._course_dialog
+
+    def edit_preview_text(self, day_idx, slot_idx, duration, pattern):
+        """Which slots saving (day_idx, slot_idx) with `duration` and `pattern` would overwrite or run into."""
+        try:
+            parse_pattern(pattern)
+        except ValueError as e:
+            return f"Invalid repeat pattern: {e}"
+        try:
+            duration = int(duration)
+        except ValueError:
+            return f"Invalid duration: {duration}"
+        timetable = self.timetable
+        days = target_days(pattern, day_idx, len(timetable.days))
+        preview = timetable.preview_edit(day_idx, slot_idx, {"duration": duration}, days)
+        if not preview:
+            return ""
+
+        def describe(keys):
+            return ", ".join(f"{timetable.days[d][:3]} {timetable.slots_info[s][0]} "
+                             f"({timetable.get((d, s), {}).get('course_name', '')})" for d, s in keys)
+        lines = []
+        if preview.overwritten:
+            lines.append("Overwrites " + describe(preview.overwritten))
+        if preview.covered_by:
+            lines.append("Starts during " + describe(preview.covered_by))
+        if preview.conflicts:
+            lines.append("Runs into " + describe(preview.conflicts))
+        if preview.blocked:
+            lines.append(f"Blocks {len(preview.blocked)} empty slot(s)")
+        if preview.resolved:
+            lines.append("No longer runs into " + describe(preview.resolved))
+        return "\n".join(lines)
+
     def apply_course_in_pattern(self, day_idx, slot_idx, course_data):
         """
         Place the course data into (day_idx, slot_idx) and all other days
         indicated by repeat_pattern, if day_idx is in that pattern.
         """
-        # Example: If user chooses "MonWed" and day_idx=0 (Monday),
+        # Example: If user chooses "MoWe/odd" and day_idx=0 (Monday),
         # then we also update day_idx=2 (Wednesday). If day_idx=2 was chosen,
         # we also confirm that 2 is in [0,2]. Then apply to day_idx=0.
+        # Week rules (odd/even, week ranges) only matter for dated checks and export.
+        # If the current day_idx is not in the chosen pattern (say "MoWe" while
+        # editing a Tuesday slot, which is ambiguous) only that slot is written;
+        # CourseDialog's preview lists the same slots via target_days.
         pattern_name = course_data.get("repeat_pattern", "None")
-        pattern_days = REPEAT_PATTERNS.get(pattern_name, [])
-
-        # If the current day_idx is not in the chosen pattern, we do nothing special
-        # (User might have chosen "MonWed" while editing the Tuesday slot, which is ambiguous.)
-        # But let's assume we only replicate if day_idx is indeed in pattern_days.
-        if day_idx in pattern_days:
-            # For each day in pattern_days, store the same course data
-            for d in pattern_days:
-                self.timetable_data[(d, slot_idx)] = course_data
-            # Also store for the original day, in case it's not repeated
-            self.timetable_data[(day_idx, slot_idx)] = course_data
-        else:
-            # If "None" or day_idx not in pattern, just store it in the single slot
-            self.timetable_data[(day_idx, slot_idx)] = course_data
-
-        # Update UI
-        for d in pattern_days:
-            self.schedule_widget.refresh_slot(d, slot_idx, self.timetable_data.get((d, slot_idx), {}))
-        self.schedule_widget.refresh_slot(day_idx, slot_idx, course_data)
+        days = target_days(pattern_name, day_idx, len(self.timetable.days))
+        with self.schedule_widget.batch_update():
+            for d in days:
+                # Every repeated day gets its own copy of the course data
+                self.schedule_widget.refresh_slot(d, slot_idx, course_data if d == day_idx else dict(course_data))
 
     def delete_course_in_pattern(self, day_idx, slot_idx, pattern_name):
         """Remove the course from the chosen day_idx and all repeated days in the pattern."""
-        pattern_days = REPEAT_PATTERNS.get(pattern_name, [])
-        if day_idx in pattern_days:
-            # Delete from all days in that pattern
-            for d in pattern_days:
-                if (d, slot_idx) in self.timetable_data:
-                    del self.timetable_data[(d, slot_idx)]
+        with self.schedule_widget.batch_update():
+            # All days of the pattern, or just this slot if day_idx is not one of them
+            for d in target_days(pattern_name, day_idx, len(self.timetable.days)):
                 self.schedule_widget.refresh_slot(d, slot_idx, {})
-        else:
-            # Just delete from the single slot
-            if (day_idx, slot_idx) in self.timetable_data:
-                del self.timetable_data[(day_idx, slot_idx)]
-            self.schedule_widget.refresh_slot(day_idx, slot_idx, {})
 
-    def save_timetable(self):
-        # Convert keys to strings
-        str_data = {}
-        for (d, s), val in self.timetable_data.items():
-            key = f"{d},{s}"
-            str_data[key] = val
+    def replace_timetable(self, new_data):
+        """Swap in a whole new timetable, updating model and UI in one batch."""
+        with self.schedule_widget.batch_update():
+            for d in range(len(self.schedule_widget.days)):
+                for s in range(len(self.schedule_widget.slots_info)):
+                    self.schedule_widget.refresh_slot(d, s, new_data.get((d, s), {}))
+
+    def undo(self):
+        self.apply_history_step(self.history.undo())
+
+    def redo(self):
+        self.apply_history_step(self.history.redo())
+
+    def apply_history_step(self, changes):
+        """Restore the slots of one undo/redo step, repainting only those that change."""
+        if not changes:
+            return
+        with self.history.suspended(), self.schedule_widget.batch_update(repaint_all=False):
+            for (d, s), data in changes.items():
+                self.schedule_widget.refresh_slot(d, s, data or {})
+
+    def set_watching(self, enabled):
+        """Reload self.current_file whenever it changes on disk."""
+        if enabled and self.file_watcher is None:
+            self.file_watcher = FileWatcher(self)
+            self.file_watcher.changed.connect(self.reload_watched_file)
+            if self.current_file:
+                self.file_watcher.watch(self.current_file)
+            else:
+                self.statusBar().showMessage("Load or save a timetable to start watching it.", 5000)
+        elif not enabled and self.file_watcher is not None:
+            self.file_watcher.stop()
+            self.file_watcher.deleteLater()
+            self.file_watcher = None
+        self.watch_action.setChecked(self.file_watcher is not None)
+
+    def set_current_file(self, fileName):
+        self.current_file = fileName
+        self.workspace.active.path = fileName
+        if self.file_watcher is not None:
+            if fileName:
+                self.file_watcher.watch(fileName)
+            else:
+                self.file_watcher.stop()
+
+    def reload_watched_file(self, path):
+        """Apply only the slots that differ from the file's new contents, as one undo step."""
+        days, slots_info = self.timetable.days, self.timetable.slots_info
+        loaded, errors = load_timetable_files([path], days, slots_info)
+        name = os.path.basename(path)
+        if not loaded:
+            # Most likely caught mid-write; the next change triggers another reload
+            self.statusBar().showMessage(f"Could not reload {name}: {errors[0][1]}", 5000)
+            return
+        changes = diff_data(self.timetable.data, loaded[0][1])
+        if not changes and not errors:
+            return
+        with self.schedule_widget.batch_update(repaint_all=False):
+            for (d, s), data in changes.items():
+                self.schedule_widget.refresh_slot(d, s, data or {})
+        message = f"Reloaded {name}: {len(changes)} slot(s) changed"
+        if errors:
+            message += f", {len(errors)} invalid entr{'y' if len(errors) == 1 else 'ies'} skipped"
+        self.statusBar().showMessage(message, 5000)
+
+    def set_syncing(self, enabled, address=None):
+        """Share the active timetable with everyone connected to the same sync server document."""
+        if enabled and self.sync_client is None:
+            if address is None:
+                address, ok = QInputDialog.getText(self, "Sync With Server", "Server (host:port/document):",
+                                                   text=f"{DEFAULT_HOST}:{DEFAULT_PORT}/default")
+                if not ok:
+                    address = None
+            try:
+                host, port, doc = parse_address(address) if address else (None, None, None)
+            except ValueError:
+                QMessageBox.warning(self, "Sync", f"Invalid server address {address!r}.")
+                host = None
+            if host is not None:
+                entry = self.workspace.active
+                self.sync_bridge = SyncBridge(self)
+                self.sync_bridge.remote.connect(self.apply_remote_changes)
+                self.sync_bridge.status.connect(lambda text: self.statusBar().showMessage(text, 5000))
+                self.sync_client = SyncClient(host, port, doc, dict(entry.timetable.items()),
+                                              self.sync_bridge.remote.emit, self.sync_bridge.status.emit)
+                # Workspace.regrid() carries listeners over to the entry's new timetable
+                entry.timetable.listeners.append(self.sync_client.local_change)
+                self.sync_entry = entry
+                self.sync_client.start()
+        elif not enabled and self.sync_client is not None:
+            self.sync_entry.timetable.listeners.remove(self.sync_client.local_change)
+            self.sync_client.stop()
+            self.sync_bridge.deleteLater()
+            self.sync_client = self.sync_entry = self.sync_bridge = None
+            self.statusBar().showMessage("Sync: stopped", 5000)
+        self.sync_action.setChecked(self.sync_client is not None)
+
+    def apply_remote_changes(self, changes):
+        """
+        Apply slots changed by other sync clients the way undo does, through
+        refresh_slot and repainting only what changed, but outside the undo
+        history and without sending them back.
+        """
+        if self.sync_client is None:
+            return
+        entry = self.sync_entry
+        timetable = entry.timetable
+        # Drop changes a newer local edit has already overridden
+        changes = {(d, s): data for (d, s), data in self.sync_client.current(changes).items()
+                   if 0 <= d < len(timetable.days) and 0 <= s < len(timetable.slots_info)}
+        if not changes:
+            return
+        with self.sync_client.applying_remote(), entry.history.suspended():
+            if timetable is self.timetable:
+                with self.schedule_widget.batch_update(repaint_all=False):
+                    for (d, s), data in changes.items():
+                        self.schedule_widget.refresh_slot(d, s, data or {})
+            else:
+                # Another timetable is shown; its thumbnail catches up on the next refresh
+                with timetable.batch():
+                    for (d, s), data in changes.items():
+                        timetable.set_course(d, s, data or {})
 
+    def generate_schedules(self, ranked=False):
         options = QFileDialog.Options()
-        fileName, _ = QFileDialog.getSaveFileName(self, "Save Timetable", "", "JSON Files (*.json)", options=options)
+        fileName, _ = QFileDialog.getOpenFileName(self, "Open Course Catalog", "", "JSON Files (*.json)", options=options)
+        if not fileName:
+            return
+        try:
+            courses = load_catalog(fileName)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Failed to load catalog:\n{e}")
+            return
+        self.run_generator(courses, ranked)
+
+    def catalog_store(self):
+        """The imported catalog, opened on first use."""
+        if self._catalog_store is None:
+            self._catalog_store = CatalogStore()
+        return self._catalog_store
+
+    def import_catalog(self):
+        options = QFileDialog.Options()
+        fileName, _ = QFileDialog.getOpenFileName(self, "Import Catalog", "", "Catalog Files (*.json *.csv)", options=options)
         if fileName:
+            try:
+                count = self.catalog_store().import_file(fileName)
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self, "Error", f"Failed to import catalog:\n{e}")
+                return
+            # Rebuild suggestions for the new catalog in the background
+            self.completion_loader.start()
+            QMessageBox.information(self, "Imported", f"Imported {count} sections.")
+
+    def ask_course_codes(self):
+        text, ok = QInputDialog.getText(self, "Courses", "Course codes (comma separated):")
+        if not ok:
+            return []
+        return [code.strip() for code in text.split(",") if code.strip()]
+
+    def generate_from_catalog(self, ranked=False):
+        codes = self.ask_course_codes()
+        if not codes:
+            return
+        courses = self.catalog_store().load_courses(codes)
+        missing = set(codes) - {course.course_code for course in courses}
+        if missing:
+            QMessageBox.warning(self, "Error", "Not in the catalog: " + ", ".join(sorted(missing)))
+            return
+        self.run_generator(courses, ranked)
+
+    def find_common_free_time(self):
+        """Shade the grid by how many of the chosen timetables are free, and list the best windows."""
+        options = QFileDialog.Options()
+        fileNames, _ = QFileDialog.getOpenFileNames(self, "Timetables", "", TIMETABLE_FILE_FILTER, options=options)
+        if not fileNames:
+            return
+        min_minutes, ok = QInputDialog.getInt(self, "Common Free Time", "Minimum length (minutes):", 60, 10, 600, 10)
+        if not ok:
+            return
+        days, slots_info = self.timetable.days, self.timetable.slots_info
+        loaded, errors = load_timetable_files(fileNames, days, slots_info)
+        timetables = [data for _, data in loaded]
+        if not timetables:
+            QMessageBox.warning(self, "Error", "No timetable could be loaded.")
+            return
+
+        grid, counts, windows = common_free_time(timetables, days, slots_info, min_minutes=min_minutes, limit=15)
+        total = len(timetables)
+        self.schedule_widget.set_heatmap(grid.resolution, [[total - c for c in row] for row in counts], total)
+
+        lines = [f"{days[w.day_idx]} {minutes_to_hhmm(w.start)}-{minutes_to_hhmm(w.end)}: "
+                 f"{w.free}/{total} free" for w in windows]
+        if errors:
+            lines.append(f"\n{len(errors)} problem(s) while loading, e.g. {errors[0][0]}: {errors[0][1]}")
+        QMessageBox.information(self, "Common Free Time", "\n".join(lines) or "No free window is long enough.")
+
+    def show_clashes(self):
+        """Instructor and room double-bookings across the catalog, this timetable and chosen files."""
+        options = QFileDialog.Options()
+        # Cancelling the file choice checks just the catalog and the open timetable
+        fileNames, _ = QFileDialog.getOpenFileNames(self, "Other Timetables (optional)", "",
+                                                    TIMETABLE_FILE_FILTER, options=options)
+        days, slots_info = self.timetable.days, self.timetable.slots_info
+        loaded, errors = load_timetable_files(fileNames, days, slots_info)
+        bookings = list(timetable_bookings(self.timetable_data, days, slots_info, "current timetable"))
+        for path, data in loaded:
+            bookings.extend(timetable_bookings(data, days, slots_info, os.path.basename(path)))
+        try:
+            bookings.extend(catalog_bookings(self.catalog_store()))
+        except sqlite3.Error as e:
+            errors.append(("catalog", str(e)))
+
+        clashes = find_clashes(bookings)
+        box = QMessageBox(self)
+        box.setWindowTitle("Instructor/Room Clashes")
+        box.setText(f"{len(clashes)} clash(es) among {len(bookings)} booking(s).")
+        details = [clash.describe() for clash in clashes]
+        details += [f"{path}: {message}" for path, message in errors]
+        if details:
+            box.setDetailedText("\n".join(details))
+        box.exec_()
+
+    def show_fitting_sections(self):
+        codes = self.ask_course_codes()
+        if not codes:
+            return
+        busy = busy_intervals(self.timetable_data, self.timetable.days, self.timetable.slots_info)
+        lines = []
+        for code in codes:
+            sections = self.catalog_store().sections_fitting(code, busy)
+            labels = ", ".join(sec.section for sec in sections) or "none"
+            lines.append(f"{code}: {labels}")
+        QMessageBox.information(self, "Sections That Fit", "\n".join(lines))
+
+    def run_generator(self, courses, ranked=False):
+        if ranked:
+            prefs_dialog = PreferencesDialog(self)
+            if not prefs_dialog.exec_():
+                return
+            dialog = GenerateDialog(self, courses, prefs_dialog.preferences(), prefs_dialog.top_k_spin.value())
+        else:
+            dialog = GenerateDialog(self, courses)
+        if not dialog.exec_():
+            return
+        # Catalog meetings go to the slots of the current grid that start at the same time
+        days, slots_info = self.timetable.days, self.timetable.slots_info
+        chosen = dialog.compare_schedules or [(None, dialog.selected_schedule)]
+        try:
+            placed = [(number, schedule_to_data(schedule, days, slots_info))
+                      for number, schedule in chosen if schedule is not None]
+        except CatalogError as e:
+            QMessageBox.warning(self, "Error", f"Cannot load the schedule into this grid:\n{e}")
+            return
+        if dialog.compare_schedules:
+            for i, (number, data) in enumerate(placed):
+                self.new_timetable(f"Schedule {number}", data, activate=(i == 0))
+        elif placed:
+            self.replace_timetable(placed[0][1])
+
+    def read_timetable(self, fileName):
+        """
+        Read a .json or .tdb timetable file for the current grid; return
+        (timetable_data, problems) with invalid entries left out. Raises
+        ValueError if the file cannot be read at all.
+        """
+        loaded, errors = load_timetable_files([fileName], self.timetable.days, self.timetable.slots_info)
+        if not loaded:
+            raise ValueError(errors[0][1])
+        return loaded[0][1], [message for _, message in errors]
+
+    def report_skipped(self, fileName, problems):
+        if problems:
+            QMessageBox.warning(self, "Invalid Entries",
+                                f"Skipped {len(problems)} invalid entr{'y' if len(problems) == 1 else 'ies'} "
+                                f"in {os.path.basename(fileName)}:\n" + "\n".join(problems[:10]))
+
+    def write_timetable(self, fileName):
+        if fileName.lower().endswith(".tdb"):
+            write_timetable_file(self.timetable_data, fileName)
+        else:
+            # Convert keys to strings
             with open(fileName, "w") as f:
-                json.dump(str_data, f, indent=4)
+                json.dump(to_json_dict(self.timetable_data), f, indent=4)
+
+    def save_timetable(self):
+        options = QFileDialog.Options()
+        fileName, _ = QFileDialog.getSaveFileName(self, "Save Timetable", "", TIMETABLE_FILE_FILTER, options=options)
+        if fileName:
+            try:
+                self.write_timetable(fileName)
+            except (OSError, sqlite3.Error) as e:
+                QMessageBox.warning(self, "Error", f"Failed to save file:\n{e}")
+                return
+            self.set_current_file(fileName)
             QMessageBox.information(self, "Saved", "Timetable saved successfully.")
 
+    def export_timetable(self):
+        options = QFileDialog.Options()
+        fileName, _ = QFileDialog.getSaveFileName(
+            self, "Export Timetable", "", "PNG Image (*.png);;PDF Document (*.pdf);;iCalendar (*.ics)",
+            options=options)
+        if not fileName:
+            return
+        try:
+            if fileName.lower().endswith(".ics"):
+                dialog = SemesterDialog(self)
+                if not dialog.exec_():
+                    return
+                try:
+                    semester = dialog.semester()
+                except ValueError as e:
+                    QMessageBox.warning(self, "Error", f"Invalid semester: {e}")
+                    return
+                write_ics(self.timetable, fileName, semester)
+            elif fileName.lower().endswith((".png", ".pdf")):
+                render_timetable(self.timetable, fileName)
+            else:
+                QMessageBox.warning(self, "Error", "Export to .png, .pdf or .ics.")
+                return
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to export:\n{e}")
+            return
+        QMessageBox.information(self, "Exported", "Timetable exported successfully.")
+
     def load_timetable(self):
         options = QFileDialog.Options()
-        fileName, _ = QFileDialog.getOpenFileName(self, "Load Timetable", "", "JSON Files (*.json)", options=options)
+        fileName, _ = QFileDialog.getOpenFileName(self, "Load Timetable", "", TIMETABLE_FILE_FILTER, options=options)
         if fileName:
+            # Read and validate everything before touching the model, so a failed load changes nothing
             try:
-                with open(fileName, "r") as f:
-                    str_data = json.load(f)
-                self.timetable_data = {}
-                for key, val in str_data.items():
-                    d_str, s_str = key.split(",")
-                    d, s = int(d_str), int(s_str)
-                    self.timetable_data[(d, s)] = val
-
-                # Update UI
-                for d in range(len(self.schedule_widget.days)):
-                    for s in range(len(self.schedule_widget.slots_info)):
-                        if (d, s) in self.timetable_data:
-                            self.schedule_widget.refresh_slot(d, s, self.timetable_data[(d,s)])
-                        else:
-                            self.schedule_widget.refresh_slot(d, s, {})
-                QMessageBox.information(self, "Loaded", "Timetable loaded successfully.")
-            except Exception as e:
+                data, problems = self.read_timetable(fileName)
+            except ValueError as e:
                 QMessageBox.warning(self, "Error", f"Failed to load file:\n{e}")
+                return
+            self.replace_timetable(data)
+            self.set_current_file(fileName)
+            if problems:
+                self.report_skipped(fileName, problems)
+            else:
+                QMessageBox.information(self, "Loaded", "Timetable loaded successfully.")
+
+
+# (class, method, label) pairs timed while profiling is on
+PROFILED_METHODS = [
+    (ScheduleWidget, "update_conflicts", "update_conflicts"),
+    (Timetable, "_reindex", "conflicts.reindex"),
+    (Timetable, "_rebuild_day", "conflicts.rebuild_day"),
+    (ScheduleWidget, "refresh_slot", "refresh_slot"),
+    (ScheduleWidget, "paintEvent", "paint.schedule"),
+    (TimeSlotWidget, "paintEvent", "paint.slot"),
+    (SlotAppearance, "setState", "setState"),
+    (ScheduleWidget, "materialize_slots", "startup.materialize"),
+    (MainWindow, "course_dialog", "dialog.open"),
+    (MainWindow, "edit_preview_text", "dialog.preview"),
+    (MainWindow, "apply_remote_changes", "sync.apply"),
+    (MainWindow, "read_timetable", "io.load"),
+    (MainWindow, "write_timetable", "io.save"),
+    (Autosaver, "flush", "io.autosave"),
+]
 
 
 if __name__ == "__main__":
+    startup = time.perf_counter()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
     window = MainWindow()
     window.show()
+    # Runs once the first frame has been handled: the cold-start time the user sees
+    QTimer.singleShot(0, lambda: window.startup_finished(time.perf_counter() - startup))
     sys.exit(app.exec_())
@@ -0,0 +1,113 @@
+"""
+Compact week-occupancy encoding for fast conflict checks.
+
+A week is one Python int: day d owns bits [d * bins, (d + 1) * bins), and
+bit b of a day covers minutes [b * resolution, (b + 1) * resolution) after
+8:30am, up to 9:00pm as drawn by ScheduleWidget. Checking a section against
+a timetable is then a single AND. For checking many masks against each
+other at once they can be unpacked into NumPy boolean rows (one per day),
+if NumPy is installed.
+
+Checks are exact whenever `resolution` divides every start and end minute;
+coarser grids are conservative (touching intervals may count as overlapping).
+"""
+from functools import reduce
+from math import gcd
+
+from timetable import DAYS, SLOTS_INFO, default_duration
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is optional
+    np = None
+
+# 8:30am to 9:00pm
+WINDOW_MINUTES = 750
+
+
+class OccupancyGrid:
+    def __init__(self, days=len(DAYS), resolution=10, window=WINDOW_MINUTES):
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.days = days
+        self.resolution = resolution
+        self.window = window
+        self.bins = -(-window // resolution)
+        self.day_full = (1 << self.bins) - 1
+
+    @classmethod
+    def exact_for(cls, minutes, days=len(DAYS), window=WINDOW_MINUTES):
+        """Coarsest grid on which all the given start/end minutes are exact."""
+        resolution = reduce(gcd, (m for m in minutes if m), 0) or window
+        return cls(days=days, resolution=resolution, window=window)
+
+    def interval_mask(self, day_idx, start, end):
+        """Mask of the bins touched by [start, end) on one day, clamped to the window."""
+        start = max(start, 0)
+        end = min(end, self.window)
+        if end <= start:
+            return 0
+        first = start // self.resolution
+        last = -(-end // self.resolution)
+        return ((1 << (last - first)) - 1) << (day_idx * self.bins + first)
+
+    def day_mask(self, mask, day_idx):
+        return (mask >> (day_idx * self.bins)) & self.day_full
+
+    def timetable_mask(self, timetable, slots_info=None):
+        """Occupancy of the filled slots of a Timetable or timetable_data-style dict."""
+        slots_info = slots_info or getattr(timetable, "slots_info", SLOTS_INFO)
+        mask = 0
+        for (d, s), data in timetable.items():
+            if not data:
+                continue
+            _, start, is_lecture = slots_info[s]
+            duration = int(data.get("duration", default_duration(is_lecture)))
+            mask |= self.interval_mask(d, start, start + duration)
+        return mask
+
+    def section_mask(self, section):
+        """Occupancy of all meetings of a generator.Section."""
+        mask = 0
+        for m in section.meetings:
+            mask |= self.interval_mask(m.day_idx, m.start, m.end)
+        return mask
+
+    def fits(self, occupied, mask):
+        return not (occupied & mask)
+
+    def to_rows(self, mask):
+        """Unpack one week mask into a (days, bins) boolean array."""
+        return self.to_array([mask])[0]
+
+    def to_array(self, masks):
+        """Unpack week masks into an (n, days, bins) boolean array."""
+        if np is None:
+            raise RuntimeError("NumPy is required for array occupancy")
+        nbytes = -(-(self.days * self.bins) // 8)
+        raw = b"".join(m.to_bytes(nbytes, "little") for m in masks)
+        bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8).reshape(len(masks), nbytes),
+                             axis=1, bitorder="little")
+        return bits[:, :self.days * self.bins].reshape(len(masks), self.days, self.bins).astype(bool)
+
+    def disjoint_sets(self, masks):
+        """
+        For every week mask, the set of indices of the masks it does not
+        overlap (an empty mask overlaps nothing, itself included). With
+        NumPy all pairs come from one matrix product of the unpacked masks
+        instead of len(masks) ** 2 / 2 ANDs.
+        """
+        if np is None or not masks:
+            disjoint = [set() for _ in masks]
+            for i, a in enumerate(masks):
+                if not a:
+                    disjoint[i].add(i)
+                for j in range(i + 1, len(masks)):
+                    if not a & masks[j]:
+                        disjoint[i].add(j)
+                        disjoint[j].add(i)
+            return disjoint
+        rows = self.to_array(masks).reshape(len(masks), -1).astype(np.float32)
+        # float32 goes through BLAS and counts up to 2 ** 24 shared bins exactly
+        free = (rows @ rows.T) == 0
+        return [set(np.flatnonzero(row).tolist()) for row in free]
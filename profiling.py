@@ -0,0 +1,86 @@
+"""
+Opt-in timing of hot methods.
+
+Profiler.install() replaces methods on their classes with timing wrappers
+and uninstall() puts the originals back, so nothing is measured (and nothing
+costs anything) unless profiling is switched on.
+"""
+import functools
+import json
+import time
+
+
+class Stat:
+    __slots__ = ("calls", "total", "max")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Profiler:
+    def __init__(self):
+        self.stats = {}
+        self._patched = []
+
+    def install(self, methods):
+        """Time every (owner class, method name, label) in `methods`."""
+        for owner, name, label in methods:
+            self.wrap(owner, name, label)
+
+    def wrap(self, owner, name, label):
+        original = owner.__dict__[name]
+        stat = self.stats.setdefault(label, Stat())
+        clock = time.perf_counter
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                stat.calls += 1
+                stat.total += elapsed
+                if elapsed > stat.max:
+                    stat.max = elapsed
+
+        setattr(owner, name, timed)
+        self._patched.append((owner, name, original))
+
+    def record(self, label, seconds):
+        """Add one externally timed sample, e.g. a startup time."""
+        stat = self.stats.setdefault(label, Stat())
+        stat.calls += 1
+        stat.total += seconds
+        stat.max = max(stat.max, seconds)
+
+    def uninstall(self):
+        for owner, name, original in reversed(self._patched):
+            setattr(owner, name, original)
+        self._patched = []
+
+    def snapshot(self):
+        """{label: (calls, total seconds)}, for computing rates between two points in time."""
+        return {label: (stat.calls, stat.total) for label, stat in self.stats.items()}
+
+    def report(self):
+        """Per-label summary in milliseconds, most expensive first."""
+        rows = [{"name": label, "calls": stat.calls, "total_ms": stat.total * 1000,
+                 "mean_ms": stat.total * 1000 / stat.calls if stat.calls else 0.0,
+                 "max_ms": stat.max * 1000}
+                for label, stat in self.stats.items()]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def format_report(self):
+        lines = [f"{'name':<20} {'calls':>8} {'total ms':>10} {'mean ms':>9} {'max ms':>9}"]
+        for row in self.report():
+            lines.append(f"{row['name']:<20} {row['calls']:>8} {row['total_ms']:>10.1f} "
+                         f"{row['mean_ms']:>9.3f} {row['max_ms']:>9.3f}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "stats": self.report()},
+                      f, indent=2)
@@ -0,0 +1,213 @@
+"""
+Recurrence rules for courses and their expansion into dated occurrences.
+
+A repeat_pattern is a string of weekday codes, optionally followed by
+"/"-separated week rules:
+
+    "MoWeFr"          every Monday, Wednesday and Friday
+    "TuTh/odd"        Tuesdays and Thursdays of odd semester weeks
+    "Fr/w1-7,10-14"   Fridays of weeks 1 to 7 and 10 to 14
+    "None/even"       only the slot's own day, in even weeks
+    "None"            only the slot's own day, every week
+
+Weeks are numbered from 1, starting with the week (Monday to Sunday) that
+contains the first day of the semester. For every (rule, weekday) pair a
+Semester precomputes a bit mask over the days of the semester, bit n being
+the date first_day + n, with holidays removed. Two courses in the same
+weekly slot then meet on a common date exactly when their masks intersect,
+and occurrences are generated lazily from the mask bits.
+"""
+import re
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+
+WEEKDAY_CODES = ("Mo", "Tu", "We", "Th", "Fr", "Sa", "Su")
+WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Slot offsets count from 8:30am
+DAY_START = time(8, 30)
+
+_WEEK_RANGE = re.compile(r"^(\d+)(?:-(\d+))?$")
+# Week numbers count from the semester's first week, so no semester needs more
+MAX_WEEK = 53
+
+
+class Recurrence:
+    __slots__ = ("weekdays", "parity", "weeks", "text")
+
+    def __init__(self, weekdays=(), parity=None, weeks=None, text=None):
+        self.weekdays = tuple(sorted(set(weekdays)))
+        self.parity = parity        # None, "odd" or "even"
+        self.weeks = weeks          # None (all weeks) or a frozenset of week numbers
+        self.text = text or format_pattern(self)
+
+    def occurs_in_week(self, week):
+        if self.parity == "odd" and week % 2 == 0:
+            return False
+        if self.parity == "even" and week % 2 == 1:
+            return False
+        return self.weeks is None or week in self.weeks
+
+    def is_weekly(self):
+        return self.parity is None and self.weeks is None
+
+
+def format_pattern(recurrence):
+    text = "".join(WEEKDAY_CODES[w] for w in recurrence.weekdays) or "None"
+    if recurrence.parity:
+        text += "/" + recurrence.parity
+    if recurrence.weeks is not None:
+        text += "/w" + ",".join(str(w) for w in sorted(recurrence.weeks))
+    return text
+
+
+def parse_pattern(text):
+    """Recurrence for a repeat_pattern string; raises ValueError if it is malformed."""
+    # Type first: anything but a string may not even be hashable
+    if not isinstance(text, str):
+        raise ValueError(f"repeat pattern must be a string, not {type(text).__name__}")
+    return _parse_pattern(text)
+
+
+@lru_cache(maxsize=1024)
+def _parse_pattern(text):
+    if not text.strip():
+        raise ValueError(f"invalid repeat pattern {text!r}")
+    head, *rules = text.strip().split("/")
+    weekdays = []
+    if head != "None":
+        if len(head) % 2:
+            raise ValueError(f"invalid weekdays {head!r}")
+        for i in range(0, len(head), 2):
+            code = head[i:i + 2].capitalize()
+            if code not in WEEKDAY_CODES:
+                raise ValueError(f"unknown weekday {head[i:i + 2]!r}")
+            weekdays.append(WEEKDAY_CODES.index(code))
+
+    parity = None
+    weeks = None
+    for rule in rules:
+        rule = rule.strip().lower()
+        if rule in ("odd", "even"):
+            if parity is not None:
+                raise ValueError("more than one odd/even rule")
+            parity = rule
+        elif rule.startswith("w"):
+            chosen = set()
+            for part in rule[1:].split(","):
+                match = _WEEK_RANGE.match(part.strip())
+                if not match:
+                    raise ValueError(f"invalid week range {part!r}")
+                first = int(match.group(1))
+                last = int(match.group(2) or first)
+                if first < 1 or last < first or last > MAX_WEEK:
+                    raise ValueError(f"invalid week range {part!r}")
+                chosen.update(range(first, last + 1))
+            weeks = frozenset(chosen) if weeks is None else weeks & chosen
+        else:
+            raise ValueError(f"unknown rule {rule!r}")
+
+    return Recurrence(weekdays, parity, weeks, text)
+
+
+def pattern_days(pattern, day_count=7):
+    """Day columns a repeat_pattern replicates a course to (empty for "None" patterns)."""
+    try:
+        weekdays = parse_pattern(pattern).weekdays
+    except ValueError:
+        return []
+    return [d for d in weekdays if d < day_count]
+
+
+def target_days(pattern, day_idx, day_count=7):
+    """Columns an edit of column `day_idx` writes: all pattern days if day_idx is one of them, else day_idx."""
+    days = pattern_days(pattern, day_count)
+    return days if day_idx in days else [day_idx]
+
+
+def entry_recurrence(data):
+    """Recurrence of a timetable entry; unparseable patterns count as weekly."""
+    try:
+        return parse_pattern(data.get("repeat_pattern", "None"))
+    except ValueError:
+        return parse_pattern("None")
+
+
+def column_weekday(days, day_idx):
+    """Calendar weekday (0 = Monday) of a grid column, by name when it is a weekday name."""
+    name = days[day_idx]
+    return WEEKDAY_NAMES.index(name) if name in WEEKDAY_NAMES else day_idx % 7
+
+
+class Semester:
+    def __init__(self, first_day, last_day, holidays=()):
+        if last_day < first_day:
+            raise ValueError("the semester ends before it starts")
+        self.first_day = first_day
+        self.last_day = last_day
+        self.holidays = frozenset(holidays)
+        self.length = (last_day - first_day).days + 1
+        self._monday = first_day - timedelta(first_day.weekday())
+        self._masks = {}
+
+    def week_of(self, day):
+        return (day - self._monday).days // 7 + 1
+
+    def date(self, n):
+        return self.first_day + timedelta(n)
+
+    def date_mask(self, recurrence, weekday):
+        """Days of the semester on which a course of `recurrence` in a `weekday` column meets."""
+        key = (recurrence.text, weekday)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = 0
+            n = (weekday - self.first_day.weekday()) % 7
+            while n < self.length:
+                day = self.date(n)
+                if recurrence.occurs_in_week(self.week_of(day)) and day not in self.holidays:
+                    mask |= 1 << n
+                n += 7
+            self._masks[key] = mask
+        return mask
+
+    def entry_mask(self, days, day_idx, data):
+        """date_mask of one timetable entry in grid column `day_idx`."""
+        return self.date_mask(entry_recurrence(data), column_weekday(days, day_idx))
+
+    def dates(self, mask):
+        """Lazily yield the dates whose bits are set in `mask`, in order."""
+        while mask:
+            low = mask & -mask
+            yield self.date(low.bit_length() - 1)
+            mask ^= low
+
+    def occurrences(self, days, day_idx, start_minute, duration, data):
+        """Lazily yield (start, end) datetimes of one timetable entry across the semester."""
+        for day in self.dates(self.entry_mask(days, day_idx, data)):
+            start = datetime.combine(day, DAY_START) + timedelta(minutes=start_minute)
+            yield start, start + timedelta(minutes=duration)
+
+    def week_entries(self, days, data, week):
+        """The entries of a timetable_data dict that meet during semester week `week`."""
+        start = (self._monday + timedelta(weeks=week - 1) - self.first_day).days
+        first, last = max(0, start), min(self.length, start + 7)
+        if first >= last:
+            return {}
+        window = ((1 << last) - 1) ^ ((1 << first) - 1)
+        return {key: val for key, val in data.items()
+                if val and self.entry_mask(days, key[0], val) & window}
+
+
+def dated_conflicts(timetable, semester):
+    """
+    The (earlier, later) pairs of timetable.course_conflicts() that meet on
+    at least one common date, with the first such date.
+    """
+    result = []
+    for a, b in timetable.course_conflicts():
+        common = (semester.entry_mask(timetable.days, a[0], timetable.get(a))
+                  & semester.entry_mask(timetable.days, b[0], timetable.get(b)))
+        if common:
+            result.append((a, b, next(semester.dates(common))))
+    return result
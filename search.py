@@ -0,0 +1,157 @@
+"""
+Ranked, parallel schedule search.
+
+The space of iter_schedules is split on the sections of the first few
+courses, and each piece is searched in a worker process that keeps only its
+own top-k. The parent merges those as they arrive, so callers see the best
+schedules found so far while the search is still running. Pieces are kept
+small so results stream in steadily, and cancelling reaches the workers
+through a shared event, so running pieces stop too.
+"""
+import heapq
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from generator import Course, iter_schedules
+from timetable import DAYS
+
+
+class Preferences:
+    """
+    Weighted objectives for ranking schedules; a higher score is better.
+    Times are measured in hours so the weights are comparable.
+    """
+
+    def __init__(self, gap_weight=1.0, late_start_weight=0.0, early_finish_weight=0.0,
+                 days_off_weight=0.0, instructor_weight=0.0, preferred_instructors=()):
+        self.gap_weight = gap_weight
+        self.late_start_weight = late_start_weight
+        self.early_finish_weight = early_finish_weight
+        self.days_off_weight = days_off_weight
+        self.instructor_weight = instructor_weight
+        self.preferred_instructors = frozenset(preferred_instructors)
+
+    def score(self, schedule):
+        by_day = {}
+        for section in schedule:
+            for m in section.meetings:
+                by_day.setdefault(m.day_idx, []).append((m.start, m.end))
+
+        gaps = first_starts = last_ends = 0
+        for intervals in by_day.values():
+            intervals.sort()
+            gaps += sum(max(0, b[0] - a[1]) for a, b in zip(intervals, intervals[1:]))
+            first_starts += intervals[0][0]
+            last_ends += max(end for _, end in intervals)
+        days_off = len(DAYS) - len(by_day)
+        preferred = sum(1 for section in schedule
+                        if section.instructor_name in self.preferred_instructors)
+
+        return (- self.gap_weight * gaps / 60
+                + self.late_start_weight * first_starts / 60
+                - self.early_finish_weight * last_ends / 60
+                + self.days_off_weight * days_off
+                + self.instructor_weight * preferred)
+
+
+def _push(heap, k, item):
+    if len(heap) < k:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def _split(courses, target):
+    """Fix sections of leading courses until there are at least `target` pieces."""
+    pieces = [{}]
+    for course_idx, course in enumerate(courses):
+        if len(pieces) >= target:
+            break
+        pieces = [{**p, course_idx: j} for p in pieces for j in range(len(course.sections))]
+    return pieces
+
+
+# Pieces per worker process; more pieces mean more frequent progress updates
+PIECES_PER_WORKER = 32
+
+
+class _PolledEvent:
+    """is_set() of a multiprocessing.Event, consulted only every `every` calls since iter_schedules asks at every node."""
+
+    def __init__(self, event, every=256):
+        self.event = event
+        self.every = every
+        self._calls = 0
+        self._set = False
+
+    def is_set(self):
+        if not self._set:
+            self._calls += 1
+            if self._calls >= self.every:
+                self._calls = 0
+                self._set = self.event.is_set()
+        return self._set
+
+
+_worker_state = None
+
+
+def _init_worker(courses, preferences, k, stop):
+    global _worker_state
+    _worker_state = (courses, preferences, k, stop)
+
+
+def _search_piece(fixed):
+    """Top-k of one piece of the space, as (score, section indices) pairs."""
+    courses, preferences, k, stop = _worker_state
+    if stop.is_set():
+        return []
+    restricted = [Course(c.course_code, c.course_name, [c.sections[fixed[i]]]) if i in fixed else c
+                  for i, c in enumerate(courses)]
+    index = {id(section): j for c in courses for j, section in enumerate(c.sections)}
+    heap = []
+    for n, schedule in enumerate(iter_schedules(restricted, cancel=_PolledEvent(stop))):
+        _push(heap, k, (preferences.score(schedule), -n, [index[id(s)] for s in schedule]))
+    return [(score, indices) for score, _, indices in heap]
+
+
+def iter_top_k(courses, preferences, k=10, workers=None, cancel=None):
+    """
+    Search all conflict-free schedules in a process pool and yield
+    (pieces_done, pieces_total, best) after every finished piece, where best
+    is a list of up to k (score, schedule) pairs, best first. `cancel` is
+    anything with an is_set() method; once it is set, or the caller stops
+    iterating, pending pieces are dropped and running ones stop within a
+    few hundred search nodes, without waiting for the workers to exit.
+    """
+    workers = workers or os.cpu_count() or 1
+    pieces = _split(courses, workers * PIECES_PER_WORKER)
+    best = []
+    seq = itertools.count()
+
+    context = multiprocessing.get_context()
+    stop = context.Event()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                               initargs=(courses, preferences, k, stop))
+    pending = {pool.submit(_search_piece, fixed) for fixed in pieces}
+    done_count = 0
+    try:
+        while pending:
+            if cancel is not None and cancel.is_set():
+                break
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                for score, indices in future.result():
+                    _push(best, k, (score, -next(seq), indices))
+                done_count += 1
+            if done:
+                ranked = sorted(best, reverse=True)
+                yield done_count, len(pieces), [
+                    (score, [courses[i].sections[j] for i, j in enumerate(indices)])
+                    for score, _, indices in ranked]
+    finally:
+        if pending:
+            stop.set()
+        pool.shutdown(wait=not pending, cancel_futures=True)
@@ -0,0 +1,430 @@
+"""
+Co-editing a timetable through a small sync server, e.g. on localhost.
+
+    python cli.py serve [--host 127.0.0.1] [--port 8765]
+
+Server and clients exchange newline-delimited JSON messages that only carry
+per-slot deltas:
+
+    {"type": "delta", "changes": {"d,s": {"data": course or null, "clock": [counter, client]}}}
+
+Every slot is a last-writer-wins register. A change replaces the stored one
+only if its Lamport clock (counter first, then client id) is greater, so all
+replicas settle on the same winner whatever order deltas arrive in. Deleted
+slots are kept as null entries so a late, older write cannot bring them
+back. Edits are coalesced per slot and sent in batches at most every
+FLUSH_INTERVAL seconds, by clients and server alike.
+
+Messages are single lines of at most MESSAGE_LIMIT bytes. Larger snapshots
+and batches are split into several messages; snapshot parts carry
+"more": true until the last one. A peer that sends a longer line is
+disconnected, and a client never sends a course that would not fit.
+
+A client joining a document that already has entries adopts it, dropping
+local courses the document does not have; joining an empty document seeds
+it with the local timetable.
+"""
+import asyncio
+import json
+import sys
+import threading
+import uuid
+from contextlib import contextmanager
+
+from timetable import course_problem
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+FLUSH_INTERVAL = 0.05
+RECONNECT_DELAY = 2.0
+# Longest message line either side reads
+MESSAGE_LIMIT = 1 << 20
+
+# Lower than every real clock
+ZERO_CLOCK = (0, "")
+
+
+def parse_address(address):
+    """"host:port/doc" (every part optional) -> (host, port, doc)."""
+    address, _, doc = address.strip().partition("/")
+    host, _, port = address.rpartition(":") if ":" in address else (address, "", "")
+    return host or DEFAULT_HOST, int(port) if port else DEFAULT_PORT, doc or "default"
+
+
+def encode_changes(changes):
+    """{(d, s): (data, clock)} -> the "changes" object of a delta message."""
+    return {f"{d},{s}": {"data": data, "clock": list(clock)} for (d, s), (data, clock) in changes.items()}
+
+
+def decode_changes(raw):
+    """
+    Inverse of encode_changes. Returns (changes, problems): entries with a
+    bad key or clock, or a course check_timetable would reject, are left
+    out and described instead. An empty course object means a deletion.
+    """
+    if not isinstance(raw, dict):
+        return {}, ["changes must be an object"]
+    changes = {}
+    problems = []
+    for key, entry in raw.items():
+        try:
+            d_str, s_str = key.split(",")
+            d, s = int(d_str), int(s_str)
+            counter, client = entry["clock"]
+            clock = (int(counter), str(client))
+            data = entry["data"]
+        except (ValueError, KeyError, TypeError):
+            problems.append(f"malformed change {key!r}")
+            continue
+        if d < 0 or s < 0:
+            problems.append(f"slot key {key!r} is outside the grid")
+            continue
+        if data is not None and not isinstance(data, dict):
+            problems.append(f"{key}: course must be an object or null")
+            continue
+        problem = course_problem(data) if data else None
+        if problem:
+            problems.append(f"{key}: {problem}")
+            continue
+        changes[(d, s)] = (data or None, clock)
+    return changes, problems
+
+
+def _message(kind, **fields):
+    return (json.dumps({"type": kind, **fields}, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _encoded_size(key, entry):
+    return len(json.dumps({key: entry}, separators=(",", ":")).encode("utf-8"))
+
+
+def split_changes(changes, limit=MESSAGE_LIMIT):
+    """
+    Split {(d, s): (data, clock)} into encoded "changes" objects whose
+    messages stay below `limit` bytes. Returns (parts, oversized keys), the
+    latter being entries too large for any message.
+    """
+    # Room for the message envelope, e.g. {"type":"snapshot","more":true,"changes":{...}}
+    budget = limit - 64
+    parts = [{}]
+    size = 0
+    oversized = []
+    for key, entry in encode_changes(changes).items():
+        entry_size = _encoded_size(key, entry)
+        if entry_size > budget:
+            oversized.append(key)
+            continue
+        if size + entry_size > budget and parts[-1]:
+            parts.append({})
+            size = 0
+        parts[-1][key] = entry
+        size += entry_size
+    return parts, oversized
+
+
+class _Connection:
+    def __init__(self, writer, doc):
+        self.writer = writer
+        self.doc = doc
+        self.pending = {}  # coalesced outgoing changes
+        self.flush_handle = None
+
+
+class SyncServer:
+    """Holds every document in memory and relays accepted deltas to the other clients of a document."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, flush_interval=FLUSH_INTERVAL, limit=MESSAGE_LIMIT):
+        self.host = host
+        self.port = port
+        self.flush_interval = flush_interval
+        self.limit = limit
+        self.docs = {}  # name -> {(d, s): (data, clock)}
+        self.connections = set()
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=self.limit)
+        return self.server
+
+    async def serve_forever(self):
+        server = await self.start()
+        async with server:
+            await server.serve_forever()
+
+    def merge(self, doc, changes):
+        """Apply changes to a document; return (accepted changes, current winners of the rejected keys)."""
+        slots = self.docs.setdefault(doc, {})
+        accepted, rejected = {}, {}
+        for key, (data, clock) in changes.items():
+            current = slots.get(key)
+            if current is None or clock > current[1]:
+                slots[key] = accepted[key] = (data, clock)
+            elif clock != current[1]:
+                rejected[key] = current
+        return accepted, rejected
+
+    def queue(self, conn, changes):
+        """Coalesce changes into a connection's next batch."""
+        for key, (data, clock) in changes.items():
+            queued = conn.pending.get(key)
+            if queued is None or clock > queued[1]:
+                conn.pending[key] = (data, clock)
+        if conn.pending and conn.flush_handle is None:
+            conn.flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self.flush, conn)
+
+    def flush(self, conn):
+        conn.flush_handle = None
+        batch, conn.pending = conn.pending, {}
+        if batch and not conn.writer.is_closing():
+            for part in split_changes(batch, self.limit)[0]:
+                if part:
+                    conn.writer.write(_message("delta", changes=part))
+
+    async def handle(self, reader, writer):
+        conn = None
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # The rest of that line cannot be skipped reliably; drop this peer only
+                    writer.write(_message("error", message=f"message longer than {self.limit} bytes"))
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    kind = message["type"]
+                    if kind == "hello" and conn is None:
+                        conn = _Connection(writer, str(message.get("doc", "default")))
+                        self.connections.add(conn)
+                        parts = split_changes(self.docs.get(conn.doc, {}), self.limit)[0]
+                        for i, part in enumerate(parts):
+                            writer.write(_message("snapshot", more=i < len(parts) - 1, changes=part))
+                    elif kind == "delta" and conn is not None:
+                        changes, problems = decode_changes(message["changes"])
+                        # Whatever is stored must fit in the messages that relay it
+                        for key in split_changes(changes, self.limit)[1]:
+                            del changes[tuple(map(int, key.split(",")))]
+                            problems.append(f"{key}: too large to relay")
+                        # Invalid changes are never stored, so no client is ever sent one
+                        if problems:
+                            writer.write(_message("error", message="rejected " + "; ".join(problems)))
+                        accepted, rejected = self.merge(conn.doc, changes)
+                        for other in self.connections:
+                            if other is not conn and other.doc == conn.doc and accepted:
+                                self.queue(other, accepted)
+                        # The sender learns which of its writes lost, and to what
+                        if rejected:
+                            self.queue(conn, rejected)
+                    else:
+                        raise ValueError(f"unexpected {kind!r} message")
+                except (ValueError, KeyError, TypeError) as e:
+                    writer.write(_message("error", message=str(e)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if conn is not None:
+                self.connections.discard(conn)
+                if conn.flush_handle is not None:
+                    conn.flush_handle.cancel()
+            writer.close()
+
+
+class SyncClient:
+    """
+    Keeps one Timetable in sync with a SyncServer from a background asyncio
+    thread. Register local_change() in Timetable.listeners; remote changes
+    are passed to on_remote({(d, s): (data, clock)}) on the sync thread, and
+    whoever applies them should keep only those still current() and do so
+    inside applying_remote() so they are not sent back.
+    """
+
+    def __init__(self, host, port, doc, initial, on_remote, on_status=None, flush_interval=FLUSH_INTERVAL,
+                 limit=MESSAGE_LIMIT):
+        self.host = host
+        self.port = port
+        self.doc = doc
+        self.limit = limit
+        self.id = uuid.uuid4().hex[:12]
+        self.on_remote = on_remote
+        self.on_status = on_status or (lambda text: None)
+        self.flush_interval = flush_interval
+
+        # Replica state, shared by the GUI and sync threads
+        self._lock = threading.Lock()
+        self.counter = 0
+        self.values = dict(initial)
+        self.clocks = dict.fromkeys(initial, ZERO_CLOCK)
+        self.pending = {}
+        self._synced = False  # whether a snapshot has been merged yet
+        self._snapshot_parts = None  # raw changes of a snapshot still arriving
+        self._applying = 0
+
+        self.loop = asyncio.new_event_loop()
+        self._writer = None
+        self._flush_handle = None
+        self._stopping = False
+        self.thread = threading.Thread(target=self._run, name="timetable-sync", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self.loop.call_soon_threadsafe(self._shutdown)
+        self.thread.join(timeout=2)
+
+    # --- GUI thread ---
+
+    def local_change(self, key, old, new):
+        """Timetable listener: stamp a local edit and queue it for the next batch."""
+        if self._applying:
+            return
+        with self._lock:
+            self.counter += 1
+            clock = (self.counter, self.id)
+            self.values[key] = new
+            self.clocks[key] = clock
+            self.pending[key] = (new, clock)
+        self.loop.call_soon_threadsafe(self._schedule_flush)
+
+    def current(self, changes):
+        """{key: data} for the remote changes that no later edit has superseded."""
+        with self._lock:
+            return {key: data for key, (data, clock) in changes.items() if self.clocks.get(key) == clock}
+
+    @contextmanager
+    def applying_remote(self):
+        self._applying += 1
+        try:
+            yield
+        finally:
+            self._applying -= 1
+
+    # --- sync thread ---
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.loop.close()
+
+    def _shutdown(self):
+        for task in asyncio.all_tasks(self.loop):
+            task.cancel()
+
+    async def _main(self):
+        while not self._stopping:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port, limit=self.limit)
+            except OSError as e:
+                self.on_status(f"Sync: cannot reach {self.host}:{self.port} ({e.strerror or e}), retrying")
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+            self._writer = writer
+            self._snapshot_parts = None
+            self.on_status(f"Sync: connected to {self.host}:{self.port}/{self.doc}")
+            try:
+                writer.write(_message("hello", doc=self.doc, client=self.id))
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self._receive(json.loads(line))
+            except (ConnectionError, ValueError, asyncio.LimitOverrunError) as e:
+                self.on_status(f"Sync: connection lost ({e})")
+            finally:
+                self._writer = None
+                writer.close()
+            if not self._stopping:
+                self.on_status("Sync: disconnected, reconnecting")
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    def _receive(self, message):
+        kind = message.get("type") if isinstance(message, dict) else None
+        if kind == "error":
+            self.on_status(f"Sync: server error: {message.get('message')}")
+            return
+        if kind not in ("snapshot", "delta"):
+            return
+        raw = message.get("changes")
+        if kind == "snapshot":
+            # Merge a split snapshot only once all of it has arrived
+            if self._snapshot_parts is None:
+                self._snapshot_parts = {}
+            if isinstance(raw, dict):
+                self._snapshot_parts.update(raw)
+            if message.get("more"):
+                return
+            raw, self._snapshot_parts = self._snapshot_parts, None
+        changes, problems = decode_changes(raw)
+        if problems:
+            self.on_status(f"Sync: ignored {len(problems)} invalid change(s) from the server")
+        applied = {}
+        with self._lock:
+            if kind == "snapshot" and not self._synced:
+                self._first_snapshot(changes, applied)
+            for key, (data, clock) in changes.items():
+                self.counter = max(self.counter, clock[0])
+                if clock > self.clocks.get(key, ZERO_CLOCK):
+                    self.values[key] = data
+                    self.clocks[key] = clock
+                    applied[key] = (data, clock)
+                    # An older local edit of the slot would lose at the server anyway
+                    self.pending.pop(key, None)
+            if kind == "snapshot":
+                # Resend whatever the server is missing, e.g. batches lost with a connection
+                for key, clock in self.clocks.items():
+                    if clock[1] == self.id and clock > changes.get(key, (None, ZERO_CLOCK))[1]:
+                        self.pending[key] = (self.values[key], clock)
+        if applied:
+            self.on_remote(applied)
+        self._schedule_flush()
+
+    def _first_snapshot(self, changes, applied):
+        """Seed an empty document with the local courses, or drop the ones a non-empty document lacks."""
+        self._synced = True
+        for key in [key for key, clock in self.clocks.items() if clock == ZERO_CLOCK]:
+            if not changes:
+                self.counter += 1
+                self.clocks[key] = (self.counter, self.id)
+            elif key not in changes:
+                del self.values[key]
+                del self.clocks[key]
+                applied[key] = (None, None)
+
+    def _schedule_flush(self):
+        if self._flush_handle is None and self._writer is not None and self._synced:
+            self._flush_handle = self.loop.call_later(self.flush_interval, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if self._writer is None:
+            return
+        with self._lock:
+            batch, self.pending = self.pending, {}
+        parts, oversized = split_changes(batch, self.limit)
+        if oversized:
+            self.on_status(f"Sync: not sharing {', '.join(oversized)}, too large to send")
+        for part in parts:
+            if part:
+                self._writer.write(_message("delta", changes=part))
+
+
+def run_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Serve until interrupted; returns an exit status."""
+    server = SyncServer(host, port)
+    print(f"Sync server listening on {host}:{port}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"cannot listen on {host}:{port}: {e}", file=sys.stderr)
+        return 2
+    return 0
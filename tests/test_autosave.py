@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from autosave import Autosaver, TimetableStore, read_timetable_file, write_timetable_file
+from timetable import SLOTS_INFO, Timetable
+
+
+def test_store_journal_round_trip_and_compact(tmp_path):
+    rng = random.Random(5)
+    expected = {}
+    with TimetableStore(str(tmp_path / "t.tdb")) as store:
+        store.write_all({(0, 0): {"course_name": "Base"}})
+        expected[(0, 0)] = {"course_name": "Base"}
+        for n in range(200):
+            key = (rng.randrange(5), rng.randrange(len(SLOTS_INFO)))
+            val = None if rng.random() < 0.3 else {"course_name": f"C{n}", "room": "TB101"}
+            store.append({key: val})
+            if val:
+                expected[key] = val
+            else:
+                expected.pop(key, None)
+        assert store.journal_size() == 200
+        assert store.read() == expected
+        store.compact()
+        assert store.journal_size() == 0
+        assert store.read() == expected
+
+
+def test_timetable_file_round_trip(tmp_path):
+    path = str(tmp_path / "saved.tdb")
+    data = {(1, 2): {"course_name": "Data Structures", "remarks": "课程"}, (4, 6): {"course_name": "Late"}}
+    write_timetable_file(data, path)
+    assert read_timetable_file(path) == data
+
+
+def test_reading_a_missing_file_does_not_create_it(tmp_path):
+    path = tmp_path / "missing.tdb"
+    with pytest.raises(FileNotFoundError):
+        read_timetable_file(str(path))
+    assert not path.exists()
+
+
+def journal_size(path):
+    with TimetableStore(path) as store:
+        return store.journal_size()
+
+
+def test_autosaver_journals_only_modified_slots(tmp_path):
+    path = str(tmp_path / "autosave.tdb")
+    saver = Autosaver(path, compact_threshold=3)
+    timetable = Timetable()
+    timetable.set_course(0, 0, {"course_name": "A"})
+    saver.flush("first", timetable)  # a new entry is written as a full snapshot
+    assert journal_size(path) == 0
+
+    timetable.set_course(0, 1, {"course_name": "B"})
+    timetable.remove_course(0, 0)
+    saver.flush("first", timetable)
+    assert journal_size(path) == 2
+    saver.flush("first", timetable)  # nothing modified since
+    assert journal_size(path) == 2
+
+    timetable.set_course(3, 3, {"course_name": "C"})
+    saver.flush("first", timetable)  # crosses the threshold and compacts in the background
+    saver.close()
+
+    restored = Autosaver(path)
+    assert restored.restore() == [(path, timetable.data)]
+    restored.close()
+
+
+def test_autosaver_keeps_one_journal_per_entry(tmp_path):
+    path = str(tmp_path / "autosave.tdb")
+    saver = Autosaver(path)
+    first, second, third = Timetable(), Timetable(), Timetable()
+    for n, timetable in enumerate((first, second, third)):
+        timetable.set_course(0, n, {"course_name": f"T{n}"})
+        saver.flush(n, timetable)
+    second_path = str(tmp_path / "autosave-2.tdb")
+    assert journal_size(second_path) == 0
+
+    # Edits of a timetable that is not on screen are journaled too, without snapshots of the others
+    second.set_course(1, 1, {"course_name": "Edited"})
+    for n, timetable in enumerate((first, second, third)):
+        saver.flush(n, timetable)
+    assert journal_size(second_path) == 1
+    assert journal_size(path) == 0
+
+    # A closed entry is not reopened next session
+    saver.forget(2)
+    saver.close()
+    restored = Autosaver(path)
+    assert restored.restore() == [(path, first.data), (second_path, second.data)]
+    restored.close()
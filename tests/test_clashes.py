@@ -0,0 +1,57 @@
+import itertools
+import random
+
+from clashes import find_clashes, timetable_bookings
+from timetable import DAYS, SLOTS_INFO, regular_slots
+
+
+def random_bookings(seed, count=300):
+    rng = random.Random(seed)
+    for n in range(count):
+        start = rng.randrange(0, 600, 10)
+        yield (rng.choice(["instructor", "room"]), rng.choice(["Li", "Wong", "TB101"]), rng.randrange(5),
+               start, start + rng.choice([30, 50, 80]), f"E{rng.randrange(40)}", f"file{n}")
+
+
+def test_find_clashes_matches_brute_force():
+    bookings = list(random_bookings(11))
+    clashes = find_clashes(bookings)
+    found = {frozenset((c.kind, c.resource, c.day_idx, b.start, b.end, b.event) for b in (c.first, c.second))
+             for c in clashes}
+    assert len(found) == len(clashes)
+
+    # Repeated sightings of one event count once
+    events = {booking[:6] for booking in bookings}
+    expected = {frozenset([a, b]) for a, b in itertools.combinations(events, 2)
+                if a[:3] == b[:3] and a[3] < b[4] and b[3] < a[4]}
+    assert found == expected
+
+
+def test_repeated_events_merge_their_sources():
+    a = {(0, 1): {"course_name": "CSC1001", "instructor_name": "Dr. Li", "room": "TB101"}}
+    b = {(0, 1): {"course_name": "csc1001", "instructor_name": "Dr. Li"},
+         (0, 0): {"course_name": "MAT1001", "instructor_name": "dr. li", "duration": "150"}}
+    bookings = list(timetable_bookings(a, DAYS, SLOTS_INFO, "a.tdb"))
+    bookings += timetable_bookings(b, DAYS, SLOTS_INFO, "b.tdb")
+    [clash] = find_clashes(bookings)
+    assert (clash.kind, clash.day_idx) == ("instructor", 0)
+    assert clash.first.event == "MAT1001"
+    assert clash.second.sources == ["a.tdb Monday 10:30am", "b.tdb Monday 10:30am"]
+
+
+def test_timetable_columns_are_matched_by_weekday():
+    # A Sunday-first grid of 15-minute slots: column 1 is Monday and 10:30am is slot 8
+    days = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+    slots_info = regular_slots(15)
+    data = {(1, 8): {"course_name": "CSC1001", "room": "TB101", "duration": "80"},
+            (6, 0): {"course_name": "Weekend", "room": "TB101"}}
+    bookings = list(timetable_bookings(data, days, slots_info, "sunday-first.tdb"))
+    # A catalog booking of the same room on Monday (weekday 0)
+    bookings.append(("room", "TB101", 0, 150, 200, "MAT1001", "catalog MAT1001 L01 lecture"))
+    [clash] = find_clashes(bookings)
+    assert clash.day_idx == 0
+    assert clash.describe().startswith("room TB101, Monday: ")
+    assert clash.as_dict()["day"] == "Monday"
+    assert clash.first.sources == ["sunday-first.tdb Monday 10:30am"]
+    # Saturday's booking keeps its own weekday, past the end of a Monday-Friday list
+    assert {b[2] for b in bookings if b[5] == "Weekend"} == {5}
@@ -0,0 +1,60 @@
+import os
+import threading
+
+import completion
+from catalog import CatalogStore
+from completion import CompletionLoader, load_completions
+from generator import parse_catalog
+
+
+def import_course(path, code, name):
+    with CatalogStore(path) as store:
+        store.import_courses(parse_catalog([{"course_code": code, "course_name": name,
+                                             "sections": [{"section": "L01", "lecture": {"slot": 1, "day": 0}}]}]))
+
+
+def test_cache_is_not_reused_for_a_recreated_store(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    import_course(path, "CSC1001", "Programming")
+    assert load_completions(path).courses.complete("prog") == ["Programming"]
+    assert os.path.exists(path + ".completion.json")
+    # Served from the cache
+    assert load_completions(path).courses.complete("prog") == ["Programming"]
+
+    # A new database at the same path starts again at generation 1
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    import_course(path, "MAT1001", "Calculus")
+    completions = load_completions(path)
+    assert completions.courses.complete("prog") == []
+    assert completions.courses.complete("calc") == ["Calculus"]
+
+
+def test_superseded_loads_are_dropped(tmp_path, monkeypatch):
+    path = str(tmp_path / "catalog.db")
+    import_course(path, "CSC1001", "Programming")
+    release_first = threading.Event()
+    threads = []
+
+    def slow_first_load(catalog_path):
+        if threading.current_thread() is threads[0]:
+            release_first.wait(5)
+            return "old"
+        return "new"
+    monkeypatch.setattr(completion, "load_completions", slow_first_load)
+
+    class RecordedThread(threading.Thread):
+        def start(self):
+            threads.append(self)
+            super().start()
+    monkeypatch.setattr(completion.threading, "Thread", RecordedThread)
+
+    loader = CompletionLoader(path)
+    loader.start()
+    loader.start()
+    threads[1].join(5)
+    assert loader.completions == "new"
+    release_first.set()
+    threads[0].join(5)
+    assert loader.completions == "new"
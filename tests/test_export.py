@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def timetable_files(tmp_path):
+    paths = []
+    for name in ("a", "b"):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({"0,0": {"course_name": "Math", "duration": "80"},
+                                    "2,4": {"course_name": "Physics"}}))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("fmt", ["png", "pdf"])
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_cli_renders_headless(timetable_files, tmp_path, fmt, jobs):
+    pytest.importorskip("PyQt5.QtWidgets")
+    out_dir = tmp_path / "out"
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "cli.py"), "convert", *timetable_files,
+                             "--to", fmt, "-o", str(out_dir), "-j", str(jobs)],
+                            env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout + result.stderr
+    for name in ("a", "b"):
+        output = out_dir / f"{name}.{fmt}"
+        assert output.stat().st_size > 0
+        assert output.read_bytes().startswith(b"\x89PNG" if fmt == "png" else b"%PDF")
+
+
+def test_render_frees_its_widget(tmp_path):
+    pytest.importorskip("PyQt5.QtWidgets")
+    from export import ensure_qt_app, render_timetable
+    from timetable import Timetable
+    timetable = Timetable()
+    timetable.set_course(0, 0, {"course_name": "Math"})
+    app = ensure_qt_app()
+    before = len(app.allWidgets())
+    for n in range(3):
+        render_timetable(timetable, str(tmp_path / f"{n}.png"))
+    assert len(app.allWidgets()) == before
+
+
+def test_cli_refuses_outputs_with_the_same_name(tmp_path, capsys):
+    from cli import main
+    inputs = []
+    for folder in ("fall", "spring"):
+        (tmp_path / folder).mkdir()
+        path = tmp_path / folder / "cs.json"
+        path.write_text(json.dumps({"0,0": {"course_name": folder}}))
+        inputs.append(str(path))
+    out_dir = tmp_path / "out"
+    assert main(["convert", *inputs, "--to", "json", "-o", str(out_dir), "-j", "1"]) == 2
+    assert "cs.json" in capsys.readouterr().err
+    assert not out_dir.exists()
+    # Different inputs are fine, and so is naming one file twice
+    assert main(["normalize", inputs[0], inputs[0], "-o", str(out_dir), "-j", "1"]) == 0
+    assert json.loads((out_dir / "cs.json").read_text())["0,0"]["course_name"] == "fall"
@@ -0,0 +1,96 @@
+import itertools
+import random
+import threading
+
+import pytest
+
+import occupancy
+from catalog import busy_intervals
+from generator import CatalogError, Course, Meeting, Section, iter_schedules, parse_catalog, schedule_to_data
+from timetable import SLOTS_INFO, WEEK_DAYS, regular_slots
+
+
+def random_courses(seed, course_count=5, section_count=4):
+    rng = random.Random(seed)
+    courses = []
+    for c in range(course_count):
+        sections = []
+        for j in range(section_count):
+            meetings = [Meeting("lecture", rng.randrange(5), rng.randrange(len(SLOTS_INFO)), rng.choice([50, 80, 200]))
+                        for _ in range(rng.randrange(1, 3))]
+            sections.append(Section(f"C{c}", f"Course {c}", f"L{j}", rng.choice(["Li", "Wong", "Chan"]), meetings))
+        courses.append(Course(f"C{c}", f"Course {c}", sections))
+    return courses
+
+
+def brute_force_schedules(courses):
+    return [list(choice) for choice in itertools.product(*(c.sections for c in courses))
+            if not any(s.clashes_with_itself() for s in choice)
+            and not any(a.clashes_with(b) for a, b in itertools.combinations(choice, 2))]
+
+
+def as_keys(schedules):
+    return sorted(tuple(id(s) for s in schedule) for schedule in schedules)
+
+
+@pytest.mark.parametrize("with_numpy", [True, False], ids=["numpy", "int"])
+@pytest.mark.parametrize("seed", range(5))
+def test_iter_schedules_matches_brute_force(seed, with_numpy, monkeypatch):
+    if not with_numpy:
+        monkeypatch.setattr(occupancy, "np", None)
+    courses = random_courses(seed)
+    assert as_keys(iter_schedules(courses)) == as_keys(brute_force_schedules(courses))
+
+
+def test_iter_schedules_stops_when_cancelled():
+    cancel = threading.Event()
+    cancel.set()
+    assert list(iter_schedules(random_courses(0), cancel=cancel)) == []
+
+
+def test_parse_catalog_rejects_bad_meetings():
+    section = {"section": "L01", "lecture": {"slot": 1, "repeat_pattern": ["MoWe"]}}
+    with pytest.raises(CatalogError, match="repeat_pattern"):
+        parse_catalog([{"course_code": "CSC1", "sections": [section]}])
+    with pytest.raises(CatalogError, match="needs a \"day\""):
+        parse_catalog([{"course_code": "CSC1", "sections": [{"lecture": {"slot": 1}}]}])
+    with pytest.raises(CatalogError, match="not 7"):
+        parse_catalog([{"course_code": "CSC1", "sections": [{"lecture": {"slot": 1, "day": 7}}]}])
+
+
+def test_weekend_meetings_are_kept():
+    [course] = parse_catalog([{"course_code": "CSC1", "sections": [
+        {"section": "L01", "lecture": {"slot": 1, "repeat_pattern": "MoSa"}},
+        {"section": "L02", "lecture": {"slot": 1, "repeat_pattern": "Sa"}},
+        {"section": "L03", "lecture": {"slot": 1, "day": 6}}]}])
+    assert [[m.day_idx for m in section.meetings] for section in course.sections] == [[0, 5], [5], [6]]
+    assert set(schedule_to_data([course.sections[0]], WEEK_DAYS)) == {(0, 1), (5, 1)}
+    with pytest.raises(CatalogError, match="Saturday"):
+        schedule_to_data([course.sections[1]])
+
+
+@pytest.mark.parametrize("with_numpy", [True, False], ids=["numpy", "int"])
+def test_weekend_meetings_clash(with_numpy, monkeypatch):
+    if not with_numpy:
+        monkeypatch.setattr(occupancy, "np", None)
+    courses = parse_catalog([
+        {"course_code": "A", "sections": [{"section": "L01", "lecture": {"slot": 1, "repeat_pattern": "Sa"}}]},
+        {"course_code": "B", "sections": [{"section": "L01", "lecture": {"slot": 1, "day": 5}},
+                                          {"section": "L02", "lecture": {"slot": 1, "day": 6}}]}])
+    assert [[s.section for s in schedule] for schedule in iter_schedules(courses)] == [["L01", "L02"]]
+
+
+def test_schedule_to_data_maps_onto_the_active_grid():
+    [course] = parse_catalog([{"course_code": "CSC1", "sections": [
+        {"section": "L01", "lecture": {"slot": 1, "repeat_pattern": "MoWe", "duration": "80"}}]}])
+    schedule = [course.sections[0]]
+    assert set(schedule_to_data(schedule)) == {(0, 1), (2, 1)}
+
+    # A week starting on Sunday, in 15-minute slots: 10:30am is slot 8
+    days = WEEK_DAYS[-1:] + WEEK_DAYS[:-1]
+    data = schedule_to_data(schedule, days, regular_slots(15))
+    assert set(data) == {(1, 8), (3, 8)}
+    assert sorted(busy_intervals(data, days, regular_slots(15))) == [(0, 120, 200), (2, 120, 200)]
+
+    with pytest.raises(CatalogError):
+        schedule_to_data(schedule, days, regular_slots(50))
@@ -0,0 +1,29 @@
+from history import UndoHistory
+from timetable import Timetable
+
+
+def test_history_undo_redo_and_listeners():
+    timetable = Timetable()
+    timetable.history = history = UndoHistory()
+    seen = []
+    timetable.listeners.append(lambda key, old, new: seen.append((key, old, new)))
+    a = {"course_name": "A"}
+    b = {"course_name": "B"}
+    timetable.set_course(1, 2, a)
+    timetable.set_course(1, 2, b)
+    timetable.remove_course(1, 2)
+    assert seen == [((1, 2), None, a), ((1, 2), a, b), ((1, 2), b, None)]
+    assert history.undo() == {(1, 2): b}
+    assert history.undo() == {(1, 2): a}
+    assert history.redo() == {(1, 2): b}
+
+
+def test_batch_is_one_undo_step():
+    timetable = Timetable()
+    timetable.history = history = UndoHistory()
+    with timetable.batch():
+        timetable.set_course(0, 0, {"course_name": "A"})
+        timetable.set_course(0, 1, {"course_name": "B"})
+        timetable.remove_course(0, 1)
+    assert history.undo() == {(0, 0): None}
+    assert not history.can_undo()
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+import occupancy
+from occupancy import OccupancyGrid
+from timetable import SLOTS_INFO, Timetable
+
+
+def random_masks(grid, rng, count):
+    masks = []
+    for _ in range(count):
+        mask = 0
+        for _ in range(rng.randrange(4)):
+            start = rng.randrange(0, 700, 10)
+            mask |= grid.interval_mask(rng.randrange(grid.days), start, start + rng.choice([10, 50, 80]))
+        masks.append(mask)
+    return masks
+
+
+def test_interval_mask_is_exact_on_an_exact_grid():
+    grid = OccupancyGrid.exact_for([0, 80, 120, 200])
+    assert grid.resolution == 40
+    # Touching intervals do not overlap
+    assert not grid.interval_mask(0, 0, 120) & grid.interval_mask(0, 120, 200)
+    assert grid.interval_mask(0, 0, 160) & grid.interval_mask(0, 120, 200)
+    assert not grid.interval_mask(0, 0, 160) & grid.interval_mask(1, 120, 200)
+
+
+def test_timetable_mask_covers_filled_slots():
+    timetable = Timetable()
+    timetable.set_course(2, 1, {"course_name": "A", "duration": "80"})
+    grid = OccupancyGrid(resolution=10)
+    start = SLOTS_INFO[1][1]
+    assert grid.timetable_mask(timetable) == grid.interval_mask(2, start, start + 80)
+
+
+@pytest.mark.skipif(occupancy.np is None, reason="NumPy is not installed")
+def test_disjoint_sets_numpy_and_int_paths_agree(monkeypatch):
+    grid = OccupancyGrid(resolution=10)
+    masks = random_masks(grid, random.Random(4), 60)
+    vectorized = grid.disjoint_sets(masks)
+    monkeypatch.setattr(occupancy, "np", None)
+    plain = grid.disjoint_sets(masks)
+    assert type(vectorized) is type(plain) is list
+    assert vectorized == plain == [{j for j, b in enumerate(masks) if not a & b} for a in masks]
+    assert grid.disjoint_sets([]) == []
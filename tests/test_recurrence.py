@@ -0,0 +1,79 @@
+from datetime import date, datetime
+
+import pytest
+
+from recurrence import Semester, dated_conflicts, parse_pattern, pattern_days, target_days
+from timetable import Timetable
+
+
+@pytest.mark.parametrize("text, weekdays, parity, weeks", [
+    ("None", (), None, None),
+    ("MoWeFr", (0, 2, 4), None, None),
+    ("TuTh/odd", (1, 3), "odd", None),
+    ("None/even", (), "even", None),
+    ("Fr/w1-3,10", (4,), None, frozenset({1, 2, 3, 10})),
+    ("mowe/w1-8/w5-12", (0, 2), None, frozenset(range(5, 9))),
+    ("Sa/w52-53", (5,), None, frozenset({52, 53})),
+])
+def test_parse_pattern(text, weekdays, parity, weeks):
+    recurrence = parse_pattern(text)
+    assert (recurrence.weekdays, recurrence.parity, recurrence.weeks) == (weekdays, parity, weeks)
+    assert parse_pattern(text) is recurrence  # cached
+
+
+@pytest.mark.parametrize("text", ["", "Mon", "Xx", "Mo/odd/even", "Mo/w0", "Mo/w5-3", "Mo/w54",
+                                  "Mo/w1-999999999", "Mo/daily", ["Mo"], None, 3])
+def test_parse_pattern_rejects(text):
+    with pytest.raises(ValueError):
+        parse_pattern(text)
+
+
+def test_occurs_in_week():
+    odd = parse_pattern("Mo/odd")
+    assert [odd.occurs_in_week(w) for w in (1, 2, 3)] == [True, False, True]
+    ranged = parse_pattern("Mo/even/w1-4")
+    assert [w for w in range(1, 8) if ranged.occurs_in_week(w)] == [2, 4]
+
+
+def test_pattern_and_target_days():
+    assert pattern_days("MoWeSa", day_count=5) == [0, 2]
+    assert pattern_days("garbage") == []
+    assert target_days("MoWe", 2, 5) == [0, 2]
+    assert target_days("MoWe", 1, 5) == [1]
+
+
+def test_semester_masks_and_occurrences():
+    # Starts on a Wednesday, so week 1 has no Monday; the 14th is a holiday
+    semester = Semester(date(2026, 9, 2), date(2026, 9, 30), holidays=[date(2026, 9, 14)])
+    mondays = list(semester.dates(semester.date_mask(parse_pattern("Mo"), 0)))
+    assert mondays == [date(2026, 9, 7), date(2026, 9, 21), date(2026, 9, 28)]
+    assert [semester.week_of(day) for day in mondays] == [2, 4, 5]
+    odd_mondays = semester.date_mask(parse_pattern("Mo/odd"), 0)
+    assert list(semester.dates(odd_mondays)) == [date(2026, 9, 28)]
+
+    days = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+    occurrences = list(semester.occurrences(days, 2, 90, 80, {"repeat_pattern": "None/w1"}))
+    assert occurrences == [(datetime(2026, 9, 2, 10, 0), datetime(2026, 9, 2, 11, 20))]
+
+
+def test_week_entries():
+    semester = Semester(date(2026, 9, 7), date(2026, 10, 2))
+    days = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+    data = {(0, 0): {"course_name": "Weekly"},
+            (1, 0): {"course_name": "Odd", "repeat_pattern": "None/odd"},
+            (2, 0): {"course_name": "Late", "repeat_pattern": "None/w3-4"}}
+    assert set(semester.week_entries(days, data, 1)) == {(0, 0), (1, 0)}
+    assert set(semester.week_entries(days, data, 2)) == {(0, 0)}
+    assert set(semester.week_entries(days, data, 3)) == {(0, 0), (1, 0), (2, 0)}
+    assert semester.week_entries(days, data, 9) == {}
+
+
+def test_dated_conflicts_need_a_common_date():
+    semester = Semester(date(2026, 9, 7), date(2026, 12, 18))
+    timetable = Timetable()
+    timetable.set_course(0, 0, {"course_name": "Odd", "duration": "330", "repeat_pattern": "None/odd"})
+    timetable.set_course(0, 1, {"course_name": "Even", "duration": "200", "repeat_pattern": "None/even"})
+    timetable.set_course(0, 2, {"course_name": "Weekly"})
+    pairs = {(a, b): first for a, b, first in dated_conflicts(timetable, semester)}
+    # Odd and even weeks never meet; the weekly course meets the odd one in week 1
+    assert pairs == {((0, 0), (0, 2)): date(2026, 9, 7), ((0, 1), (0, 2)): date(2026, 9, 14)}
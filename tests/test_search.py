@@ -0,0 +1,25 @@
+import threading
+
+import pytest
+
+from search import Preferences, iter_top_k
+from test_generator import brute_force_schedules, random_courses
+
+
+def test_top_k_matches_brute_force_scores():
+    courses = random_courses(1)
+    preferences = Preferences(gap_weight=1.0, late_start_weight=0.5, days_off_weight=2.0,
+                              instructor_weight=1.0, preferred_instructors=["Li"])
+    updates = list(iter_top_k(courses, preferences, k=5, workers=1))
+    done, total, best = updates[-1]
+    assert done == total
+    expected = sorted((preferences.score(s) for s in brute_force_schedules(courses)), reverse=True)[:5]
+    assert [score for score, _ in best] == pytest.approx(expected)
+    for score, schedule in best:
+        assert preferences.score(schedule) == pytest.approx(score)
+
+
+def test_top_k_cancelled_before_start_yields_nothing():
+    cancel = threading.Event()
+    cancel.set()
+    assert list(iter_top_k(random_courses(2), Preferences(), k=3, workers=1, cancel=cancel)) == []
@@ -0,0 +1,211 @@
+import asyncio
+import json
+import queue
+import random
+import socket
+import threading
+import time
+
+import pytest
+
+from sync import MESSAGE_LIMIT, SyncClient, SyncServer, decode_changes, encode_changes, parse_address, split_changes
+from timetable import Timetable, regular_slots
+
+
+@pytest.fixture
+def server(request):
+    """A SyncServer on a free port, run by an event loop on a background thread."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    sync_server = SyncServer("127.0.0.1", 0, limit=getattr(request, "param", MESSAGE_LIMIT))
+    listener = asyncio.run_coroutine_threadsafe(sync_server.start(), loop).result(timeout=5)
+    sync_server.port = listener.sockets[0].getsockname()[1]
+    sync_server.loop = loop
+    yield sync_server
+
+    async def shutdown():
+        listener.close()
+        # Connection handlers still waiting on a read close their writers while the loop runs
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def server_doc(sync_server, doc):
+    """A copy of one of the server's documents, taken on its loop."""
+    async def copy():
+        return dict(sync_server.docs.get(doc, {}))
+    return asyncio.run_coroutine_threadsafe(copy(), sync_server.loop).result(timeout=5)
+
+
+class Replica:
+    """A Timetable kept in sync the way the GUI does: remote changes are applied on this thread."""
+
+    def __init__(self, sync_server, doc, initial=None, slots_info=None):
+        self.timetable = Timetable(slots_info=slots_info)
+        self.timetable.load(initial or {})
+        self.inbox = queue.Queue()
+        self.client = SyncClient("127.0.0.1", sync_server.port, doc, dict(self.timetable.items()),
+                                 self.inbox.put, limit=sync_server.limit)
+        self.timetable.listeners.append(self.client.local_change)
+        self.client.start()
+
+    def apply_remote(self):
+        while not self.inbox.empty():
+            changes = self.client.current(self.inbox.get())
+            with self.client.applying_remote():
+                for (d, s), data in changes.items():
+                    self.timetable.set_course(d, s, data)
+
+
+def wait_until(predicate, replicas, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for replica in replicas:
+            replica.apply_remote()
+        if predicate():
+            return
+        time.sleep(0.01)
+    raise AssertionError("timed out waiting for sync")
+
+
+def stored(sync_server, doc):
+    return {key: data for key, (data, _) in server_doc(sync_server, doc).items() if data}
+
+
+def test_clients_converge(server):
+    a = Replica(server, "doc", {(0, 0): {"course_name": "Seed"}})
+    b = None
+    try:
+        # The first client seeds the empty document
+        wait_until(lambda: stored(server, "doc") == a.timetable.data, [a])
+        # A later client adopts it and drops its own courses
+        b = Replica(server, "doc", {(4, 4): {"course_name": "Local only"}})
+        wait_until(lambda: b.timetable.data == a.timetable.data, [a, b])
+
+        rng = random.Random(2)
+        for n in range(60):
+            replica = rng.choice([a, b])
+            key = (rng.randrange(5), rng.randrange(7))
+            if rng.random() < 0.3:
+                replica.timetable.remove_course(*key)
+            else:
+                replica.timetable.set_course(*key, {"course_name": f"C{n}"})
+            if n % 10 == 0:
+                time.sleep(0.02)
+        wait_until(lambda: a.timetable.data == b.timetable.data == stored(server, "doc"), [a, b])
+    finally:
+        a.client.stop()
+        if b is not None:
+            b.client.stop()
+
+
+def test_concurrent_edits_settle_on_the_later_clock(server):
+    a = Replica(server, "doc")
+    b = Replica(server, "doc")
+    try:
+        a.timetable.set_course(1, 1, {"course_name": "Base"})
+        wait_until(lambda: b.timetable.data == a.timetable.data == {(1, 1): {"course_name": "Base"}}, [a, b])
+
+        a.timetable.set_course(1, 1, {"course_name": "From A"})
+        b.timetable.set_course(1, 1, {"course_name": "From B"})
+        # Both edits carry the same counter, so the client id decides
+        assert a.client.clocks[(1, 1)][0] == b.client.clocks[(1, 1)][0]
+        winner = max([a, b], key=lambda r: r.client.clocks[(1, 1)]).timetable.get((1, 1))
+        wait_until(lambda: a.timetable.data == b.timetable.data == {(1, 1): winner}, [a, b])
+        assert stored(server, "doc") == {(1, 1): winner}
+    finally:
+        a.client.stop()
+        b.client.stop()
+
+
+def test_server_rejects_invalid_changes(server):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        stream = sock.makefile("rwb")
+        stream.write(b'{"type":"hello","doc":"raw"}\n')
+        stream.flush()
+        assert json.loads(stream.readline())["type"] == "snapshot"
+        changes = {"0,0": {"data": {"course_name": "Good"}, "clock": [1, "x"]},
+                   "-1,0": {"data": {"course_name": "Negative"}, "clock": [1, "x"]},
+                   "0,1": {"data": {"course_name": "Bad", "duration": "abc"}, "clock": [1, "x"]}}
+        stream.write(json.dumps({"type": "delta", "changes": changes}).encode() + b"\n")
+        stream.flush()
+        reply = json.loads(stream.readline())
+        assert reply["type"] == "error"
+    assert stored(server, "raw") == {(0, 0): {"course_name": "Good"}}
+
+
+@pytest.mark.parametrize("server", [16 * 1024], indirect=True)
+def test_large_documents_are_split_into_messages(server):
+    slots_info = regular_slots(15)
+    initial = {(d, s): {"course_name": f"C{d}-{s}", "remarks": "x" * 400}
+               for d in range(5) for s in range(len(slots_info))}
+    a = Replica(server, "big", initial, slots_info)
+    b = None
+    try:
+        wait_until(lambda: stored(server, "big") == initial, [a])
+        # The snapshot alone is several times the line limit
+        b = Replica(server, "big", slots_info=slots_info)
+        wait_until(lambda: b.timetable.data == initial, [b])
+    finally:
+        a.client.stop()
+        if b is not None:
+            b.client.stop()
+
+
+@pytest.mark.parametrize("server", [16 * 1024], indirect=True)
+def test_server_drops_peers_sending_overlong_lines(server):
+    with socket.create_connection(("127.0.0.1", server.port), timeout=5) as sock:
+        stream = sock.makefile("rwb")
+        stream.write(b'{"type":"hello","doc":"raw"}\n')
+        stream.flush()
+        stream.readline()
+        stream.write(b"x" * (server.limit + 10) + b"\n")
+        stream.flush()
+        assert json.loads(stream.readline())["type"] == "error"
+        assert stream.readline() == b""
+    # Other clients are still served
+    a = Replica(server, "raw", {(0, 0): {"course_name": "A"}})
+    try:
+        wait_until(lambda: stored(server, "raw") == {(0, 0): {"course_name": "A"}}, [a])
+    finally:
+        a.client.stop()
+
+
+def test_split_changes_respects_the_limit():
+    changes = {(0, s): ({"course_name": "x" * 100}, (s + 1, "a")) for s in range(50)}
+    parts, oversized = split_changes(changes, 1024)
+    assert len(parts) > 1 and oversized == []
+    assert all(len(json.dumps({"type": "snapshot", "more": True, "changes": part})) < 1024 for part in parts)
+    assert decode_changes({k: v for part in parts for k, v in part.items()}) == (changes, [])
+    parts, oversized = split_changes({(0, 0): ({"course_name": "x" * 2000}, (1, "a"))}, 1024)
+    assert parts == [{}] and oversized == ["0,0"]
+
+
+def test_decode_changes_round_trip_and_problems():
+    changes = {(0, 1): ({"course_name": "A"}, (3, "abc")), (2, 3): (None, (4, "def"))}
+    assert decode_changes(encode_changes(changes)) == (changes, [])
+
+    decoded, problems = decode_changes({
+        "1,1": {"data": {}, "clock": [1, "a"]},
+        "x": {"data": None, "clock": [1, "a"]},
+        "0,-2": {"data": None, "clock": [1, "a"]},
+        "0,0": {"data": {"course_name": "A"}},
+        "0,2": {"data": ["A"], "clock": [1, "a"]},
+        "0,3": {"data": {"course_name": "A", "repeat_pattern": 5}, "clock": [1, "a"]},
+    })
+    assert decoded == {(1, 1): (None, (1, "a"))}
+    assert len(problems) == 5
+    assert decode_changes([]) == ({}, ["changes must be an object"])
+
+
+def test_parse_address():
+    assert parse_address("") == ("127.0.0.1", 8765, "default")
+    assert parse_address("example.org:9000/team") == ("example.org", 9000, "team")
+    assert parse_address(":9000") == ("127.0.0.1", 9000, "default")
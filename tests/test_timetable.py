@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from history import UndoHistory
+from timetable import SLOTS_INFO, Timetable, check_timetable, diff_data, regular_slots
+
+
+def brute_force_conflicts(timetable):
+    """Slots, filled or not, whose start lies inside an earlier-starting course of the same day."""
+    conflicts = set()
+    for d in range(len(timetable.days)):
+        for s, (_, start, _) in enumerate(timetable.slots_info):
+            if timetable.covering(d, s):
+                conflicts.add((d, s))
+    return conflicts
+
+
+def random_course(rng):
+    return {"course_name": f"C{rng.randrange(100)}", "duration": str(rng.choice([15, 50, 80, 110, 200]))}
+
+
+@pytest.mark.parametrize("slots_info", [SLOTS_INFO, regular_slots(15)], ids=["default", "15min"])
+def test_incremental_index_matches_brute_force(slots_info):
+    rng = random.Random(7)
+    timetable = Timetable(slots_info=slots_info)
+    for _ in range(400):
+        key = (rng.randrange(len(timetable.days)), rng.randrange(len(slots_info)))
+        before = timetable.conflicts()
+        if rng.random() < 0.3:
+            changed = timetable.remove_course(*key)
+        else:
+            changed = timetable.set_course(*key, random_course(rng))
+        assert timetable.conflicts() == brute_force_conflicts(timetable)
+        # Only slots whose status flipped are reported
+        assert changed == before ^ timetable.conflicts()
+
+
+def test_batch_reports_net_changes_once():
+    timetable = Timetable()
+    timetable.set_course(0, 0, {"course_name": "A", "duration": "80"})
+    timetable.set_course(0, 1, {"course_name": "B"})
+    timetable.set_course(0, 2, {"course_name": "C"})
+    before = timetable.conflicts()
+    with timetable.batch() as changed:
+        timetable.set_course(0, 0, {"course_name": "A", "duration": "330"})
+        timetable.remove_course(0, 2)
+        timetable.set_course(0, 2, {"course_name": "C again"})
+        # The index is only brought up to date when the batch ends
+        assert timetable.conflicts() == before
+    assert timetable.conflicts() == brute_force_conflicts(timetable) == {(0, 1), (0, 2)}
+    assert changed == before ^ timetable.conflicts()
+
+
+def test_load_and_rebuild_match_incremental():
+    rng = random.Random(3)
+    data = {(rng.randrange(5), rng.randrange(len(SLOTS_INFO))): random_course(rng) for _ in range(20)}
+    loaded = Timetable()
+    loaded.load(data)
+    incremental = Timetable()
+    for (d, s), val in data.items():
+        incremental.set_course(d, s, val)
+    assert loaded.conflicts() == incremental.conflicts() == brute_force_conflicts(loaded)
+
+
+def test_preview_edit_reports_overwrites_and_conflicts():
+    timetable = Timetable()
+    timetable.set_course(0, 1, {"course_name": "Existing"})
+    timetable.set_course(2, 0, {"course_name": "Long", "duration": "200"})
+    preview = timetable.preview_edit(0, 0, {"course_name": "New", "duration": "200"}, [0, 2])
+    assert (2, 0) in preview.overwritten
+    assert (0, 1) in preview.conflicts
+    assert timetable.get((0, 0)) is None  # nothing was written
+
+
+def test_check_timetable_rejects_bad_entries():
+    data, problems = check_timetable({
+        "0,0": {"course_name": "Ok"},
+        "0,1": {"course_name": "Bad duration", "duration": "abc"},
+        "0,2": {"course_name": "List pattern", "repeat_pattern": ["MoWe"]},
+        "0,3": {"course_name": "Bad pattern", "repeat_pattern": "Xx"},
+        "0,4": {"duration": "80"},
+        "9,0": {"course_name": "Outside"},
+        "-1,0": {"course_name": "Negative"},
+        "x": {"course_name": "Key"},
+    })
+    assert data == {(0, 0): {"course_name": "Ok"}}
+    assert len(problems) == 7
+
+
+def test_diff_data():
+    old = {(0, 0): {"course_name": "A"}, (0, 1): {"course_name": "B"}}
+    new = {(0, 0): {"course_name": "A"}, (0, 2): {"course_name": "C"}}
+    assert diff_data(old, new) == {(0, 1): None, (0, 2): {"course_name": "C"}}
+
+
+def test_failing_listener_does_not_record_phantom_edits():
+    timetable = Timetable()
+    timetable.history = history = UndoHistory()
+
+    def closed_loop(key, old, new):
+        raise RuntimeError("Event loop is closed")
+    timetable.listeners.append(closed_loop)
+    with pytest.raises(RuntimeError):
+        timetable.set_course(0, 0, {"course_name": "A", "duration": "200"})
+    # The edit happened, so undo restores the previous state
+    assert timetable.get((0, 0)) == {"course_name": "A", "duration": "200"}
+    assert timetable.conflicts() == brute_force_conflicts(timetable) == {(0, 1)}
+    assert history.undo() == {(0, 0): None}
@@ -0,0 +1,25 @@
+from timetable import DAYS, SLOTS_INFO, WEEK_DAYS, Timetable
+from workspace import Workspace
+
+
+def test_regrid_drops_weekend_courses_of_every_entry():
+    workspace = Workspace()
+    first = Timetable(WEEK_DAYS)
+    first.set_course(0, 0, {"course_name": "Weekday"})
+    second = Timetable(WEEK_DAYS)
+    second.set_course(5, 1, {"course_name": "Saturday"})
+    workspace.add("first", first)
+    workspace.add("second", second)
+    assert [entry.name for entry in workspace.losing_courses(DAYS, SLOTS_INFO)] == ["second"]
+
+    seen = []
+    second.listeners.append(lambda key, old, new: seen.append((key, old, new)))
+    workspace.regrid(DAYS, SLOTS_INFO)
+    first_entry, second_entry = workspace.entries
+    assert first_entry.timetable.data == {(0, 0): {"course_name": "Weekday"}}
+    assert second_entry.timetable.data == {}
+    assert second_entry.timetable.days == DAYS
+    # Listeners such as a sync replica see the dropped course as a deletion
+    assert seen == [((5, 1), {"course_name": "Saturday"}, None)]
+    assert second_entry.timetable.listeners and not second.listeners
+    assert not second_entry.history.can_undo()
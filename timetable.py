@@ -0,0 +1,416 @@
+"""
+Qt-free timetable model.
+
+Course data is keyed by (day_idx, slot_idx), exactly like
+MainWindow.timetable_data, and a per-day interval index keeps track of which
+slots are unavailable because an earlier course runs into them.
+"""
+import json
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+
+from recurrence import parse_pattern
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+# (label, start offset in minutes from 8:30am, is_lecture)
+SLOTS_INFO = [
+    ("8:30am", 0, True),
+    ("10:30am", 120, True),
+    ("1:30pm", 300, True),
+    ("3:30pm", 420, True),
+    ("6:00pm", 570, False),
+    ("7:00pm", 630, False),
+    ("8:00pm", 690, False)
+]
+
+WEEK_DAYS = DAYS + ["Saturday", "Sunday"]
+
+# Presets offered by CourseDialog; any recurrence.parse_pattern string is accepted
+REPEAT_PATTERNS = {
+    "None": [],
+    "MoWe": [0, 2],
+    "TuTh": [1, 3],
+    "MoWeFr": [0, 2, 4]
+}
+
+
+def default_duration(is_lecture):
+    return 80 if is_lecture else 50
+
+
+def minutes_to_hhmm(m):
+    """Format an offset in minutes from 8:30am, e.g. 300 -> "1:30pm"."""
+    base_hour = 8
+    base_minute = 30
+    total_min = base_hour*60 + base_minute + m
+    h = total_min // 60
+    mm = total_min % 60
+    am_pm = "am" if h<12 else "pm"
+    disp_h = h if h<=12 else (h-12)
+    return f"{disp_h}:{mm:02d}{am_pm}"
+
+
+def regular_slots(step, start=0, end=750, is_lecture=True):
+    """Evenly spaced slots, e.g. regular_slots(15) for a 15-minute grid."""
+    return [(minutes_to_hhmm(m), m, is_lecture) for m in range(start, end, step)]
+
+
+def load_grid(path):
+    """
+    Read a grid definition and return (days, slots_info). The file is JSON
+    with "days" (defaults to DAYS) and either explicit "slots" as
+    [label, offset, is_lecture] triples or "slot_minutes" (plus optional
+    "start", "end" and "lecture") for an evenly spaced grid.
+    """
+    with open(path, "r") as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict):
+        raise ValueError("grid definition must be an object")
+    days = raw.get("days", DAYS)
+    if not days or not all(isinstance(d, str) for d in days):
+        raise ValueError("days must be a non-empty list of names")
+    if "slots" in raw:
+        try:
+            slots_info = [(str(label), int(offset), bool(is_lecture))
+                          for label, offset, is_lecture in raw["slots"]]
+        except (TypeError, ValueError):
+            raise ValueError("slots must be [label, offset, is_lecture] triples")
+    else:
+        step = raw.get("slot_minutes")
+        if not isinstance(step, int) or step <= 0:
+            raise ValueError("grid needs either slots or a positive slot_minutes")
+        slots_info = regular_slots(step, raw.get("start", 0), raw.get("end", 750),
+                                   raw.get("lecture", True))
+    if not slots_info:
+        raise ValueError("grid has no slots")
+    return list(days), slots_info
+
+
+def to_json_dict(data):
+    """timetable_data -> the {"d,s": course} dict written to timetable files."""
+    return {f"{d},{s}": val for (d, s), val in sorted(data.items())}
+
+
+def from_json_dict(str_data):
+    """Inverse of to_json_dict; raises ValueError on malformed keys."""
+    loaded = {}
+    for key, val in str_data.items():
+        d_str, s_str = key.split(",")
+        loaded[(int(d_str), int(s_str))] = val
+    return loaded
+
+
+def diff_data(old, new):
+    """{slot: new course, or None if it was removed} for every slot that differs between two timetable_data dicts."""
+    changes = {key: None for key in old if key not in new}
+    changes.update((key, val) for key, val in new.items() if old.get(key) != val)
+    return changes
+
+
+def check_timetable(str_data, days=DAYS, slots_info=SLOTS_INFO):
+    """
+    Validate decoded timetable JSON without raising. Returns (data, problems):
+    the usable courses keyed by (day_idx, slot_idx) and a description of
+    every entry that was rejected.
+    """
+    if not isinstance(str_data, dict):
+        return {}, ["top level must be an object"]
+    data = {}
+    problems = []
+    for key, val in str_data.items():
+        try:
+            d_str, s_str = key.split(",")
+            d, s = int(d_str), int(s_str)
+        except ValueError:
+            problems.append(f"bad slot key {key!r}")
+            continue
+        if not (0 <= d < len(days) and 0 <= s < len(slots_info)):
+            problems.append(f"slot key {key!r} is outside the grid")
+            continue
+        if not isinstance(val, dict):
+            problems.append(f"{key}: course must be an object")
+            continue
+        if not val:
+            continue
+        problem = course_problem(val)
+        if problem:
+            problems.append(f"{key}: {problem}")
+            continue
+        data[(d, s)] = val
+    return data, problems
+
+
+def course_problem(val):
+    """Why one non-empty course object is unusable, or None; a missing duration takes the slot's default."""
+    pattern = val.get("repeat_pattern", "None")
+    if not isinstance(pattern, str):
+        return f"repeat_pattern must be a string, not {type(pattern).__name__}"
+    try:
+        parse_pattern(pattern)
+    except ValueError as e:
+        return f"invalid repeat_pattern {pattern!r} ({e})"
+    if "duration" in val:
+        try:
+            duration = int(val["duration"])
+        except (TypeError, ValueError):
+            return f"invalid duration {val['duration']!r}"
+        if duration <= 0:
+            return f"invalid duration {duration}"
+    if not str(val.get("course_name", "")).strip():
+        return "missing course_name"
+    return None
+
+
+def normalize_course(val, is_lecture):
+    """Canonical form of one course: stripped text fields, integer-string duration, explicit pattern."""
+    out = dict(val)
+    for field in ("course_name", "instructor_name", "remarks", "room"):
+        out[field] = str(val.get(field, "")).strip()
+    out["duration"] = str(int(val.get("duration", default_duration(is_lecture))))
+    out["repeat_pattern"] = val.get("repeat_pattern", "None")
+    return out
+
+
+class EditPreview:
+    """What writing one course to some slots would do, from Timetable.preview_edit()."""
+    __slots__ = ("overwritten", "conflicts", "covered_by", "blocked", "resolved")
+
+    def __init__(self):
+        self.overwritten = []  # slots whose other course would be replaced
+        self.conflicts = []    # filled slots the new course would run into
+        self.covered_by = []   # earlier courses the new course would start inside
+        self.blocked = []      # empty slots that would become unavailable
+        self.resolved = []     # filled slots that would no longer be in conflict
+
+    def __bool__(self):
+        return bool(self.overwritten or self.conflicts or self.covered_by or self.blocked or self.resolved)
+
+
+class Timetable:
+    """
+    A slot is in conflict when an earlier course on the same day ends after
+    it starts. For every slot we keep the number of earlier slots covering its
+    start time, so changing one course only has to look at the slots whose
+    start lies between the old and the new end time.
+    """
+
+    def __init__(self, days=None, slots_info=None):
+        self.days = list(days or DAYS)
+        self.slots_info = list(slots_info or SLOTS_INFO)
+        self.data = {}
+
+        # Slots of a day ordered by start time (ties broken by slot index)
+        self._order = sorted(range(len(self.slots_info)),
+                             key=lambda s: (self.slots_info[s][1], s))
+        self._starts = [self.slots_info[s][1] for s in self._order]
+        self._rank = {s: r for r, s in enumerate(self._order)}
+
+        self._ends = {}   # (d, s) -> end minute
+        self._cover = {}  # (d, s) -> number of earlier slots covering its start
+        self._batch_depth = 0
+        self._batch_changed = None
+        self._dirty_days = set()
+        # Slots written since the last take_modified(), for incremental saving
+        self._modified = set()
+        # Bumped on every write, so views can tell whether a cached rendering is stale
+        self.revision = 0
+        # Optional history.UndoHistory that records every set/remove
+        self.history = None
+        # Callables listener(key, old, new) told of every set/remove (not of load())
+        self.listeners = []
+        self.rebuild()
+
+    def __contains__(self, key):
+        return key in self.data
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def items(self):
+        return self.data.items()
+
+    def duration(self, day_idx, slot_idx):
+        _, _, is_lecture = self.slots_info[slot_idx]
+        data = self.data.get((day_idx, slot_idx))
+        if data:
+            return int(data.get("duration", default_duration(is_lecture)))
+        return default_duration(is_lecture)
+
+    def end_minute(self, day_idx, slot_idx):
+        """End of the course in a slot; an empty slot ends where it starts and covers nothing."""
+        start = self.slots_info[slot_idx][1]
+        if (day_idx, slot_idx) not in self.data:
+            return start
+        return start + self.duration(day_idx, slot_idx)
+
+    def is_conflict(self, day_idx, slot_idx):
+        return self._cover.get((day_idx, slot_idx), 0) > 0
+
+    def conflicts(self):
+        return {key for key, count in self._cover.items() if count > 0}
+
+    def covering(self, day_idx, slot_idx):
+        """Earlier filled slots of the same day whose course runs past this slot's start."""
+        start = self.slots_info[slot_idx][1]
+        rank = self._rank[slot_idx]
+        return [(day_idx, s) for s in self._order[:rank]
+                if (day_idx, s) in self.data and self.end_minute(day_idx, s) > start]
+
+    def course_conflicts(self):
+        """(earlier, later) slot key pairs where one course runs into another course."""
+        pairs = []
+        for key in sorted(self.conflicts()):
+            if key in self.data:
+                pairs.extend((other, key) for other in self.covering(*key))
+        return pairs
+
+    def set_course(self, day_idx, slot_idx, data):
+        """Store course data in one slot; return the slots whose conflict status changed."""
+        if not data:
+            return self.remove_course(day_idx, slot_idx)
+        old = self.data.get((day_idx, slot_idx))
+        self.data[(day_idx, slot_idx)] = data
+        changed = self._changed(day_idx, slot_idx)
+        self._notify((day_idx, slot_idx), old, data)
+        return changed
+
+    def remove_course(self, day_idx, slot_idx):
+        """Clear one slot; return the slots whose conflict status changed."""
+        if (day_idx, slot_idx) not in self.data:
+            return set()
+        old = self.data.pop((day_idx, slot_idx))
+        changed = self._changed(day_idx, slot_idx)
+        self._notify((day_idx, slot_idx), old, None)
+        return changed
+
+    def _changed(self, day_idx, slot_idx):
+        self._modified.add((day_idx, slot_idx))
+        self.revision += 1
+        if self._batch_depth:
+            self._dirty_days.add(day_idx)
+            return set()
+        return self._reindex(day_idx, slot_idx)
+
+    def _notify(self, key, old, new):
+        # Only once the slot and the index are up to date, so a failing
+        # listener cannot leave history with an edit that never happened
+        if self.history is not None:
+            self.history.record(key, old, new)
+        for listener in self.listeners:
+            listener(key, old, new)
+
+    def preview_edit(self, day_idx, slot_idx, data, days):
+        """
+        EditPreview for writing `data` to slot_idx of every day in `days`
+        (the course being edited sits at (day_idx, slot_idx)), without
+        changing anything. Uses the same start-time index as _reindex, so
+        the cost per day is a bisection plus the slots between the old and
+        the new end time.
+        """
+        preview = EditPreview()
+        _, start, is_lecture = self.slots_info[slot_idx]
+        new_end = start + int(data.get("duration", default_duration(is_lecture)))
+        own_rank = self._rank[slot_idx]
+        original = self.data.get((day_idx, slot_idx))
+        for d in days:
+            key = (d, slot_idx)
+            current = self.data.get(key)
+            # Copies of the course being edited are expected to be replaced
+            if d != day_idx and current and current != original:
+                preview.overwritten.append(key)
+            preview.covered_by.extend(self.covering(d, slot_idx))
+
+            old_end = self._ends[key]
+            lo, hi = min(old_end, new_end), max(old_end, new_end)
+            for r in range(bisect_left(self._starts, lo), bisect_left(self._starts, hi)):
+                if r <= own_rank:
+                    continue
+                other = (d, self._order[r])
+                if new_end > old_end and self._cover[other] == 0:
+                    (preview.conflicts if other in self.data else preview.blocked).append(other)
+                elif new_end < old_end and self._cover[other] == 1 and other in self.data:
+                    preview.resolved.append(other)
+        return preview
+
+    def take_modified(self):
+        """Return and reset the set of slots written since the last call."""
+        modified, self._modified = self._modified, set()
+        return modified
+
+    @contextmanager
+    def batch(self):
+        """
+        Defer index maintenance until the outermost batch exits. Edited days
+        are then re-indexed once, and the yielded set is filled with the slots
+        whose conflict status changed over the whole batch. With a history
+        attached, the batch is recorded as one undo step.
+        """
+        if self._batch_depth == 0:
+            self._batch_changed = set()
+        changed = self._batch_changed
+        history = self.history
+        if history is not None:
+            history.begin()
+        self._batch_depth += 1
+        try:
+            yield changed
+        finally:
+            self._batch_depth -= 1
+            if history is not None:
+                history.end()
+            if self._batch_depth == 0:
+                dirty, self._dirty_days = self._dirty_days, set()
+                for day_idx in sorted(dirty):
+                    changed |= self._rebuild_day(day_idx)
+                self._batch_changed = None
+
+    def load(self, data):
+        """Replace all course data; return the slots whose conflict status changed."""
+        self._modified |= set(self.data) | set(data)
+        self.data.clear()
+        self.data.update(data)
+        self.revision += 1
+        return self.rebuild()
+
+    def rebuild(self):
+        """Recompute the whole index; return the slots whose conflict status changed."""
+        changed = set()
+        for day_idx in range(len(self.days)):
+            changed |= self._rebuild_day(day_idx)
+        return changed
+
+    def _rebuild_day(self, day_idx):
+        before = {s for s in self._order if self.is_conflict(day_idx, s)}
+        ends_so_far = []
+        for slot_idx in self._order:
+            key = (day_idx, slot_idx)
+            start = self.slots_info[slot_idx][1]
+            self._cover[key] = len(ends_so_far) - bisect_right(ends_so_far, start)
+            self._ends[key] = self.end_minute(day_idx, slot_idx)
+            insort(ends_so_far, self._ends[key])
+        after = {s for s in self._order if self.is_conflict(day_idx, s)}
+        return {(day_idx, s) for s in before ^ after}
+
+    def _reindex(self, day_idx, slot_idx):
+        key = (day_idx, slot_idx)
+        old_end = self._ends[key]
+        new_end = self.end_minute(day_idx, slot_idx)
+        if new_end == old_end:
+            return set()
+        self._ends[key] = new_end
+
+        # Only slots starting in [lo, hi) gain or lose this slot as a cover
+        lo, hi = min(old_end, new_end), max(old_end, new_end)
+        step = 1 if new_end > old_end else -1
+        own_rank = self._rank[slot_idx]
+        changed = set()
+        for r in range(bisect_left(self._starts, lo), bisect_left(self._starts, hi)):
+            if r <= own_rank:
+                continue
+            other = (day_idx, self._order[r])
+            was_conflict = self._cover[other] > 0
+            self._cover[other] += step
+            if (self._cover[other] > 0) != was_conflict:
+                changed.add(other)
+        return changed
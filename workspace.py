@@ -0,0 +1,92 @@
+"""
+Several timetables open at once, for comparing candidate schedules.
+
+Every entry owns its Timetable and UndoHistory. One entry is active and is
+shown by the main window's single ScheduleWidget, which switches between
+entries by swapping models rather than being rebuilt; the others are only
+ever drawn as thumbnails.
+"""
+from history import UndoHistory
+from timetable import Timetable
+
+
+class WorkspaceEntry:
+    def __init__(self, name, timetable, path=None):
+        self.name = name
+        self.timetable = timetable
+        self.path = path  # file it was loaded from or saved to, if any
+        self.history = UndoHistory()
+        timetable.history = self.history
+
+
+class Workspace:
+    def __init__(self):
+        self.entries = []
+        self.active = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def index(self, entry):
+        return self.entries.index(entry)
+
+    def add(self, name, timetable, path=None):
+        entry = WorkspaceEntry(self.unique_name(name), timetable, path)
+        self.entries.append(entry)
+        if self.active is None:
+            self.active = entry
+        return entry
+
+    def remove(self, entry):
+        """Drop an entry; return the one to show instead if it was active (None if it was not)."""
+        idx = self.entries.index(entry)
+        del self.entries[idx]
+        entry.timetable.history = None
+        if entry is not self.active:
+            return None
+        self.active = self.entries[min(idx, len(self.entries) - 1)] if self.entries else None
+        return self.active
+
+    def neighbour(self, step):
+        """The entry `step` places after the active one, wrapping around."""
+        idx = self.entries.index(self.active)
+        return self.entries[(idx + step) % len(self.entries)]
+
+    def unique_name(self, base):
+        names = {entry.name for entry in self.entries}
+        if base not in names:
+            return base
+        n = 2
+        while f"{base} ({n})" in names:
+            n += 1
+        return f"{base} ({n})"
+
+    def losing_courses(self, days, slots_info):
+        """Entries with courses that would not fit a days/slots_info grid."""
+        return [entry for entry in self.entries
+                if any(d >= len(days) or s >= len(slots_info) for d, s in entry.timetable.data)]
+
+    def regrid(self, days, slots_info):
+        """
+        Move every entry to another set of days/slots, keeping the courses
+        that still fit. Slot keys of the old grid are meaningless in the new
+        one, so all histories are cleared. Listeners move to the new timetable
+        and are told about the courses that were dropped, like any deletion.
+        """
+        for entry in self.entries:
+            old = entry.timetable
+            data = {(d, s): val for (d, s), val in old.items()
+                    if d < len(days) and s < len(slots_info)}
+            dropped = {key: val for key, val in old.items() if key not in data}
+            old.history = None
+            entry.timetable = Timetable(days, slots_info)
+            entry.timetable.load(data)
+            entry.timetable.listeners, old.listeners = old.listeners, []
+            for key, val in dropped.items():
+                for listener in entry.timetable.listeners:
+                    listener(key, val, None)
+            entry.history.clear()
+            entry.timetable.history = entry.history